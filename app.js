@@ -1,4 +1,4 @@
-import React, { useState } from "react";
+import React, { useEffect, useState } from "react";
 
 const App = () => {
   const [data, setData] = useState({
@@ -10,6 +10,16 @@ const App = () => {
     sessions: [{ message: "No Active Queries", status: "OK" }]
   });
 
+  // the insights that changed are pushed as {query_name: insights}, only those entries are replaced
+  useEffect(() => {
+    const updates = new EventSource("http://localhost:5500/events?subcluster_name=secondary_subcluster_1");
+    updates.addEventListener("insights", event => {
+      const changes = JSON.parse(event.data);
+      setData(previous => ({ ...previous, ...changes }));
+    });
+    return () => updates.close();
+  }, []);
+
   const fetchData = async () => {
     try {
       const response = await fetch("http://localhost:5500/globalrefresh?subcluster_name=secondary_subcluster_1");
@@ -21,8 +31,8 @@ const App = () => {
   };
 
   // Convert JSON object into an array of rows
-  const tableData = Object.entries(data).flatMap(([query_name, records]) =>
-    records.map(record => ({
+  const tableData = Object.entries(data).filter(([query_name]) => query_name !== "last_updated").flatMap(([query_name, records]) =>
+    (Array.isArray(records) ? records : records.insights || []).map(record => ({
       query_name,
       status: record.status,
       message: record.message
@@ -1,20 +1,63 @@
-from flask import Flask, request, jsonify, render_template, request
-from modules.args_parser import get_args, pargse_args
-from vertica_debug_report import execute_queries_from_json
-from modules.redis import connect_to_redis, put_value, get_value
-from datetime import datetime, timedelta
+from flask import Flask, request, jsonify, render_template, request, Response
+from modules.catalog import get_refresh_intervals
+from modules import serializer
+from modules.events import get_event, get_updated_since, KEEPALIVE_SECS, KEEPALIVE_EVENT
+from modules.redis import connect_to_redis, decode_value, get_fields, get_insights_key, get_updates_channel
+from modules.profiler import profiler
+from refresh_worker import refresh_query_single_flight, is_stale
 from flask_cors import CORS
+from concurrent.futures import ThreadPoolExecutor
+import threading
 import requests
 
 app = Flask(__name__)
 CORS(app)
 
+QUERY_FILE_PATH = "queries.json"
+SUBCLUSTER_NAME = "secondary_subcluster_1"
+redis_client = connect_to_redis()
+# the recomputes asked for by requests run here one at a time, never in the request threads
+refresh_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="refresh")
+# (subcluster, query) -> future of its queued recompute
+refreshes = {}
+# (subcluster, query) -> error of its last recompute, until one succeeds
+refresh_errors = {}
+refreshes_lock = threading.RLock()
+# recomputes run in this process are timed for /metrics
+profiler.enable()
+
 
 BASE_API_URL = "http://localhost:5500/globalrefresh"
 
+def start_refresh(subcluster_name, query_name):
+    """Queues a recompute of the query unless one is queued already, returns its future.
+
+    Nothing waits for it, the new value reaches the dashboards over /events. The recompute
+    does not wait for one running in another process either.
+    """
+    key = (subcluster_name, query_name)
+    with refreshes_lock:
+        future = refreshes.get(key)
+        if future is None:
+            future = refresh_executor.submit(refresh_query_single_flight, redis_client, QUERY_FILE_PATH, subcluster_name, query_name)
+            refreshes[key] = future
+            future.add_done_callback(lambda done: forget_refresh(key, done))
+        return future
+
+def forget_refresh(key, future):
+    with refreshes_lock:
+        refreshes.pop(key, None)
+        # a SystemExit of the recompute is kept by the future like any exception
+        error = None if future.cancelled() else future.exception()
+        if error is None:
+            refresh_errors.pop(key, None)
+        else:
+            print(f"Error while refreshing {key[1]} on {key[0]}: {error}")
+            refresh_errors[key] = str(error) or type(error).__name__
+
 def fetch_data(query_name=None):
     try:
-        url = f"{BASE_API_URL}?subcluster_name=secondary_subcluster_1"
+        url = f"{BASE_API_URL}?subcluster_name={SUBCLUSTER_NAME}"
         if query_name:
             url += f"&query_name={query_name}"
 
@@ -29,7 +72,7 @@ def fetch_data(query_name=None):
 @app.route("/")
 def index():
     data = fetch_data()
-    return render_template("dashboard.html", data=data)
+    return render_template("dashboard.html", data=data, subcluster_name=SUBCLUSTER_NAME)
 
 @app.route("/refresh", methods=["GET"])
 def refresh_query():
@@ -38,69 +81,79 @@ def refresh_query():
         return jsonify({"error": "Missing query_name"}), 400
 
     data = fetch_data(query_name=query_name)
-    return render_template("dashboard.html", data=data)
+    return render_template("dashboard.html", data=data, subcluster_name=SUBCLUSTER_NAME)
 
 # if __name__ == "__main__":
 #     app.run(debug=True)
 
 @app.route('/globalrefresh', methods=['GET'])
 def greet():
-
+    """Serves the insights cached in redis by refresh_worker.py."""
     subcluster_name = request.args.get('subcluster_name')
     query_name = request.args.get('query_name', '')
-    query_file_path = "queries.json"
-
-    '''
-    help_flag = False
-    if query_name != '':
-        filters, is_now, insights_only, with_insights, json_file_path, queries_to_execute = pargse_args(help_flag, query_file_path, subcluster_name, True, query_name)
-    else:
-        filters, is_now, insights_only, with_insights, json_file_path, queries_to_execute = pargse_args(help_flag, query_file_path, subcluster_name, True)
-    '''
-    
-    insights_json = {}
 
-    # execute_queries_from_json(insights_json, json_file_path, filters, filters['verbose'], is_now, insights_only, with_insights, queries_to_execute)
-    
-    hardcoded_insights_json = { "delete_vectors": { "insights": [ { "colour": "red", "display":True, "message": "4420 projections having > 1% of their total rows as deleted rows", "order": 10, "status": "FATAL", "last_updated": "2025-02-07 18:43:12.123" }, { "colour": "green", "display":True, "message": "No outliers in delete vector count", "order": 10, "status": "OK", "last_updated": "2025-02-07 18:43:12.123" } ] }, "error_messages": { "insights": [ { "colour": "green", "display":True, "message": "No Errors Found", "order": 4, "status": "OK", "last_updated": "2025-02-07 18:43:12.123" } ] }, "long_running_queries": { "insights": [ { "colour": "green", "display":True, "message": "No long running queries.", "order": 1, "status": "OK", "last_updated": "2025-02-07 18:43:12.123" } ] }, "query_count": { "insights": [ { "colour": "yellow", "display":True, "message": "> 2000 queries by users {'contact_summary_ds', 'upload'} in past 3.0 hours", "order": 8, "status": "WARN", "last_updated": "2025-02-07 18:43:12.123" }, { "colour": "green", "display":True, "message": "total 6305 queries by 4 users in past 3.0 hours", "order": 8, "status": "OK", "last_updated": "2025-02-07 18:43:12.123" } ] }, "resource_queues": { "insights": [ { "colour": "green", "display":True, "message": "No Queries in Queue", "order": 6, "status": "OK", "last_updated": "2025-02-07 18:43:12.123" } ] }, "sessions": { "insights": [ { "colour": "green", "display":True, "message": "No Active Queries", "order": 3, "status": "OK", "last_updated": "2025-02-07 18:43:12.123" } ] }, "last_updated": "2025-02-07 18:43:12.123" }
+    if not subcluster_name:
+        return jsonify({"error": "Missing subcluster_name"}), 400
 
-    # return insights_json
-    # hardcoded_insights_json = {"long_running_queries":{"insights":[{"colour":"sajbfjsdbfjabxshdrcisue","display":True,"message":"No long wjhgxfn running queries.","order":1,"status":"OK"}]}}
+    intervals = get_refresh_intervals(QUERY_FILE_PATH)
+    query_names = list(intervals)
 
-    # hardcoded_insights_json = {"delete_vectors":{"insights":[{"colour":"rvdshjhdbhjsdvhjed","display":True,"message":"abcd","order":10,"status":"FATAL", "last_updated": "2025-02-07 18:56:00.123"},{"colour":"hjbhbdshbhbsdhjbsdhj","display":True,"message":"abcd","order":10,"status":"OK", "last_updated": "2025-02-07 19:56:00.123"}]}}
+    values = get_fields(redis_client, get_insights_key(subcluster_name), query_names)
+    res_insights_json = {name: value for name, value in values.items() if value is not None}
 
-    # hardcoded_insights_json = {"delete_vectors":{"insights":[{"colour":"rvdshjhdbhjsdvhjed","display":True,"message":"fegh","order":10,"status":"FATAL", "last_updated": "2025-02-07 18:49:00.123"},{"colour":"hjbhbdshbhbsdhjbsdhj","display":True,"message":"fegh","order":10,"status":"OK", "last_updated": "2025-02-07 18:49:00.123"}]}}
+    if query_name != '' and query_name in intervals and is_stale(values.get(query_name), intervals[query_name]):
+        # explicit refresh of a stale row: the cached value is served as is, flagged stale, and
+        # recomputed in the background (one recompute per (subcluster, query) across all workers)
+        try:
+            start_refresh(subcluster_name, query_name)
+        except RuntimeError as e:
+            # the executor is shut down
+            return jsonify({"error": f"Refresh of {query_name} could not be started: {e}"}), 503
+        if query_name in res_insights_json:
+            res_insights_json[query_name]['stale'] = True
+            if (subcluster_name, query_name) in refresh_errors:
+                res_insights_json[query_name]['refresh_error'] = refresh_errors[(subcluster_name, query_name)]
 
-    redis_client = connect_to_redis()
-    
-    res_insights_json = get_value(redis_client, 'test')
-
-    last_updated = datetime.strptime(res_insights_json['last_updated'], "%Y-%m-%d %H:%M:%S.%f")
-
-    if query_name != '':
-        # handle if redis is completely empty (query for all push new json, will not in ui as it does it when page us loaded)
-        # query here
-        if datetime.now() - datetime.strptime(res_insights_json[query_name]['insights'][0]['last_updated'], "%Y-%m-%d %H:%M:%S.%f") > timedelta(seconds=15):
-            res_insights_json[query_name] = hardcoded_insights_json[query_name]
-            for item in res_insights_json[query_name]['insights']:
-                item['last_updated'] = datetime.now().strftime("%Y-%m-%d %H:%M:%S.%f")
-            put_value(redis_client, 'test', res_insights_json)
-            return jsonify(res_insights_json)
-        else:
-            return jsonify(res_insights_json)
-    else:
-        if datetime.now() - last_updated > timedelta(seconds=5):
-            hardcoded_insights_json['last_updated'] = datetime.now().strftime("%Y-%m-%d %H:%M:%S.%f")
-            for q_name, query_details in hardcoded_insights_json.items():
-                if q_name != 'last_updated':
-                    for item in query_details['insights']:
-                        item['last_updated'] = datetime.now().strftime("%Y-%m-%d %H:%M:%S.%f")
-            # query here 
-            put_value(redis_client, 'test', hardcoded_insights_json)
-            return jsonify(hardcoded_insights_json)
-        else:
-            res_insights_json = get_value(redis_client, 'test')
-            return jsonify(res_insights_json)
+    last_updated = [value['last_updated'] for value in res_insights_json.values() if 'last_updated' in value]
+    res_insights_json['last_updated'] = max(last_updated) if last_updated else None
+
+    return Response(serializer.dumps_bytes(res_insights_json), mimetype="application/json")
     
+@app.route('/events', methods=['GET'])
+def events():
+    """Server-sent events of the insights of a subcluster that changed: on connect the cached
+    values updated after since (every one without it), then each update published by refresh_worker.py."""
+    subcluster_name = request.args.get('subcluster_name')
+    since = request.args.get('since')
+
+    if not subcluster_name:
+        return jsonify({"error": "Missing subcluster_name"}), 400
+
+    def stream():
+        # subscribed before reading the cache, an update published in between is not lost
+        pubsub = redis_client.pubsub(ignore_subscribe_messages=True)
+        pubsub.subscribe(get_updates_channel(subcluster_name))
+        try:
+            values = get_fields(redis_client, get_insights_key(subcluster_name), list(get_refresh_intervals(QUERY_FILE_PATH)))
+            for query_name, value in get_updated_since(values, since).items():
+                yield get_event(query_name, value)
+
+            while True:
+                message = pubsub.get_message(timeout=KEEPALIVE_SECS)
+                if message is None:
+                    yield KEEPALIVE_EVENT
+                    continue
+                for query_name, value in decode_value(message["data"]).items():
+                    yield get_event(query_name, value)
+        finally:
+            pubsub.close()
+
+    return Response(stream(), mimetype="text/event-stream", headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+@app.route('/metrics', methods=['GET'])
+def metrics():
+    """Time spent per report stage and catalog query by the recomputes of this process."""
+    return Response(profiler.to_prometheus(), mimetype="text/plain; version=0.0.4")
+
 if __name__ == "__main__":
     app.run(host="0.0.0.0", port=5500, debug=True)
\ No newline at end of file
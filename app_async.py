@@ -0,0 +1,229 @@
+"""Asyncio version of app.py (Quart, same routes and templates), for dashboards with many
+open connections: redis is read without blocking and the Vertica recomputes run on an
+executor, so a slow recompute does not hold the other requests.
+
+/events?subcluster_name= streams the insights of the queries that changed as server-sent
+events, {query_name: insights}, as soon as a recompute (of any process) publishes them.
+
+    hypercorn app_async:app --bind 0.0.0.0:5500
+"""
+import asyncio
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from quart import Quart, request, jsonify, render_template, make_response, Response
+from quart_cors import cors
+from modules.catalog import get_refresh_intervals
+from modules import serializer
+from modules.events import get_event, get_updated_since, KEEPALIVE_SECS, KEEPALIVE_EVENT
+from modules.redis import connect_to_redis, connect_to_async_redis, decode_value, get_insights_key, get_lock_key, get_field_async, get_fields_async, acquire_lock_async, release_lock_async, get_update_subcluster, UPDATES_CHANNEL_PATTERN
+from modules.profiler import profiler
+from refresh_worker import refresh_query, is_stale, LOCK_TTL_SECS
+
+app = cors(Quart(__name__))
+
+QUERY_FILE_PATH = "queries.json"
+SUBCLUSTER_NAME = "secondary_subcluster_1"
+# how long a background refresh waits for a recompute already running elsewhere
+REFRESH_WAIT_SECS = 30
+# the recomputes share the Vertica connection of the process, it runs one statement at a time
+vertica_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="vertica")
+# refresh_query writes the insights from the executor, with the blocking client
+redis_client = connect_to_redis()
+async_redis_client = connect_to_async_redis()
+# recomputes run in this process are timed for /metrics
+profiler.enable()
+
+
+class InsightUpdates:
+    """Event stream subscribers per subcluster, fed by listen_for_updates."""
+    def __init__(self):
+        self.subscribers = defaultdict(set)
+
+    def subscribe(self, subcluster_name):
+        queue = asyncio.Queue()
+        self.subscribers[subcluster_name].add(queue)
+        return queue
+
+    def unsubscribe(self, subcluster_name, queue):
+        self.subscribers[subcluster_name].discard(queue)
+        if not self.subscribers[subcluster_name]:
+            del self.subscribers[subcluster_name]
+
+    def publish(self, subcluster_name, query_name, value):
+        for queue in self.subscribers.get(subcluster_name, ()):
+            queue.put_nowait((query_name, value))
+
+
+insight_updates = InsightUpdates()
+
+
+async def listen_for_updates():
+    """Forwards the updates published by refresh_worker.refresh_query (in any process) to the event streams."""
+    while True:
+        pubsub = async_redis_client.pubsub()
+        try:
+            await pubsub.psubscribe(UPDATES_CHANNEL_PATTERN)
+            async for message in pubsub.listen():
+                if message["type"] != "pmessage":
+                    continue
+                subcluster_name = get_update_subcluster(message["channel"])
+                for query_name, value in decode_value(message["data"]).items():
+                    insight_updates.publish(subcluster_name, query_name, value)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            print(f"Error while listening for insight updates: {e}")
+            await asyncio.sleep(1)
+        finally:
+            # each retry subscribes on a new connection, the one that failed goes back to the pool
+            await pubsub.aclose()
+
+
+async def refresh_insights(subcluster_name, query_name, wait_secs=REFRESH_WAIT_SECS):
+    """refresh_worker.refresh_query_single_flight without blocking the event loop: the lock is
+    taken and waited for on the asyncio connection, only the recompute runs on the executor.
+
+    Returns the value cached afterwards.
+    """
+    loop = asyncio.get_running_loop()
+    lock_key = get_lock_key(subcluster_name, query_name)
+    token = await acquire_lock_async(async_redis_client, lock_key, LOCK_TTL_SECS)
+
+    if token is None:
+        deadline = loop.time() + wait_secs
+        while loop.time() < deadline and await async_redis_client.exists(lock_key):
+            await asyncio.sleep(0.2)
+    else:
+        try:
+            await loop.run_in_executor(vertica_executor, refresh_query, redis_client, QUERY_FILE_PATH, subcluster_name, query_name)
+        finally:
+            await release_lock_async(async_redis_client, lock_key, token)
+
+    return await get_field_async(async_redis_client, get_insights_key(subcluster_name), query_name)
+
+
+# background recomputes started by the requests and event streams, one per (subcluster, query) in this process
+refresh_tasks = {}
+# (subcluster, query) -> error of its last recompute, until one succeeds
+refresh_errors = {}
+
+
+async def refresh_insights_logged(subcluster_name, query_name):
+    try:
+        await refresh_insights(subcluster_name, query_name)
+        refresh_errors.pop((subcluster_name, query_name), None)
+    except (Exception, SystemExit) as e:
+        print(f"Error while refreshing {query_name} on {subcluster_name}: {e}")
+        refresh_errors[(subcluster_name, query_name)] = str(e) or type(e).__name__
+    finally:
+        refresh_tasks.pop((subcluster_name, query_name), None)
+
+
+def start_refresh(subcluster_name, query_name):
+    if (subcluster_name, query_name) not in refresh_tasks:
+        refresh_tasks[(subcluster_name, query_name)] = asyncio.create_task(refresh_insights_logged(subcluster_name, query_name))
+
+
+async def get_insights(subcluster_name, query_name=''):
+    """The /globalrefresh payload: the cached insights of every query. A stale query_name is
+    served as cached, flagged stale, and recomputed in the background."""
+    intervals = get_refresh_intervals(QUERY_FILE_PATH)
+
+    values = await get_fields_async(async_redis_client, get_insights_key(subcluster_name), list(intervals))
+    res_insights_json = {name: value for name, value in values.items() if value is not None}
+
+    if query_name != '' and query_name in intervals and is_stale(values.get(query_name), intervals[query_name]):
+        start_refresh(subcluster_name, query_name)
+        if query_name in res_insights_json:
+            res_insights_json[query_name]['stale'] = True
+            if (subcluster_name, query_name) in refresh_errors:
+                res_insights_json[query_name]['refresh_error'] = refresh_errors[(subcluster_name, query_name)]
+
+    last_updated = [value['last_updated'] for value in res_insights_json.values() if 'last_updated' in value]
+    res_insights_json['last_updated'] = max(last_updated) if last_updated else None
+    return res_insights_json
+
+
+@app.before_serving
+async def start_listening():
+    app.updates_listener = asyncio.create_task(listen_for_updates())
+
+
+@app.after_serving
+async def stop_listening():
+    app.updates_listener.cancel()
+
+
+@app.route("/")
+async def index():
+    data = await get_insights(SUBCLUSTER_NAME)
+    return await render_template("dashboard.html", data=data, subcluster_name=SUBCLUSTER_NAME)
+
+
+@app.route("/refresh", methods=["GET"])
+async def refresh():
+    query_name = request.args.get("query_name")
+    if not query_name:
+        return jsonify({"error": "Missing query_name"}), 400
+
+    data = await get_insights(SUBCLUSTER_NAME, query_name)
+    return await render_template("dashboard.html", data=data, subcluster_name=SUBCLUSTER_NAME)
+
+
+@app.route('/globalrefresh', methods=['GET'])
+async def globalrefresh():
+    """Serves the insights cached in redis by refresh_worker.py."""
+    subcluster_name = request.args.get('subcluster_name')
+    query_name = request.args.get('query_name', '')
+
+    if not subcluster_name:
+        return jsonify({"error": "Missing subcluster_name"}), 400
+
+    return Response(serializer.dumps_bytes(await get_insights(subcluster_name, query_name)), mimetype="application/json")
+
+
+@app.route('/events', methods=['GET'])
+async def events():
+    """Server-sent events of the insights of a subcluster that changed: on connect the cached
+    values updated after since (every one without it), then each published update.
+    Stale queries are recomputed on connect."""
+    subcluster_name = request.args.get('subcluster_name')
+    since = request.args.get('since')
+    if not subcluster_name:
+        return jsonify({"error": "Missing subcluster_name"}), 400
+
+    async def stream():
+        # subscribed before reading the cache, a recompute finishing in between is not lost
+        queue = insight_updates.subscribe(subcluster_name)
+        try:
+            intervals = get_refresh_intervals(QUERY_FILE_PATH)
+            values = await get_fields_async(async_redis_client, get_insights_key(subcluster_name), list(intervals))
+            for query_name, value in get_updated_since(values, since).items():
+                yield get_event(query_name, value)
+            for query_name, value in values.items():
+                if is_stale(value, intervals[query_name]):
+                    start_refresh(subcluster_name, query_name)
+
+            while True:
+                try:
+                    query_name, value = await asyncio.wait_for(queue.get(), KEEPALIVE_SECS)
+                except asyncio.TimeoutError:
+                    yield KEEPALIVE_EVENT
+                    continue
+                yield get_event(query_name, value)
+        finally:
+            insight_updates.unsubscribe(subcluster_name, queue)
+
+    response = await make_response(stream(), {"Content-Type": "text/event-stream", "Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+    response.timeout = None
+    return response
+
+
+@app.route('/metrics', methods=['GET'])
+async def metrics():
+    """Time spent per report stage and catalog query by the recomputes of this process."""
+    return Response(profiler.to_prometheus(), mimetype="text/plain; version=0.0.4")
+
+
+if __name__ == "__main__":
+    app.run(host="0.0.0.0", port=5500)
@@ -0,0 +1,139 @@
+#!/usr/bin/env python3
+"""Micro-benchmark: precompiled query templates vs the regex based replace_conditions.
+
+Renders every query / query_past of the shipped queries.json with a typical set of
+filters and checks both implementations produce the same SQL.
+
+    python benchmarks/replace_conditions.py [--iterations 2000]
+"""
+import argparse
+import os
+import re
+import sys
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from modules.catalog import get_queries_catalog
+from modules.query_template import render_template
+
+
+def replace_conditions_regex(query, conditions_dict):
+    """replace_conditions as it was before query templates, kept for comparison."""
+    query = query.lower()
+    pattern = re.compile(r'\{([^}]+)\}')
+
+    matches = pattern.findall(query)
+
+    for match in matches:
+        condition_parts = [
+            part.strip()
+            for part in re.split(r'(?i)([<>!=]=?|[><]=?|\b(?:ILIKE|LIKE|IS\s+NOT|IS)\b)', match, 1)
+        ]
+        if len(condition_parts) == 3:
+            column_name = condition_parts[0].strip()
+            operator = condition_parts[1].strip()
+            placeholder = match.split(operator, 1)[1].strip()
+            placeholder = placeholder.strip("'")
+
+            flag = 0
+            if placeholder.startswith("%") and placeholder.endswith("%"):
+                flag = 3
+            elif placeholder.startswith("%"):
+                flag = 1
+            elif placeholder.endswith("%"):
+                flag = 2
+
+            if placeholder in conditions_dict:
+                value = conditions_dict[placeholder]
+
+                if isinstance(value, int) or isinstance(value, float) or placeholder=='session_type_2':
+                    if placeholder=='session_type_2':
+                        new_condition = f"OR {column_name} {operator} {value}"
+                    else:
+                        new_condition = f"AND {column_name} {operator} {value}"
+                else:
+                    if flag == 3:
+                        new_condition = f"AND {column_name} {operator} '%{value}%'"
+                    elif flag == 1:
+                        new_condition = f"AND {column_name} {operator} '%{value}'"
+                    elif flag == 2:
+                        new_condition = f"AND {column_name} {operator} '{value}%'"
+                    else:
+                        new_condition = f"AND {column_name} {operator} '{value}'"
+
+                query = query.replace(f"{{{match}}}", new_condition)
+        elif len(condition_parts) == 1:
+            placeholder = condition_parts[0].strip("'")
+            if placeholder in conditions_dict:
+                value = conditions_dict[placeholder]
+
+                if isinstance(value, int)  or isinstance(value, float) or placeholder=="err_type" or placeholder=="order_by" or placeholder=='session_type' or placeholder=='dimension_replacements' or placeholder=='groupby_replacements':
+                    new_condition = f"{value}"
+                else:
+                    new_condition = f"'{value}'"
+
+                query = query.replace(f"{{{match}}}", new_condition)
+
+    return re.sub(r'\{[^}]*\}', '', query).strip()
+
+
+FILTERS = {
+    "subcluster_name": "secondary_subcluster_1",
+    "pool_name": "upload_pool",
+    "user_name": "upload",
+    "issue_time": "2025-02-07 18:43:12",
+    "duration": 3.0,
+    "num_items": 5,
+    "granularity": "hour",
+    "snapshots": 5,
+    "user_limit": 5,
+    "issue_level": "warn",
+    "session_type": "is not",
+    "schema_name": "public",
+    "projection_name": "orders_%",
+    "txn_id": "117093590328410146",
+    "statement_id": "1",
+    "order_by": "cnt,",
+}
+
+
+def get_templates(json_file_path):
+    templates = []
+    for row in get_queries_catalog(json_file_path).entries():
+        for key in ("query", "query_past"):
+            if row.get(key) and "select null" not in row[key].lower():
+                templates.append(row[key])
+    return templates
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--inputfilepath", default="queries.json")
+    parser.add_argument("--iterations", type=int, default=2000)
+    args = parser.parse_args()
+
+    templates = get_templates(args.inputfilepath)
+
+    for template in templates:
+        expected, actual = replace_conditions_regex(template, FILTERS), render_template(template, FILTERS)
+        if expected != actual:
+            print(f"Mismatch:\n  regex:    {expected}\n  template: {actual}")
+            sys.exit(1)
+
+    def run(func):
+        for template in templates:
+            func(template, FILTERS)
+
+    regex_secs = timeit.timeit(lambda: run(replace_conditions_regex), number=args.iterations)
+    template_secs = timeit.timeit(lambda: run(render_template), number=args.iterations)
+    renders = args.iterations * len(templates)
+
+    print(f"{len(templates)} templates x {args.iterations} iterations")
+    print(f"replace_conditions (regex): {regex_secs * 1e6 / renders:8.2f} us/render")
+    print(f"compiled template:          {template_secs * 1e6 / renders:8.2f} us/render")
+    print(f"speedup:                    {regex_secs / template_secs:8.2f}x")
+
+
+if __name__ == "__main__":
+    main()
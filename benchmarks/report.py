@@ -0,0 +1,200 @@
+#!/usr/bin/env python3
+"""End-to-end benchmark of the report against a local Vertica stand-in (benchmarks/standin.py).
+
+Times replace_conditions, analyse, query_breakdown, execute_queries_from_json (plain,
+--insights-only, --with-insights, --pushdown-thresholds and --issue-time with and without
+the result cache) and the building and encoding of the insights on synthetic system
+tables, and prints the results as json so two revisions can be compared:
+
+    python benchmarks/report.py --scale 1 --repeat 5 > before.json
+    python benchmarks/report.py --scale 10 --output after.json
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.standin import seed_database, use_standin, get_scaled_counts, SUBCLUSTER_NAME
+import vertica_debug_report
+from modules.args_parser import get_args, pargse_args
+from modules.catalog import get_queries_catalog
+from modules import serializer, result_cache
+from modules.helpers import replace_conditions, push_to_insights_json
+from vertica import vertica
+
+
+def measure(function, repeat):
+    """Runs function repeat times with its output discarded, returns the timings summary."""
+    timings = []
+    for _ in range(repeat):
+        with contextlib.redirect_stdout(io.StringIO()):
+            start = time.perf_counter()
+            function()
+            timings.append(time.perf_counter() - start)
+    return {
+        "repeat": repeat,
+        "best_secs": min(timings),
+        "mean_secs": sum(timings) / len(timings),
+        "worst_secs": max(timings),
+    }
+
+
+def get_revision():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True).stdout.strip()
+    except Exception:
+        return None
+
+
+def get_report_args(json_file_path, *extra_args):
+    argv = ["--subcluster-name", SUBCLUSTER_NAME, "--inputfilepath", json_file_path, *extra_args]
+    return pargse_args(False, argv=argv)
+
+
+def benchmark_replace_conditions(json_file_path):
+    filters = get_report_args(json_file_path)[0]
+    conditions = {key: val for key, val in filters.items() if val is not None}
+    templates = [template for row in get_queries_catalog(json_file_path).entries() for template in (row["query"], row.get("query_past", "")) if template]
+
+    def run():
+        for template in templates:
+            replace_conditions(template, conditions)
+    return run
+
+
+def benchmark_report(json_file_path, *extra_args):
+    filters, is_now, insights_only, with_insights, json_file_path, queries_to_execute = get_report_args(json_file_path, *extra_args)
+
+    def run():
+        vertica_debug_report.execute_queries_from_json({}, json_file_path, filters, filters['verbose'], is_now, insights_only, with_insights, queries_to_execute)
+    return run
+
+
+def get_past_issue_time():
+    """An --issue-time an hour back, the seeded window then has closed buckets the result cache keeps."""
+    return (datetime.now() - timedelta(hours=1)).strftime("%Y-%m-%d %H:%M:%S")
+
+
+def benchmark_cached_report(json_file_path, *extra_args):
+    """benchmark_report once untimed, so the timed runs read the closed buckets from the result cache."""
+    run = benchmark_report(json_file_path, *extra_args)
+    with contextlib.redirect_stdout(io.StringIO()):
+        run()
+    return run
+
+
+def benchmark_analyse(json_file_path, query_name):
+    filters, is_now, _, _, json_file_path, _ = get_report_args(json_file_path, "--insights-only")
+    job = [job for job in vertica_debug_report.prepare_catalog_queries(get_queries_catalog(json_file_path).entries(), filters, is_now, [query_name], True) if job["query_name"] == query_name][0]
+    connection = vertica.get_shared_vertica_connection()
+    query_result, column_headers = vertica_debug_report.execute_catalog_query(connection, job["final_query"])
+
+    def run():
+        vertica_debug_report.analyse(job["qid"], {}, job["final_query"], False, query_name, [list(row) for row in query_result], job["query_description"], column_headers, True, False,
+            filters["duration"], filters["pool_name"], filters["issue_level"], is_now, filters["user_name"], filters["subcluster_name"], filters["issue_time"], connection, filters, job["show_limit"])
+    return run, len(query_result or [])
+
+
+def benchmark_push_insights():
+    messages = [
+        ("[\033[92mOK\033[0m] No long running queries.", "OK"),
+        ("[\033[93mWARN\033[0m] 3 queries are running for more than 0:05:00 by ['user_1', 'user_2']", "WARN"),
+        ("[\033[91mFATAL\033[0m] 2 queries are running for more than 0:30:00 by ['user_3']", "FATAL"),
+    ]
+
+    def run():
+        insights_json = {}
+        for qid in range(1000):
+            for message, level in messages:
+                push_to_insights_json(qid, insights_json, message, level, f"query_{qid % 20}")
+    return run
+
+
+def benchmark_encode_insights(json_file_path):
+    """Encoding of the insights of a --insights-only report, as cached in redis and served by /globalrefresh."""
+    filters, is_now, insights_only, with_insights, json_file_path, queries_to_execute = get_report_args(json_file_path, "--insights-only")
+    insights_json = {}
+    with contextlib.redirect_stdout(io.StringIO()):
+        vertica_debug_report.execute_queries_from_json(insights_json, json_file_path, filters, filters['verbose'], is_now, insights_only, with_insights, queries_to_execute)
+
+    def run():
+        for _ in range(100):
+            serializer.dumps_bytes(insights_json)
+    return run
+
+
+def benchmark_query_breakdown():
+    args = get_args(False, ["--subcluster-name", SUBCLUSTER_NAME, "--queries-to-execute", "query_breakdown", "--granularity", "hour"])
+
+    def run():
+        vertica_debug_report.execute_query_breakdown(args, True, False)
+    return run
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmarks the report against a local Vertica stand-in.")
+    parser.add_argument("--scale", type=int, default=1, help="Multiplier of the synthetic table sizes.")
+    parser.add_argument("--repeat", type=int, default=5, help="Runs per benchmark.")
+    parser.add_argument("--inputfilepath", default="queries.json", help="Path of the catalog to benchmark.")
+    parser.add_argument("--database", default=None, help="Stand-in database file, re-seeded on every run (default: a temporary file).")
+    parser.add_argument("--output", default=None, help="Write the json results to this file instead of stdout.")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        database = args.database or os.path.join(directory, "standin.sqlite")
+        seed_start = time.perf_counter()
+        use_standin(seed_database(database, args.scale))
+        seed_secs = time.perf_counter() - seed_start
+        # the --issue-time runs start with an empty result cache, not the one of the user
+        result_cache.RESULT_CACHE_PATH = os.path.join(directory, "result_cache.sqlite")
+        issue_time = get_past_issue_time()
+
+        # the report header is printed once per process, print it before timing anything
+        with contextlib.redirect_stdout(io.StringIO()):
+            vertica_debug_report.print_report_header(get_report_args(args.inputfilepath)[0], True)
+
+        results = {
+            "replace_conditions": measure(benchmark_replace_conditions(args.inputfilepath), args.repeat),
+            "execute_queries_from_json": measure(benchmark_report(args.inputfilepath), args.repeat),
+            "execute_queries_from_json_insights_only": measure(benchmark_report(args.inputfilepath, "--insights-only"), args.repeat),
+            "execute_queries_from_json_with_insights": measure(benchmark_report(args.inputfilepath, "--with-insights"), args.repeat),
+            "execute_queries_from_json_pushdown_thresholds": measure(benchmark_report(args.inputfilepath, "--insights-only", "--pushdown-thresholds"), args.repeat),
+            "execute_queries_from_json_issue_time": measure(benchmark_report(args.inputfilepath, "--issue-time", issue_time, "--no-result-cache"), args.repeat),
+            "execute_queries_from_json_issue_time_cached": measure(benchmark_cached_report(args.inputfilepath, "--issue-time", issue_time), args.repeat),
+            "query_breakdown": measure(benchmark_query_breakdown(), args.repeat),
+            "push_insights": measure(benchmark_push_insights(), args.repeat),
+            "encode_insights": measure(benchmark_encode_insights(args.inputfilepath), args.repeat),
+        }
+        for query_name in ("sessions", "delete_vectors", "query_count"):
+            run, rows = benchmark_analyse(args.inputfilepath, query_name)
+            results[f"analyse_{query_name}"] = {"rows": rows, **measure(run, args.repeat)}
+
+        vertica.close_shared_connections()
+
+    output = json.dumps({
+        "revision": get_revision(),
+        "python": platform.python_version(),
+        "scale": args.scale,
+        "tables": get_scaled_counts(args.scale),
+        "seed_secs": seed_secs,
+        "results": results,
+    }, indent=4)
+
+    if args.output:
+        with open(args.output, "w") as output_file:
+            output_file.write(output + "\n")
+    else:
+        print(output)
+
+
+if __name__ == "__main__":
+    main()
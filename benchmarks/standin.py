@@ -0,0 +1,339 @@
+"""A local stand-in for Vertica: synthetic system tables in SQLite.
+
+SQLite can not run the Vertica dialect of queries.json (date_trunc, interval
+arithmetic, :: casts), so each catalog query is recognised by the tables and
+columns it reads and answered by an SQLite query returning the same columns.
+Only the trailing LIMIT of a statement is applied, its WHERE filters (user_name,
+issue_time and duration, ...) are not: every statement reads the whole seeded window.
+The --pushdown-thresholds summaries (modules.thresholds.get_summary_query) are answered
+by classifying the rows of the query they wrap in SQLite. Statements nobody recognises
+return no rows.
+
+    from benchmarks.standin import seed_database, use_standin
+    use_standin(seed_database(path, scale=1))
+"""
+import os
+import random
+import re
+import sqlite3
+import sys
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from modules.catalog import get_thresholds_catalog
+from modules.thresholds import get_thresholds
+
+SUBCLUSTER_NAME = "secondary_subcluster_1"
+TIMESTAMP_FORMAT = "%Y-%m-%d %H:%M:%S"
+# columns vertica_python returns as datetime, SQLite keeps them as text
+TIMESTAMP_COLUMNS = {"snapshot_time", "statement_start", "event_timestamp_trunc", "query_start", "query_start_trunc", "DATE_TRUNC"}
+SUMMARY_PREFIX = "select count(1) as row_cnt, "
+SUMMARY_INNER = re.compile(r"^(select .*? from \(select q\.\*, .*? from \()(.*)(\) q\) t);?\s*$", re.IGNORECASE | re.DOTALL)
+TRAILING_LIMIT = re.compile(r"\blimit\s+(\d+)\s*;?\s*$", re.IGNORECASE)
+
+
+def get_scaled_counts(scale):
+    """Rows seeded per table at a scale, scale 1 is a small busy cluster."""
+    return {
+        "nodes": 6,
+        "users": 20 * scale,
+        "sessions": 400 * scale,
+        "resource_queues": 200 * scale,
+        "storage_containers": 5000 * scale,
+        "error_messages": 2000 * scale,
+        "query_profiles": 20000 * scale,
+        "snapshots": 12,
+    }
+
+
+def seed_database(path, scale=1, seed=42):
+    """Creates the stand-in database at path (replaced if it exists), returns path."""
+    if os.path.exists(path):
+        os.remove(path)
+    netstats_path = path + ".netstats"
+    if os.path.exists(netstats_path):
+        os.remove(netstats_path)
+
+    counts = get_scaled_counts(scale)
+    rng = random.Random(seed)
+    now = datetime.now().replace(microsecond=0)
+
+    def timestamp(max_age_secs):
+        return (now - timedelta(seconds=rng.randint(0, max_age_secs))).strftime(TIMESTAMP_FORMAT)
+
+    nodes = [(f"v_node{i:04d}", f"10.0.0.{i}", SUBCLUSTER_NAME if i % 2 else "primary_subcluster_1", "UP") for i in range(1, counts["nodes"] + 1)]
+    node_names = [node[0] for node in nodes]
+    users = [f"user_{i}" for i in range(counts["users"])]
+    # a few users hold most of the sessions, so thresholds are crossed at every scale
+    user_weights = [1.0 / (i + 1) for i in range(len(users))]
+    pools = [f"{user}_pool" for user in users]
+
+    connection = sqlite3.connect(path)
+    connection.execute(f"ATTACH DATABASE '{netstats_path}' AS netstats")
+
+    connection.execute("create table nodes (node_name text, node_address text, subcluster_name text, node_state text)")
+    connection.executemany("insert into nodes values (?, ?, ?, ?)", nodes)
+
+    connection.execute("create table sessions (node_name text, user_name text, transaction_id integer, statement_id integer, statement_start text)")
+    connection.executemany("insert into sessions values (?, ?, ?, ?, ?)", [
+        (rng.choice(node_names), rng.choices(users, user_weights)[0], i, rng.choice([None, 1, 2]), timestamp(3 * 3600))
+        for i in range(counts["sessions"])
+    ])
+
+    connection.execute("create table netstats.sessions_full (snapshot_time text, node_name text, user_name text, transaction_id integer, statement_id integer, statement_start text)")
+    for snapshot in range(counts["snapshots"]):
+        snapshot_time = (now - timedelta(minutes=15 * snapshot)).strftime(TIMESTAMP_FORMAT)
+        connection.execute("insert into netstats.sessions_full select ?, node_name, user_name, transaction_id, statement_id, statement_start from sessions where abs(random()) % 2 = 0", (snapshot_time,))
+
+    connection.execute("create table resource_queues (node_name text, pool_name text)")
+    connection.executemany("insert into resource_queues values (?, ?)", [
+        (rng.choice(node_names), rng.choices(pools, user_weights)[0]) for _ in range(counts["resource_queues"])
+    ])
+
+    connection.execute("create table netstats.resource_queues_full (snapshot_time text, node_name text, pool_name text)")
+    for snapshot in range(counts["snapshots"]):
+        snapshot_time = (now - timedelta(minutes=15 * snapshot)).strftime(TIMESTAMP_FORMAT)
+        connection.execute("insert into netstats.resource_queues_full select ?, node_name, pool_name from resource_queues where abs(random()) % 2 = 0", (snapshot_time,))
+
+    connection.execute("create table resource_pool_status (node_name text, pool_name text, memory_size_kb integer, general_memory_borrowed_kb integer, max_memory_size_kb integer, running_query_count integer, memory_inuse_kb integer)")
+    connection.executemany("insert into resource_pool_status values (?, ?, ?, ?, ?, ?, ?)", [
+        (node_name, pool_name, rng.randint(0, 10**7), rng.randint(0, 10**6), 10**7, rng.randint(0, 50), rng.randint(0, 10**7))
+        for node_name in node_names for pool_name in pools[:5] + ["metadata"]
+    ])
+
+    connection.execute("create table storage_containers (node_name text, schema_name text, projection_name text, total_row_count integer, deleted_row_count integer, delete_vector_count integer, used_bytes integer)")
+    projections = max(1, counts["storage_containers"] // 20)
+    connection.executemany("insert into storage_containers values (?, ?, ?, ?, ?, ?, ?)", [
+        (rng.choice(node_names), f"schema_{i % 7}", f"projection_{i % projections}_b0", rng.randint(10**3, 10**6),
+         rng.choice([0, 0, 0, rng.randint(0, 10**4)]), rng.choice([0, 0, rng.randint(0, 80)]), rng.randint(10**6, 10**9))
+        for i in range(counts["storage_containers"])
+    ])
+
+    messages = ["Insufficient resources to execute plan on pool", "Request exceeds memory limit", "New session rejected due to limit, already 1000 sessions active", "Syntax error at or near"]
+    connection.execute("create table error_messages (node_name text, event_timestamp text, user_name text, transaction_id integer, statement_id integer, message text)")
+    connection.executemany("insert into error_messages values (?, ?, ?, ?, ?, ?)", [
+        (rng.choice(node_names), timestamp(3 * 3600), rng.choice(users), i, 1, rng.choice(messages)) for i in range(counts["error_messages"])
+    ])
+
+    connection.execute("create table netstats.query_profiles (node_name text, user_name text, query_start text, query_duration_us integer, processed_row_count integer, is_executing integer, transaction_id integer, statement_id integer, query text)")
+    connection.executemany("insert into netstats.query_profiles values (?, ?, ?, ?, ?, ?, ?, ?, ?)", [
+        (rng.choice(node_names), rng.choices(users, user_weights)[0], timestamp(3 * 3600), int(rng.expovariate(1 / 2e6)), rng.randint(0, 10**6), 0, i, 1,
+         f"select * from s_{rng.randint(10, 99)}.table_{i % 50} where cid = {rng.randint(1, 500)}")
+        for i in range(counts["query_profiles"])
+    ])
+
+    connection.commit()
+    connection.close()
+    return path
+
+
+def get_routes(thresholds_file_path="thresholds.json"):
+    """(markers, sqlite query) pairs, the first route whose markers all appear in the
+    lowercased statement answers it."""
+    thresholds = get_thresholds_catalog(thresholds_file_path)
+
+    def limits(query_name, default_warn, default_fatal):
+        threshold = thresholds.get(query_name)
+        if threshold is None:
+            return default_warn, default_fatal
+        _, warn, fatal = get_thresholds(threshold['columns'][0]['threshold'])
+        return warn, fatal
+
+    sessions_warn, sessions_fatal = limits("sessions", 50, 100)
+    queues_warn, queues_fatal = limits("resource_queues", 50, 100)
+    errors_warn, errors_fatal = limits("error_messages", 1, 2)
+    running_warn, running_fatal = limits("long_running_queries", 10, 30)
+    hour = "strftime('%Y-%m-%d %H:00:00', {column})"
+    running_minutes = "(julianday('now', 'localtime') - julianday(s.statement_start)) * 1440"
+
+    return [
+        (("select node_name, node_address, subcluster_name from nodes",),
+         "select node_name, node_address, subcluster_name from nodes"),
+        (("total_nodes",),
+         "select count(1) total_nodes, sum(case when node_state = 'UP' then 0 else 1 end) down_nodes from nodes"),
+        (("storage_containers",),
+         "select node_name, schema_name, projection_name, count(1) as containers_cnt, sum(total_row_count) as total_row_cnt, sum(deleted_row_count) as deleted_row_cnt, "
+         "sum(delete_vector_count) as delete_vector_cnt, sum(used_bytes)/(1024*1024*1024) as total_used_gbs from storage_containers "
+         "group by node_name, schema_name, projection_name order by delete_vector_cnt desc"),
+        (("resource_queues_full",),
+         f"select snapshot_time, s.pool_name, n.subcluster_name, count(1) as cnt, case when count(1) > {queues_fatal} then 'fatal' when count(1) > {queues_warn} then 'warn' else 'ok' end as status "
+         f"from netstats.resource_queues_full as s join nodes as n on n.node_name = s.node_name where n.subcluster_name = '{SUBCLUSTER_NAME}' "
+         "group by snapshot_time, s.pool_name, n.subcluster_name order by cnt desc"),
+        (("resource_queues",),
+         f"select n.subcluster_name, rq.pool_name, count(1) as cnt, case when count(1) > {queues_fatal} then 'fatal' when count(1) > {queues_warn} then 'warn' else 'ok' end as status "
+         f"from resource_queues as rq join nodes as n on n.node_name = rq.node_name where n.subcluster_name = '{SUBCLUSTER_NAME}' "
+         "group by n.subcluster_name, rq.pool_name order by cnt desc"),
+        (("resource_pool_status",),
+         "select n.subcluster_name, memory_size_kb, general_memory_borrowed_kb, max_memory_size_kb, running_query_count from resource_pool_status as s "
+         "join nodes as n on n.node_name = s.node_name where pool_name = 'metadata' order by memory_size_kb desc"),
+        (("sessions_full", "running_time"),
+         f"select snapshot_time, s.user_name, case when {running_minutes} > {running_fatal} then 'fatal' else 'warn' end as status, count(1) as cnt "
+         f"from netstats.sessions_full as s join nodes as n on n.node_name = s.node_name where n.subcluster_name = '{SUBCLUSTER_NAME}' and s.statement_id is not null "
+         f"and {running_minutes} > {running_warn} group by snapshot_time, s.user_name, status order by cnt desc"),
+        (("sessions_full",),
+         f"select snapshot_time, n.subcluster_name, s.user_name, count(1) as cnt, case when count(1) > {sessions_fatal} then 'fatal' when count(1) > {sessions_warn} then 'warn' else 'ok' end as status "
+         f"from netstats.sessions_full as s join nodes as n on n.node_name = s.node_name where n.subcluster_name = '{SUBCLUSTER_NAME}' and s.statement_id is not null "
+         "group by snapshot_time, n.subcluster_name, s.user_name order by cnt desc"),
+        (("from sessions", "as status, count(1) as cnt"),
+         f"select s.user_name, case when {running_minutes} > {running_fatal} then 'fatal' when {running_minutes} > {running_warn} then 'warn' else 'ok' end as status, count(1) as cnt "
+         f"from sessions as s join nodes as n on n.node_name = s.node_name where n.subcluster_name = '{SUBCLUSTER_NAME}' and s.statement_id is not null "
+         f"and {running_minutes} > {running_warn} group by s.user_name, status order by cnt desc"),
+        (("from sessions", "count(1) as cnt"),
+         f"select n.subcluster_name, s.user_name, count(1) as cnt, case when count(1) > {sessions_fatal} then 'fatal' when count(1) > {sessions_warn} then 'warn' else 'ok' end as status "
+         f"from sessions as s join nodes as n on n.node_name = s.node_name where n.subcluster_name = '{SUBCLUSTER_NAME}' and s.statement_id is not null "
+         "group by n.subcluster_name, s.user_name order by cnt desc"),
+        (("error_messages", "1000 sessions"),
+         f"select n.subcluster_name, {hour.format(column='event_timestamp')} as event_timestamp_trunc, count(1) from error_messages as em "
+         f"join nodes as n on n.node_name = em.node_name where n.subcluster_name = '{SUBCLUSTER_NAME}' and message like '%1000 sessions%' "
+         "group by n.subcluster_name, event_timestamp_trunc order by event_timestamp_trunc desc"),
+        (("error_messages", "as type"),
+         f"select *, case when cnt >= {errors_fatal} then 'fatal' when cnt >= {errors_warn} then 'warn' else 'ok' end as status from ("
+         f"select n.subcluster_name, {hour.format(column='event_timestamp')} as event_timestamp_trunc, case when em.message like '%memory%' then 'memory' "
+         "when em.message like '%session%' then 'session' when em.message like '%resource%' then 'resource' else 'other' end as type, count(1) as cnt "
+         f"from error_messages as em join nodes as n on n.node_name = em.node_name where n.subcluster_name = '{SUBCLUSTER_NAME}' "
+         "group by event_timestamp_trunc, type, n.subcluster_name) as x order by cnt desc"),
+        (("query_profiles", "rank_in_hour"),
+         f"select n.subcluster_name, {hour.format(column='qp.query_start')} as query_start_trunc, qp.user_name, count(1) as cnt, avg(qp.query_duration_us)/1000000.0 as avg_query_duration_sec, "
+         "min(qp.query_duration_us)/1000000.0 as min_query_duration_sec, max(qp.query_duration_us)/1000000.0 as max_query_duration_sec, avg(qp.processed_row_count) as avg_processed_row_count "
+         f"from netstats.query_profiles as qp join nodes as n on n.node_name = qp.node_name where n.subcluster_name = '{SUBCLUSTER_NAME}' "
+         "group by n.subcluster_name, query_start_trunc, qp.user_name order by query_start_trunc desc, cnt desc"),
+        (("query_profiles", "lt_1_sec"),
+         f"select {hour.format(column='query_start')} as DATE_TRUNC, count(1), max(query_duration_us / 1000000) as max, min(query_duration_us / 1000000) as min, avg(query_duration_us / 1000000) as avg, "
+         "sum(case when query_duration_us < 1000000 then 1 else 0 end) lt_1_sec, sum(case when query_duration_us > 1000000 then 1 else 0 end) gt_1_sec, "
+         "sum(case when query_duration_us > 10000000 then 1 else 0 end) gt_10_sec from netstats.query_profiles group by 1 order by 1"),
+        (("query_profiles", "min_secs"),
+         f"select {hour.format(column='query_start')} as DATE_TRUNC, count(1) as query_count, min(query_duration_us)/1000000.0 min_secs, max(query_duration_us)/1000000.0 max_secs, "
+         "avg(query_duration_us)/1000000.0 avg_secs from netstats.query_profiles group by 1 order by 1"),
+        (("query_profiles", "is_executing"),
+         "select node_name, is_executing, processed_row_count, user_name, query_duration_us, query_start, statement_id, transaction_id, query from netstats.query_profiles limit 1"),
+    ]
+
+
+def translate_summary(sql):
+    """The Vertica of the classification around a summarised query in SQLite."""
+    sql = re.sub(r"\(([^()]*)\)::int\b", r"cast((\1) as integer)", sql)
+    sql = re.sub(r"\(([^()]*)\)::varchar\b", r"cast((\1) as text)", sql)
+    return re.sub(r"listagg\(distinct (.*?) using parameters separator=('[^']*'), max_length=\d+\)", r"listagg_distinct(\1, \2)", sql)
+
+
+class ListaggDistinct:
+    """listagg(distinct value using parameters separator=...) of Vertica, NULLs skipped."""
+    def __init__(self):
+        self.values = {}
+        self.separator = ","
+
+    def step(self, value, separator):
+        self.separator = separator
+        if value is not None:
+            self.values[value] = None
+
+    def finalize(self):
+        return self.separator.join(self.values) if self.values else None
+
+
+class StandInCursor:
+    """The parts of a vertica_python cursor the report uses."""
+    def __init__(self, connection):
+        self.connection = connection
+        self.description = None
+        self._cursor = None
+        self._pending = []
+        self._timestamp_indexes = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def _run(self, statement):
+        query = self.connection.translate(statement)
+        if query is None:
+            self._cursor = None
+            self.description = [("unknown",)]
+            return
+        self._cursor = self.connection.sqlite.execute(query)
+        self.description = self._cursor.description
+        self._timestamp_indexes = [i for i, column in enumerate(self.description) if column[0] in TIMESTAMP_COLUMNS]
+
+    def _convert(self, rows):
+        rows = [list(row) for row in rows]
+        for row in rows:
+            for i in self._timestamp_indexes:
+                if isinstance(row[i], str):
+                    row[i] = datetime.strptime(row[i], TIMESTAMP_FORMAT)
+        return rows
+
+    def execute(self, query):
+        # the batch_group requests send several statements at once
+        statements = [statement for statement in query.split(";\n") if statement.strip()]
+        self._pending = statements[1:]
+        self._run(statements[0])
+
+    def nextset(self):
+        if not self._pending:
+            return False
+        self._run(self._pending.pop(0))
+        return True
+
+    def fetchall(self):
+        return self._convert(self._cursor.fetchall()) if self._cursor else []
+
+    def fetchmany(self, size):
+        return self._convert(self._cursor.fetchmany(size)) if self._cursor else []
+
+    def close(self):
+        pass
+
+
+class StandInConnection:
+    def __init__(self, path, routes):
+        self.sqlite = sqlite3.connect(path, check_same_thread=False)
+        self.sqlite.execute(f"ATTACH DATABASE '{path}.netstats' AS netstats")
+        self.sqlite.create_aggregate("listagg_distinct", 2, ListaggDistinct)
+        self.routes = routes
+        self._cursor = StandInCursor(self)
+        self._closed = False
+
+    def route(self, statement):
+        """The SQLite query answering a catalog statement, None when no route knows it."""
+        lowered = statement.lower()
+        for markers, query in self.routes:
+            if all(marker in lowered for marker in markers):
+                limit = TRAILING_LIMIT.search(statement)
+                return f"select * from ({query}) limit {limit.group(1)}" if limit else query
+        return None
+
+    def translate(self, statement):
+        """route, and for a threshold summary the classification of the rows of the query it wraps."""
+        match = SUMMARY_INNER.match(statement.strip()) if statement.strip().lower().startswith(SUMMARY_PREFIX) else None
+        if match is None:
+            return self.route(statement)
+        inner = self.route(match.group(2))
+        if inner is None:
+            return None
+        return translate_summary(match.group(1)) + inner + translate_summary(match.group(3))
+
+    def cursor(self):
+        # vertica_python hands out a single cursor per connection
+        return self._cursor
+
+    def closed(self):
+        return self._closed
+
+    def cancel(self):
+        self.sqlite.interrupt()
+
+    def close(self):
+        self._closed = True
+        self.sqlite.close()
+
+
+def use_standin(path, thresholds_file_path="thresholds.json"):
+    """Makes vertica.get_vertica_connection open stand-in connections on the database at path."""
+    from vertica import vertica
+
+    routes = get_routes(thresholds_file_path)
+    vertica.connection_manager.close()
+    vertica.get_vertica_connection = lambda: StandInConnection(path, routes)
@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+"""Startup benchmark of the CLI: interpreter start to exit of --help, --list examples and
+a report run up to its first Vertica connection, along with the import time of the heavy
+modules each of them loads (python -X importtime). The report run connects to a closed
+local port so it measures what the command loads, not the cluster:
+
+    python benchmarks/startup.py --repeat 20 > before.json
+    python benchmarks/startup.py --repeat 20 --output after.json
+"""
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.report import get_revision
+
+SCRIPT_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "vertica_debug_report.py")
+
+COMMANDS = {
+    "interpreter": None,
+    "help": ["--help"],
+    "list_examples": ["--list", "examples"],
+    "report": ["--subcluster-name", "benchmark", "--queries-to-execute", "sessions"],
+}
+
+HEAVY_MODULES = ("vertica_python", "dotenv", "tabulate", "numpy", "argparse", "sqlite3", "concurrent.futures", "query_breakdown")
+
+UNREACHABLE_CONNECTION_STRING = "host=127.0.0.1;port=1;user=benchmark;password=benchmark;database=benchmark"
+
+
+def get_command(args, *options):
+    if args is None:
+        return [sys.executable, *options, "-c", "pass"]
+    return [sys.executable, *options, SCRIPT_PATH, *args]
+
+
+def get_env():
+    env = dict(os.environ, VERTICA_CONNECTION_STRING=UNREACHABLE_CONNECTION_STRING)
+    env.pop("PYTHONPROFILEIMPORTTIME", None)
+    return env
+
+
+def measure(args, repeat):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        subprocess.run(get_command(args), env=get_env(), cwd=os.path.dirname(SCRIPT_PATH), stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        timings.append(time.perf_counter() - start)
+    return {
+        "repeat": repeat,
+        "best_secs": min(timings),
+        "mean_secs": sum(timings) / len(timings),
+        "worst_secs": max(timings),
+    }
+
+
+def get_import_times(args):
+    """Total import time and the cumulative import time of every heavy module the command loads, in seconds."""
+    process = subprocess.run(get_command(args, "-X", "importtime"), env=get_env(), cwd=os.path.dirname(SCRIPT_PATH),
+        stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True)
+
+    total_us, modules = 0, {}
+    for line in process.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        if not name.startswith("  "):
+            # top level imports, the nested ones are part of their cumulative time
+            total_us += int(cumulative)
+        if name.strip() in HEAVY_MODULES:
+            modules[name.strip()] = int(cumulative) / 1e6
+    return {"import_secs": total_us / 1e6, "heavy_modules": modules}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmarks the startup of the CLI entry points.")
+    parser.add_argument("--repeat", type=int, default=10, help="Runs per command.")
+    parser.add_argument("--output", default=None, help="Write the json results to this file instead of stdout.")
+    args = parser.parse_args()
+
+    results = {name: {**measure(command, args.repeat), **get_import_times(command)} for name, command in COMMANDS.items()}
+
+    output = json.dumps({
+        "revision": get_revision(),
+        "python": platform.python_version(),
+        "results": results,
+    }, indent=4)
+
+    if args.output:
+        with open(args.output, "w") as output_file:
+            output_file.write(output + "\n")
+    else:
+        print(output)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,14 +1,23 @@
+import json
+import threading
+import time
 import streamlit as st
 import requests
 import pandas as pd
 
 # Base API URL
 BASE_API_URL = "http://localhost:5500/globalrefresh"
+EVENTS_API_URL = "http://localhost:5500/events"
+SUBCLUSTER_NAME = "secondary_subcluster_1"
+# /events sends a keepalive every 15 seconds, a stream silent for longer is reconnected
+EVENTS_READ_TIMEOUT_SECS = 60
+# how often the table is redrawn with the insights pushed by /events, nothing is requested
+UPDATES_RENDER_SECS = 2
 
 # Function to fetch data from API
 def fetch_data(query_name=None):
     try:
-        url = f"{BASE_API_URL}?subcluster_name=secondary_subcluster_1"
+        url = f"{BASE_API_URL}?subcluster_name={SUBCLUSTER_NAME}"
         if query_name:
             url += f"&query_name={query_name}"  # Add query_name if provided
 
@@ -19,6 +28,66 @@ def fetch_data(query_name=None):
         st.error(f"Error fetching data: {e}")
         return None
 
+# The {query_name: insights} payloads of the insights events of a server-sent event stream
+def parse_events(lines):
+    event, data = None, []
+    for line in lines:
+        if not line:
+            if event == "insights" and data:
+                yield json.loads("\n".join(data))
+            event, data = None, []
+        elif line.startswith("event:"):
+            event = line[len("event:"):].strip()
+        elif line.startswith("data:"):
+            data.append(line[len("data:"):].strip())
+        # ": keepalive" comments are skipped
+
+# Latest insights pushed by /events per query, one stream shared by every session of the server
+class InsightUpdates:
+    def __init__(self, subcluster_name):
+        self.subcluster_name = subcluster_name
+        self.values = {}
+        self.lock = threading.Lock()
+        threading.Thread(target=self.listen, daemon=True).start()
+
+    def get_values(self):
+        with self.lock:
+            return dict(self.values)
+
+    def listen(self):
+        while True:
+            params = {"subcluster_name": self.subcluster_name}
+            # a reconnect only gets what was updated while it was away
+            last_updated = [value["last_updated"] for value in self.get_values().values() if "last_updated" in value]
+            if last_updated:
+                params["since"] = max(last_updated)
+            try:
+                with requests.get(EVENTS_API_URL, params=params, stream=True, timeout=(5, EVENTS_READ_TIMEOUT_SECS)) as response:
+                    response.raise_for_status()
+                    for payload in parse_events(response.iter_lines(chunk_size=None, decode_unicode=True)):
+                        with self.lock:
+                            self.values.update(payload)
+            except requests.exceptions.RequestException as e:
+                print(f"Error while listening for insight updates: {e}")
+            time.sleep(1)
+
+@st.cache_resource
+def get_insight_updates(subcluster_name):
+    return InsightUpdates(subcluster_name)
+
+# data with the pushed insights that are newer than its own, they replace a stale value
+def merge_updates(data, values):
+    merged = dict(data)
+    for query_name, value in values.items():
+        current = merged.get(query_name)
+        if not isinstance(current, dict) or value.get("last_updated", "") > current.get("last_updated", ""):
+            merged[query_name] = value
+
+    last_updated = [value["last_updated"] for key, value in merged.items() if key != "last_updated" and isinstance(value, dict) and "last_updated" in value]
+    if last_updated:
+        merged["last_updated"] = max(last_updated)
+    return merged
+
 # Function to convert JSON data into a table-friendly format
 def transform_data(data):
     table_data = []
@@ -34,7 +103,8 @@ def transform_data(data):
                     "Query Name": key,
                     "Status": record["status"],
                     "Message": record["message"],
-                    "Last Updated": last_updated  # Add global timestamp
+                    "Last Updated": last_updated,  # Add global timestamp
+                    "Refreshing": False
                 })
         elif isinstance(records, dict) and "insights" in records:
             for record in records["insights"]:
@@ -42,7 +112,9 @@ def transform_data(data):
                     "Query Name": key,
                     "Status": record["status"],
                     "Message": record["message"],
-                    "Last Updated": last_updated  # Add global timestamp
+                    "Last Updated": last_updated,  # Add global timestamp
+                    # served stale by /globalrefresh, the recompute is pushed over /events
+                    "Refreshing": bool(records.get("stale"))
                 })
     
     return pd.DataFrame(table_data)
@@ -59,25 +131,36 @@ if st.button("🔄 Global Refresh"):
     st.session_state.data = fetch_data()
     st.rerun()
 
-# Show global last updated timestamp
-if st.session_state.data:
-    st.write(f"**Last Updated:** {st.session_state.data.get('last_updated', 'N/A')}")
+updates = get_insight_updates(SUBCLUSTER_NAME)
+
+# Redrawn every UPDATES_RENDER_SECS with the insights pushed since, instead of polling /globalrefresh
+@st.fragment(run_every=UPDATES_RENDER_SECS)
+def show_insights():
+    values = updates.get_values()
+    if values:
+        st.session_state.data = merge_updates(st.session_state.data or {}, values)
+
+    # Show global last updated timestamp
+    if st.session_state.data:
+        st.write(f"**Last Updated:** {st.session_state.data.get('last_updated', 'N/A')}")
+
+    # Display table with refresh buttons per row
+    if st.session_state.data:
+        df = transform_data(st.session_state.data)
 
-# Display table with refresh buttons per row
-if st.session_state.data:
-    df = transform_data(st.session_state.data)
+        st.write("### Query Status")
+        for index, row in df.iterrows():
+            col1, col2, col3, col4, col5 = st.columns([3, 2, 5, 3, 2])  # Adjust layout
+            col1.write(row["Query Name"])
+            col2.write(row["Status"])
+            col3.write(row["Message"])
+            col4.write(f"🕒 {row['Last Updated']}" + (" ⏳" if row["Refreshing"] else ""))  # Display last updated time
 
-    st.write("### Query Status")
-    for index, row in df.iterrows():
-        col1, col2, col3, col4, col5 = st.columns([3, 2, 5, 3, 2])  # Adjust layout
-        col1.write(row["Query Name"])
-        col2.write(row["Status"])
-        col3.write(row["Message"])
-        col4.write(f"🕒 {row['Last Updated']}")  # Display last updated time
+            # Create a unique key using index + hash of message
+            unique_key = f"{row['Query Name']}_{index}"
 
-        # Create a unique key using index + hash of message
-        unique_key = f"{row['Query Name']}_{index}"
+            if col5.button("🔄 Refresh", key=unique_key):
+                st.session_state.data = fetch_data(query_name=row["Query Name"])
+                st.rerun()
 
-        if col5.button("🔄 Refresh", key=unique_key):
-            st.session_state.data = fetch_data(query_name=row["Query Name"])
-            st.rerun()
+show_insights()
@@ -1,7 +1,8 @@
 import argparse
-from tabulate import tabulate
 import sys
 from datetime import datetime
+from modules.profiler import PROFILE_OUTPUT_PATH
+from modules.helpers import tabulate
 
 class MyArgumentParser(argparse.ArgumentParser):
     def __init__(self, *args, **kwargs):
@@ -34,7 +35,7 @@ class MyArgumentParser(argparse.ArgumentParser):
             stralign="left"
         ))
 
-def get_args(help_flag):
+def get_args(help_flag, argv=None):
     parser = MyArgumentParser(description="Args")
     # parser = argparse.ArgumentParser(description="Args")
     # parser.add_argument("--help", required=False, action="store_true", help="show all command line args with description")
@@ -116,21 +117,51 @@ def get_args(help_flag):
     
     parser.add_argument("--case-sensitive", required=False, default=False, 
         help="If set, --query-pattern passed will be case sensitive while matching in the query.")
+    
+    parser.add_argument("--parallel", required=False, default=1, 
+        help="Number of catalog queries to execute concurrently, each on its own connection.")
+    
+    parser.add_argument("--batch-size", required=False, default=1000, 
+        help="Number of rows fetched per round trip while streaming insight query results.")
+    
+    parser.add_argument("--no-result-cache", required=False, action="store_true", 
+        help="Do not use the local cache of closed time buckets for --issue-time reports.")
+    
+    parser.add_argument("--pushdown-thresholds", required=False, action="store_true", 
+        help="With --insights-only, let Vertica classify rows against thresholds.json and return only the counts.")
+    
+    parser.add_argument("--query-timeout-secs", required=False, default=None, 
+        help="Cancel a catalog query running longer than this, timeout_secs in queries.json overrides it per query.")
+    
+    parser.add_argument("--deadline-secs", required=False, default=None, 
+        help="Time budget of the whole report, queries still pending when it is spent are reported as TIMEOUT.")
+    
+    parser.add_argument("--watch", required=False, default=None, 
+        help="Re-run the selected queries every this many seconds on one connection and print only the changed rows and insight statuses, Ctrl-C stops.")
+    
+    parser.add_argument("--export-snapshot", required=False, default=None, 
+        help="Also write the raw result, column headers and sql of every query to this directory, to report it again with --from-snapshot.")
+    
+    parser.add_argument("--from-snapshot", required=False, default=None, 
+        help="Report a directory written by --export-snapshot instead of querying Vertica, the filters of the snapshot are used.")
+    
+    parser.add_argument("--profile", required=False, nargs="?", const=PROFILE_OUTPUT_PATH, default=None, 
+        help=f"Print where the report spends its time and write per query timings as json (default {PROFILE_OUTPUT_PATH}).")
 
     if help_flag:
         parser.print_help()
         exit(0)
     
-    args = parser.parse_args()
-    if args.subcluster_name is None:
+    args = parser.parse_args(argv)
+    if args.subcluster_name is None and args.from_snapshot is None:
         print('Please provide a subcluster name using the --subcluster-name flag.')
         print('Use "--list subclusters" to list the subclusters.')
         sys.exit(0)
     return args
 
 
-def pargse_args(help_flag, query_file_path=None, subcluster_name=None, insights_only=False, queries_to_execute=None):
-    args = get_args(help_flag)
+def pargse_args(help_flag, query_file_path=None, subcluster_name=None, insights_only=False, queries_to_execute=None, argv=None):
+    args = get_args(help_flag, argv)
 
     queries_to_execute = args.queries_to_execute if len(args.queries_to_execute) != 0 else [queries_to_execute] if queries_to_execute is not None else []
     if len(queries_to_execute) != 0:
@@ -196,7 +227,15 @@ def pargse_args(help_flag, query_file_path=None, subcluster_name=None, insights_
         "projection_name": args.projection_name,
         "txn_id": args.txn_id,
         "statement_id": args.statement_id,
-        "verbose": args.verbose
+        "verbose": args.verbose,
+        "parallel": int(args.parallel),
+        "batch_size": int(args.batch_size),
+        "result_cache": not args.no_result_cache,
+        "pushdown_thresholds": args.pushdown_thresholds,
+        "query_timeout_secs": float(args.query_timeout_secs) if args.query_timeout_secs is not None else None,
+        "deadline_secs": float(args.deadline_secs) if args.deadline_secs is not None else None,
+        "watch_secs": float(args.watch) if args.watch is not None else None,
+        "export_snapshot": args.export_snapshot
     }
 
     if filters['projection_name'] is None and filters['table_name'] is not None:
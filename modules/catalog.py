@@ -0,0 +1,116 @@
+import json
+import os
+import threading
+
+QUERIES_FILE_PATH = "queries.json"
+THRESHOLDS_FILE_PATH = "thresholds.json"
+
+QUERY_REQUIRED_KEYS = ("qid", "query_name", "query", "query_description")
+THRESHOLD_REQUIRED_KEYS = ("query_name",)
+THRESHOLD_COLUMN_REQUIRED_KEYS = ("columns_name", "unique_column", "threshold", "message_template", "default_message")
+
+
+class Catalog:
+    """A json catalog (queries.json / thresholds.json) parsed once and indexed by query_name.
+
+    The file is re-read only when its mtime changes, so a long running process
+    picks up edits without parsing the file on every lookup.
+    """
+    def __init__(self, path, validate):
+        self.path = path
+        self._validate = validate
+        self._mtime = None
+        self._entries = []
+        self._index = {}
+        self._lock = threading.Lock()
+
+    def _refresh(self):
+        mtime = os.stat(self.path).st_mtime_ns
+        if mtime == self._mtime:
+            return
+
+        with self._lock:
+            if mtime == self._mtime:
+                return
+
+            with open(self.path) as json_file:
+                entries = json.loads(json_file.read())
+
+            if not isinstance(entries, list):
+                raise ValueError(f"{self.path}: expected a list of entries.")
+
+            index = {}
+            for position, entry in enumerate(entries):
+                self._validate(self.path, position, entry)
+                if entry["query_name"] in index:
+                    raise ValueError(f"{self.path}: duplicate query_name '{entry['query_name']}'.")
+                index[entry["query_name"]] = entry
+
+            self._entries, self._index, self._mtime = entries, index, mtime
+
+    def entries(self):
+        self._refresh()
+        return self._entries
+
+    def get(self, query_name, default=None):
+        self._refresh()
+        return self._index.get(query_name, default)
+
+    def __contains__(self, query_name):
+        self._refresh()
+        return query_name in self._index
+
+    def names(self):
+        self._refresh()
+        return list(self._index)
+
+
+def _check_keys(path, position, entry, required_keys):
+    if not isinstance(entry, dict):
+        raise ValueError(f"{path}: entry {position} is not an object.")
+    missing = [key for key in required_keys if key not in entry]
+    if missing:
+        raise ValueError(f"{path}: entry {position} ({entry.get('query_name')}) is missing {', '.join(missing)}.")
+
+
+def validate_query(path, position, entry):
+    _check_keys(path, position, entry, QUERY_REQUIRED_KEYS)
+
+
+def validate_threshold(path, position, entry):
+    _check_keys(path, position, entry, THRESHOLD_REQUIRED_KEYS)
+    for column in entry.get("columns", []):
+        _check_keys(path, position, column, THRESHOLD_COLUMN_REQUIRED_KEYS)
+
+
+_catalogs = {}
+_catalogs_lock = threading.Lock()
+
+
+def _get_catalog(path, validate):
+    key = (os.path.abspath(path), validate)
+    with _catalogs_lock:
+        if key not in _catalogs:
+            _catalogs[key] = Catalog(path, validate)
+        return _catalogs[key]
+
+
+def get_queries_catalog(path=QUERIES_FILE_PATH):
+    return _get_catalog(path, validate_query)
+
+
+def get_thresholds_catalog(path=THRESHOLDS_FILE_PATH):
+    return _get_catalog(path, validate_threshold)
+
+
+DEFAULT_REFRESH_INTERVAL_SECS = 15
+
+
+def get_refresh_intervals(queries_file_path=QUERIES_FILE_PATH, thresholds_file_path=THRESHOLDS_FILE_PATH):
+    """Insight queries refreshed into redis by refresh_worker.py, mapped to their refresh interval."""
+    thresholds = get_thresholds_catalog(thresholds_file_path)
+    return {
+        row["query_name"]: row.get("refresh_interval_secs", DEFAULT_REFRESH_INTERVAL_SECS)
+        for row in get_queries_catalog(queries_file_path).entries()
+        if row["query_name"] in thresholds and "_raw" not in row["query_name"]
+    }
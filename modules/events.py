@@ -0,0 +1,18 @@
+from modules import serializer
+
+# an idle event stream gets a comment line this often, so proxies do not close it
+KEEPALIVE_SECS = 15
+KEEPALIVE_EVENT = b": keepalive\n\n"
+
+
+def get_event(query_name, value):
+    """A server-sent event with the insights of one query, {query_name: insights}."""
+    return b"event: insights\ndata: " + serializer.dumps_bytes({query_name: value}) + b"\n\n"
+
+
+def get_updated_since(values, since=None):
+    """The cached insights updated after since (a last_updated timestamp), all of them without since."""
+    return {
+        query_name: value for query_name, value in values.items()
+        if value is not None and (not since or value.get('last_updated', '') > since)
+    }
@@ -1,11 +1,35 @@
 import re
 from datetime import datetime, timedelta
+from modules.query_template import render_template
+
+def tabulate(*args, **kwargs):
+    """tabulate.tabulate, imported when the first table is printed."""
+    from tabulate import tabulate as _tabulate
+    return _tabulate(*args, **kwargs)
+
 
 def get_past_datetime(issue_time, duration):
     issue_time_dt = datetime.strptime(issue_time, "%Y-%m-%d %H:%M:%S")
     return str(issue_time_dt - timedelta(hours=duration))
 
 
+# Define colors for each severity level
+SEVERITY_COLORS = {
+    "ok": "\033[92m",      # Green 
+    "warn": "\033[93m", # Yellow 
+    "fatal": "\033[91m",   # Red 
+}
+RESET_COLOR = "\033[0m"  # Reset to default
+
+
+def highlight_severity(text):
+    """Apply color to the string if it contains specific keywords."""
+    for severity, color_code in SEVERITY_COLORS.items():
+        if severity in text.lower():
+            text = text.replace(severity, f"{color_code}{severity.upper()}{RESET_COLOR}")
+    return text
+
+
 def process_query_result_and_highlight_text(query_result, column_headers):
     # Get the index of the "status" column
     try:
@@ -14,25 +38,10 @@ def process_query_result_and_highlight_text(query_result, column_headers):
         # If "status" column doesn't exist, return the query result as is
         return query_result
 
-    # Define colors for each severity level
-    colors = {
-        "ok": "\033[92m",      # Green 
-        "warn": "\033[93m", # Yellow 
-        "fatal": "\033[91m",   # Red 
-    }
-    reset_color = "\033[0m"  # Reset to default
-
-    def apply_color(text):
-        """Apply color to the string if it contains specific keywords."""
-        for severity, color_code in colors.items():
-            if severity in text.lower():
-                text = text.replace(severity, f"{color_code}{severity.upper()}{reset_color}")
-        return text
-
     def process_row(row):
         """Process a single row, applying color to the 'status' column."""
         if status_index < len(row) and isinstance(row[status_index], str):
-            row[status_index] = apply_color(row[status_index])
+            row[status_index] = highlight_severity(row[status_index])
         return row
 
     # Process each row in the query result
@@ -60,90 +69,62 @@ def replace_tables_in_query(query, force=False):
         print(f"Error while replacing strings in query: {e}")
         return query
 
-def push_to_insights_json(qid, insights_json, message, level, query_name):
-    # remove coloring
-    ansi_escape = re.compile(r'\x1b\[[0-9;]*m')
-    message = ansi_escape.sub('', message)
-    
-    colour = 'green' if 'OK' in message else 'red' if 'FATAL' in message else 'yellow'
+# escape sequences colouring the terminal output, not wanted in the insights json
+ANSI_ESCAPE = re.compile(r'\x1b\[[0-9;]*m')
+# the status of a message, it has its own column in the insights json
+STATUS_PREFIX = re.compile(r'\[(?:OK|WARN|FATAL|TIMEOUT)\] ')
+INSIGHT_COLOURS = {'OK': 'green', 'FATAL': 'red'}
+
+class Insight:
+    """One insight of a query, read and written like the dict it stands for (insight['status']).
+
+    last_updated is set by refresh_worker.py, it is not one of the keys until then.
+    """
+    __slots__ = ("message", "status", "order", "colour", "display", "last_updated")
+    KEYS = ("message", "status", "order", "colour", "display")
 
-    # remove status in message
-    message = message.replace('[OK] ', '') 
-    message = message.replace('[WARN] ', '') 
-    message = message.replace('[FATAL] ', '') 
+    def __init__(self, message, status, order, colour, display=True, last_updated=None):
+        self.message = message
+        self.status = status
+        self.order = order
+        self.colour = colour
+        self.display = display
+        self.last_updated = last_updated
 
-    insights_json[query_name] = insights_json.get(query_name, {})
-    insights_json[query_name]['insights'] = insights_json[query_name].get('insights', [])
+    @classmethod
+    def from_message(cls, qid, message, level):
+        """The insight of a report message, without its colouring and [LEVEL] prefix."""
+        message = STATUS_PREFIX.sub('', ANSI_ESCAPE.sub('', message))
+        return cls(message, level, qid, INSIGHT_COLOURS.get(level, 'yellow'))
 
-    insights_json[query_name]['insights'].append({
-        "message": message,
-        "status": level,
-        'order': qid,
-        'colour': colour,
-        'display': True
-    })
+    def keys(self):
+        return self.KEYS if self.last_updated is None else self.KEYS + ("last_updated",)
 
+    def __getitem__(self, key):
+        if key not in self.keys():
+            raise KeyError(key)
+        return getattr(self, key)
+
+    def __setitem__(self, key, value):
+        if key not in self.__slots__:
+            raise KeyError(key)
+        setattr(self, key, value)
+
+    def __eq__(self, other):
+        return isinstance(other, Insight) and self.to_dict() == other.to_dict()
+
+    # mutable and compared by value, unhashable like the dict it stands for
+    __hash__ = None
+
+    def __repr__(self):
+        return f"Insight({self.to_dict()!r})"
+
+    def to_dict(self):
+        return {key: getattr(self, key) for key in self.keys()}
+
+def push_to_insights_json(qid, insights_json, message, level, query_name):
+    insights_json.setdefault(query_name, {}).setdefault('insights', []).append(Insight.from_message(qid, message, level))
     return insights_json
 
 def replace_conditions(query, conditions_dict):
-    query = query.lower()
-    pattern = re.compile(r'\{([^}]+)\}')
-    
-    matches = pattern.findall(query)
-    
-    for match in matches:
-        # condition_parts = re.split(r'([<>!=]=?|[><]=?)', match, 1)
-        # condition_parts = re.split(r'([<>!=]=?|[><]=?|(?i)\b(?:ILIKE|LIKE)\b)', match, 1)
-        # condition_parts = [part.strip() for part in re.split(r'([<>!=]=?|[><]=?|(?i)\b(?:ILIKE|LIKE)\b)', match, 1)]
-        condition_parts = [
-            part.strip() 
-            # for part in re.split(r'([<>!=]=?|[><]=?|(?i)\b(?:ILIKE|LIKE|IS\s+NOT|IS)\b)', match, 1)
-            for part in re.split(r'(?i)([<>!=]=?|[><]=?|\b(?:ILIKE|LIKE|IS\s+NOT|IS)\b)', match, 1)
-        ]
-        #
-        if len(condition_parts) == 3:
-            column_name = condition_parts[0].strip()
-            operator = condition_parts[1].strip()
-            placeholder = match.split(operator, 1)[1].strip()
-            placeholder = placeholder.strip("'")
-
-            flag = 0
-            if placeholder.startswith("%") and placeholder.endswith("%"):
-                flag = 3
-            elif placeholder.startswith("%"):
-                flag = 1
-            elif placeholder.endswith("%"):
-                flag = 2
-
-            if placeholder in conditions_dict:
-                value = conditions_dict[placeholder]
-                
-                if isinstance(value, int) or isinstance(value, float) or placeholder=='session_type_2':
-                    if placeholder=='session_type_2':
-                        new_condition = f"OR {column_name} {operator} {value}"
-                    else:
-                        new_condition = f"AND {column_name} {operator} {value}"
-                else:
-                    if flag == 3:
-                        new_condition = f"AND {column_name} {operator} '%{value}%'"
-                    elif flag == 1:
-                        new_condition = f"AND {column_name} {operator} '%{value}'"
-                    elif flag == 2:
-                        new_condition = f"AND {column_name} {operator} '{value}%'"
-                    else:
-                        new_condition = f"AND {column_name} {operator} '{value}'"
-                
-                query = query.replace(f"{{{match}}}", new_condition)
-        elif len(condition_parts) == 1:
-            placeholder = condition_parts[0].strip("'")
-            if placeholder in conditions_dict:
-                value = conditions_dict[placeholder]
-
-                if isinstance(value, int)  or isinstance(value, float) or placeholder=="err_type" or placeholder=="order_by" or placeholder=='session_type' or placeholder=='dimension_replacements' or placeholder=='groupby_replacements':
-                    new_condition = f"{value}"
-                else:
-                    new_condition = f"'{value}'"
-
-                query = query.replace(f"{{{match}}}", new_condition)
-
-    return re.sub(r'\{[^}]*\}', '', query).strip()
\ No newline at end of file
+    return render_template(query, conditions_dict)
@@ -0,0 +1,107 @@
+import json
+import threading
+import time
+from contextlib import contextmanager
+
+PROFILE_OUTPUT_PATH = "profile.json"
+
+
+def estimate_bytes(rows):
+    """Approximate size of fetched rows, the length of their values as text."""
+    return sum(len(str(value)) for row in rows for value in row)
+
+
+class Profiler:
+    """Wall time, CPU time, rows and bytes per (query_name, stage), accumulated while enabled.
+
+    Stages nest: a stage opened with a query_name tags the stages opened inside it, in
+    the same thread, with that query_name (vertica.execute_vertica_query does not know
+    which catalog query it runs).
+    """
+    def __init__(self):
+        self.enabled = False
+        self._stats = {}
+        self._lock = threading.Lock()
+        self._local = threading.local()
+
+    def enable(self):
+        self.enabled = True
+
+    def reset(self):
+        with self._lock:
+            self._stats = {}
+
+    def _get_stats(self, query_name, stage):
+        key = (query_name, stage)
+        if key not in self._stats:
+            self._stats[key] = {"calls": 0, "wall_secs": 0.0, "cpu_secs": 0.0, "rows": 0, "bytes": 0}
+        return self._stats[key]
+
+    @contextmanager
+    def stage(self, stage, query_name=None):
+        if not self.enabled:
+            yield
+            return
+
+        parent_query_name = getattr(self._local, "query_name", None)
+        if query_name is not None:
+            self._local.query_name = query_name
+        query_name = getattr(self._local, "query_name", None)
+
+        wall_start, cpu_start = time.perf_counter(), time.thread_time()
+        try:
+            yield
+        finally:
+            wall_secs, cpu_secs = time.perf_counter() - wall_start, time.thread_time() - cpu_start
+            self._local.query_name = parent_query_name
+            with self._lock:
+                stats = self._get_stats(query_name, stage)
+                stats["calls"] += 1
+                stats["wall_secs"] += wall_secs
+                stats["cpu_secs"] += cpu_secs
+
+    def add_rows(self, stage, rows):
+        if not self.enabled:
+            return
+        query_name = getattr(self._local, "query_name", None)
+        size = estimate_bytes(rows)
+        with self._lock:
+            stats = self._get_stats(query_name, stage)
+            stats["rows"] += len(rows)
+            stats["bytes"] += size
+
+    def get_records(self):
+        with self._lock:
+            return [{"query_name": query_name, "stage": stage, **stats} for (query_name, stage), stats in self._stats.items()]
+
+    def get_stage_totals(self):
+        totals = {}
+        for record in self.get_records():
+            stats = totals.setdefault(record["stage"], {"calls": 0, "wall_secs": 0.0, "cpu_secs": 0.0, "rows": 0, "bytes": 0})
+            for key in stats:
+                stats[key] += record[key]
+        return totals
+
+    def dump(self, path=PROFILE_OUTPUT_PATH):
+        with open(path, "w") as profile_file:
+            json.dump({"stages": self.get_stage_totals(), "queries": self.get_records()}, profile_file, indent=4)
+
+    def to_prometheus(self, prefix="vertica_debug_report"):
+        """The accumulated stats in the prometheus text format, for the /metrics endpoint."""
+        lines = []
+        for metric, key, help_text in (
+            ("stage_calls_total", "calls", "Number of times the stage ran."),
+            ("stage_wall_seconds_total", "wall_secs", "Wall time spent in the stage."),
+            ("stage_cpu_seconds_total", "cpu_secs", "CPU time spent in the stage."),
+            ("stage_rows_total", "rows", "Rows fetched in the stage."),
+            ("stage_bytes_total", "bytes", "Approximate bytes fetched in the stage."),
+        ):
+            lines.append(f"# HELP {prefix}_{metric} {help_text}")
+            lines.append(f"# TYPE {prefix}_{metric} counter")
+            for record in self.get_records():
+                labels = f'query_name="{record["query_name"] or ""}",stage="{record["stage"]}"'
+                lines.append(f"{prefix}_{metric}{{{labels}}} {record[key]}")
+        return "\n".join(lines) + "\n"
+
+
+profiler = Profiler()
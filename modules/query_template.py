@@ -0,0 +1,108 @@
+import re
+from functools import lru_cache
+
+PLACEHOLDER_PATTERN = re.compile(r'\{([^}]*)\}')
+OPERATOR_PATTERN = re.compile(r'(?i)([<>!=]=?|[><]=?|\b(?:ILIKE|LIKE|IS\s+NOT|IS)\b)')
+
+# placeholders whose value is inserted as is, without quotes
+UNQUOTED_PLACEHOLDERS = {"err_type", "order_by", "session_type", "dimension_replacements", "groupby_replacements"}
+
+
+class Predicate:
+    """`{column <op> 'placeholder'}`, rendered as `AND column <op> 'value'` when the placeholder is set."""
+    __slots__ = ("column_name", "operator", "placeholder", "flag")
+
+    def __init__(self, column_name, operator, placeholder, flag):
+        self.column_name = column_name
+        self.operator = operator
+        self.placeholder = placeholder
+        self.flag = flag
+
+    def render(self, conditions_dict):
+        if self.placeholder not in conditions_dict:
+            return ""
+        value = conditions_dict[self.placeholder]
+
+        if isinstance(value, (int, float)) or self.placeholder == 'session_type_2':
+            conjunction = "OR" if self.placeholder == 'session_type_2' else "AND"
+            return f"{conjunction} {self.column_name} {self.operator} {value}"
+
+        if self.flag == 3:
+            return f"AND {self.column_name} {self.operator} '%{value}%'"
+        elif self.flag == 1:
+            return f"AND {self.column_name} {self.operator} '%{value}'"
+        elif self.flag == 2:
+            return f"AND {self.column_name} {self.operator} '{value}%'"
+        return f"AND {self.column_name} {self.operator} '{value}'"
+
+
+class Value:
+    """`{placeholder}` or `{'placeholder'}`, rendered as the (quoted) value when the placeholder is set."""
+    __slots__ = ("placeholder",)
+
+    def __init__(self, placeholder):
+        self.placeholder = placeholder
+
+    def render(self, conditions_dict):
+        if self.placeholder not in conditions_dict:
+            return ""
+        value = conditions_dict[self.placeholder]
+
+        if isinstance(value, (int, float)) or self.placeholder in UNQUOTED_PLACEHOLDERS:
+            return f"{value}"
+        return f"'{value}'"
+
+
+def parse_placeholder(match):
+    condition_parts = [part.strip() for part in OPERATOR_PATTERN.split(match, 1)]
+
+    if len(condition_parts) == 3:
+        column_name, operator = condition_parts[0], condition_parts[1]
+        placeholder = match.split(operator, 1)[1].strip().strip("'")
+
+        flag = 0
+        if placeholder.startswith("%") and placeholder.endswith("%"):
+            flag = 3
+        elif placeholder.startswith("%"):
+            flag = 1
+        elif placeholder.endswith("%"):
+            flag = 2
+        return Predicate(column_name, operator, placeholder, flag)
+
+    return Value(condition_parts[0].strip("'"))
+
+
+class QueryTemplate:
+    """A queries.json template split once into literal text and placeholder slots.
+
+    The template text is lowercased at compile time, as replace_conditions always did
+    (status literals and the issue_level filter rely on it); substituted values are
+    inserted verbatim.
+    """
+    __slots__ = ("tokens",)
+
+    def __init__(self, query):
+        query = query.lower()
+        tokens = []
+        position = 0
+        for match in PLACEHOLDER_PATTERN.finditer(query):
+            if match.start() > position:
+                tokens.append(query[position:match.start()])
+            if match.group(1):
+                tokens.append(parse_placeholder(match.group(1)))
+            position = match.end()
+        if position < len(query):
+            tokens.append(query[position:])
+        self.tokens = tokens
+
+    def render(self, conditions_dict):
+        return "".join(token if isinstance(token, str) else token.render(conditions_dict) for token in self.tokens).strip()
+
+
+@lru_cache(maxsize=256)
+def compile_template(query):
+    return QueryTemplate(query)
+
+
+def render_template(query, conditions_dict):
+    return compile_template(query).render(conditions_dict)
@@ -1,22 +1,127 @@
 import redis
 import json
+import uuid
+from modules import serializer
 
 def connect_to_redis(host="localhost", port=6379, db=0):
     """Establish connection to Redis."""
     return redis.StrictRedis(host=host, port=port, db=db, decode_responses=True)
 
-def get_value(redis_client, key):
-    """Retrieve value from Redis."""
-    value = redis_client.get(key)
+def get_insights_key(subcluster_name):
+    """Hash holding the insights of a subcluster, one field per catalog query."""
+    return f"insights:{subcluster_name}"
+
+def decode_value(value):
     if value:
         try:
-            return json.loads(value) 
+            return serializer.loads(value)
         except json.JSONDecodeError:
             return value 
     return None 
 
+def get_value(redis_client, key):
+    """Retrieve value from Redis."""
+    return decode_value(redis_client.get(key))
+
 def put_value(redis_client, key, value):
     """Store JSON value in Redis."""
     if isinstance(value, (dict, list)): 
-        value = json.dumps(value, default=str)
+        value = serializer.dumps(value)
     redis_client.set(key, value)
+
+def get_field(redis_client, key, field):
+    """Retrieve one field of a hash."""
+    return decode_value(redis_client.hget(key, field))
+
+def get_fields(redis_client, key, fields):
+    """Retrieve several fields of a hash in one round trip, missing fields are None."""
+    if not fields:
+        return {}
+    return dict(zip(fields, [decode_value(value) for value in redis_client.hmget(key, fields)]))
+
+def put_field(redis_client, key, field, value, ttl_secs=None):
+    """Store JSON value in one field of a hash, only that field is rewritten.
+
+    The ttl applies to the field (HEXPIRE, redis >= 7.4), on older servers it
+    falls back to expiring the whole hash.
+    """
+    if isinstance(value, (dict, list)): 
+        value = serializer.dumps(value)
+
+    pipeline = redis_client.pipeline()
+    pipeline.hset(key, field, value)
+    if ttl_secs:
+        pipeline.execute_command("HEXPIRE", key, int(ttl_secs), "FIELDS", 1, field)
+    try:
+        pipeline.execute()
+    except redis.exceptions.ResponseError:
+        if not ttl_secs:
+            raise
+        # HEXPIRE is unknown to this server, the whole transaction was discarded
+        pipeline = redis_client.pipeline()
+        pipeline.hset(key, field, value)
+        pipeline.expire(key, int(ttl_secs))
+        pipeline.execute()
+
+def get_updates_channel(subcluster_name):
+    """Pub/sub channel of the insights of a subcluster that changed, messages are {query_name: insights}."""
+    return f"updates:{get_insights_key(subcluster_name)}"
+
+# every subcluster, for psubscribe
+UPDATES_CHANNEL_PATTERN = get_updates_channel("*")
+
+def get_update_subcluster(channel):
+    """The subcluster of an updates channel."""
+    return channel[len(get_updates_channel("")):]
+
+def publish_update(redis_client, subcluster_name, query_name, value):
+    """Announce the new insights of one query to the subscribers of the subcluster."""
+    redis_client.publish(get_updates_channel(subcluster_name), serializer.dumps({query_name: value}))
+
+RELEASE_LOCK_SCRIPT = """
+if redis.call("get", KEYS[1]) == ARGV[1] then
+    return redis.call("del", KEYS[1])
+end
+return 0
+"""
+
+def get_lock_key(subcluster_name, query_name):
+    """Key of the lock held while the insights of one catalog query are recomputed."""
+    return f"lock:{get_insights_key(subcluster_name)}:{query_name}"
+
+def acquire_lock(redis_client, key, ttl_secs):
+    """Take the lock if nobody holds it, returns the token needed to release it or None."""
+    token = uuid.uuid4().hex
+    if redis_client.set(key, token, nx=True, ex=ttl_secs):
+        return token
+    return None
+
+def release_lock(redis_client, key, token):
+    """Release the lock, only if it is still held with token (it may have expired meanwhile)."""
+    redis_client.eval(RELEASE_LOCK_SCRIPT, 1, key, token)
+
+def connect_to_async_redis(host="localhost", port=6379, db=0):
+    """Establish an asyncio connection to Redis (redis.asyncio, redis-py >= 4.2)."""
+    from redis import asyncio as redis_asyncio
+    return redis_asyncio.StrictRedis(host=host, port=port, db=db, decode_responses=True)
+
+async def get_field_async(redis_client, key, field):
+    """get_field on an asyncio connection."""
+    return decode_value(await redis_client.hget(key, field))
+
+async def get_fields_async(redis_client, key, fields):
+    """get_fields on an asyncio connection."""
+    if not fields:
+        return {}
+    return dict(zip(fields, [decode_value(value) for value in await redis_client.hmget(key, fields)]))
+
+async def acquire_lock_async(redis_client, key, ttl_secs):
+    """acquire_lock on an asyncio connection."""
+    token = uuid.uuid4().hex
+    if await redis_client.set(key, token, nx=True, ex=ttl_secs):
+        return token
+    return None
+
+async def release_lock_async(redis_client, key, token):
+    """release_lock on an asyncio connection."""
+    await redis_client.eval(RELEASE_LOCK_SCRIPT, 1, key, token)
@@ -0,0 +1,98 @@
+import sys
+from decimal import Decimal
+
+from modules.thresholds import LEVEL_COLOURS, RESET_COLOUR
+
+# tabulate makes a column at least this much wider than its header
+HEADER_PADDING = 2
+
+
+def get_column_type(values):
+    """int, float or str, the way tabulate types a column: numbers only, any of them not an int makes it float."""
+    values = [value for value in values if value is not None]
+    if values and all(isinstance(value, (int, float, Decimal)) and not isinstance(value, bool) for value in values):
+        return int if all(isinstance(value, int) for value in values) else float
+    return str
+
+
+class StreamingTable:
+    """Prints a result in tabulate's 'grid' format a batch at a time.
+
+    Column widths and alignment are sampled from the headers and the first batch, so
+    rows are printed as soon as they are fetched instead of after the whole result;
+    a wider value further down overflows its cell. Colours are added to the cell text
+    while it is printed, the rows themselves are left untouched.
+
+    decorators maps a column index to a function of the cell text, it must not change
+    the visible length of the text (e.g. helpers.highlight_severity).
+    """
+    def __init__(self, column_headers, floatfmt=".2f", decorators=None, file=None):
+        self.column_headers = [str(header) for header in column_headers]
+        self.floatfmt = floatfmt
+        self.decorators = decorators or {}
+        self.file = file
+        self.widths = None
+        self.types = None
+        self.row_count = 0
+
+    def _format(self, value, column_type):
+        if value is None:
+            return []
+        if column_type is float:
+            return [format(float(value), self.floatfmt)]
+        return str(value).strip().split("\n")
+
+    def _layout(self, rows):
+        columns = list(zip(*rows)) if rows else [() for _ in self.column_headers]
+        self.types = [get_column_type(values) for values in columns]
+        self.widths = []
+        for header, column_type, values in zip(self.column_headers, self.types, columns):
+            lengths = [len(line) + HEADER_PADDING for line in header.split("\n")]
+            lengths += [len(line) for value in values for line in self._format(value, column_type)]
+            self.widths.append(max(lengths))
+
+    def _border(self, fill):
+        return "+" + "+".join(fill * (width + 2) for width in self.widths) + "+"
+
+    def _lines(self, cells):
+        """The text lines of one row, cells as (lines, colour, decorator) per column."""
+        height = max([len(lines) for lines, _, _ in cells] + [1])
+        output = []
+        for line_number in range(height):
+            texts = []
+            for (lines, colour, decorator), width, column_type in zip(cells, self.widths, self.types):
+                text = lines[line_number] if line_number < len(lines) else ""
+                padding = " " * (width - len(text))
+                if text and decorator is not None:
+                    text = decorator(text)
+                if text and colour is not None:
+                    text = colour + text + RESET_COLOUR
+                texts.append(padding + text if column_type is not str else text + padding)
+            output.append("| " + " | ".join(texts) + " |")
+        return output
+
+    def _write(self, lines):
+        file = self.file or sys.stdout
+        file.write("\n".join(lines) + "\n")
+        file.flush()
+
+    def write_batch(self, rows, levels=None):
+        """Prints rows, levels maps a column index to the threshold level of every row (ThresholdColumn.classify)."""
+        lines = []
+        if self.widths is None:
+            self._layout(rows)
+            header_cells = [(header.split("\n"), None, None) for header in self.column_headers]
+            lines += [self._border("-")] + self._lines(header_cells) + [self._border("=")]
+
+        levels = levels or {}
+        separator = self._border("-")
+        for row_number, row in enumerate(rows):
+            cells = []
+            for index, (value, column_type) in enumerate(zip(row, self.types)):
+                colour = LEVEL_COLOURS[levels[index][row_number]] if index in levels else None
+                cells.append((self._format(value, column_type), colour, self.decorators.get(index)))
+            lines += self._lines(cells) + [separator]
+
+        self.row_count += len(rows)
+        if lines:
+            self._write(lines)
@@ -0,0 +1,166 @@
+import json
+import os
+from datetime import datetime, timedelta
+
+DEFAULT_RESULT_CACHE_PATH = os.path.expanduser("~/.cache/vertica_debug_report/result_cache.sqlite")
+# overrides the RESULT_CACHE_PATH environment variable, the benchmarks point it to a temporary file
+RESULT_CACHE_PATH = None
+
+# buckets closing later than this before now may still receive snapshot rows, they are never cached
+SETTLE_SECS = 30 * 60
+
+ISSUE_TIME_FORMAT = "%Y-%m-%d %H:%M:%S"
+ISSUE_TIME_FORMAT_US = "%Y-%m-%d %H:%M:%S.%f"
+
+GRANULARITIES = {
+    "minute": (timedelta(minutes=1), lambda dt: dt.replace(second=0, microsecond=0)),
+    "hour": (timedelta(hours=1), lambda dt: dt.replace(minute=0, second=0, microsecond=0)),
+    "day": (timedelta(days=1), lambda dt: dt.replace(hour=0, minute=0, second=0, microsecond=0)),
+}
+
+# filters that only decide the time window or how the report runs, everything else changes the rows of a bucket
+WINDOW_FILTERS = {"issue_time", "duration", "verbose", "parallel", "batch_size", "result_cache", "pushdown_thresholds", "query_timeout_secs", "deadline_secs", "watch_secs", "export_snapshot"}
+
+
+class ResultCache:
+    """Rows of closed time buckets of historical queries, stored in a local sqlite file."""
+    def __init__(self, path=None):
+        # read when the cache is opened, .env is only loaded by the first connection
+        self.path = path or RESULT_CACHE_PATH or os.getenv("RESULT_CACHE_PATH", DEFAULT_RESULT_CACHE_PATH)
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with self._connect() as connection:
+            connection.execute("CREATE TABLE IF NOT EXISTS buckets (digest TEXT, bucket_start TEXT, rows BLOB, PRIMARY KEY (digest, bucket_start))")
+            connection.execute("CREATE TABLE IF NOT EXISTS headers (digest TEXT PRIMARY KEY, column_headers TEXT)")
+
+    def _connect(self):
+        # only reports of closed time buckets (--issue-time) use the cache, the others do not load sqlite3
+        import sqlite3
+        return sqlite3.connect(self.path, timeout=30)
+
+    def get_buckets(self, digest, bucket_starts):
+        import pickle
+        keys = [bucket_start.strftime(ISSUE_TIME_FORMAT) for bucket_start in bucket_starts]
+        if not keys:
+            return {}
+        with self._connect() as connection:
+            cursor = connection.execute(
+                f"SELECT bucket_start, rows FROM buckets WHERE digest = ? AND bucket_start IN ({','.join('?' * len(keys))})",
+                [digest] + keys)
+            return {datetime.strptime(bucket_start, ISSUE_TIME_FORMAT): pickle.loads(rows) for bucket_start, rows in cursor}
+
+    def put_buckets(self, digest, buckets, column_headers):
+        import pickle
+        with self._connect() as connection:
+            connection.executemany(
+                "INSERT OR REPLACE INTO buckets (digest, bucket_start, rows) VALUES (?, ?, ?)",
+                [(digest, bucket_start.strftime(ISSUE_TIME_FORMAT), pickle.dumps(rows)) for bucket_start, rows in buckets.items()])
+            connection.execute("INSERT OR REPLACE INTO headers (digest, column_headers) VALUES (?, ?)", (digest, json.dumps(column_headers)))
+
+    def get_headers(self, digest):
+        with self._connect() as connection:
+            row = connection.execute("SELECT column_headers FROM headers WHERE digest = ?", (digest,)).fetchone()
+            return json.loads(row[0]) if row else None
+
+
+def get_digest(query_name, template, conditions):
+    """Identifies the rows of a bucket: the query, its template and every non time filter."""
+    key = {
+        "query_name": query_name,
+        "template": template,
+        "conditions": {k: str(v) for k, v in sorted(conditions.items()) if k not in WINDOW_FILTERS},
+    }
+    import hashlib
+    return hashlib.sha256(json.dumps(key, sort_keys=True).encode()).hexdigest()
+
+
+def split_window(start, end, granularity, now):
+    """Splits [start, end] into segments (segment_start, segment_end, bucket_start).
+
+    bucket_start is set for whole buckets that are closed (safe to cache) and None for
+    the partial edges and for buckets that are still open. Segments are half open,
+    except the last one which includes end.
+    """
+    size, floor = GRANULARITIES[granularity]
+    settled = now - timedelta(seconds=SETTLE_SECS)
+    segments = []
+    cursor = start
+
+    if floor(start) < start:
+        cursor = floor(start) + size
+        if cursor >= end:
+            return [(start, end, None)]
+        segments.append((start, cursor, None))
+
+    while cursor + size <= end:
+        segments.append((cursor, cursor + size, cursor if cursor + size <= settled else None))
+        cursor += size
+
+    segments.append((cursor, end, None))
+    return segments
+
+
+def get_bucket_start(value, granularity):
+    if value.tzinfo is not None:
+        value = value.replace(tzinfo=None)
+    return GRANULARITIES[granularity][1](value)
+
+
+def execute_bucketed_query(execute, render, time_bucket_column, time_bucket_order, granularity, issue_time, duration, digest, cache=None):
+    """Executes a historical query bucket by bucket, taking closed buckets from the cache.
+
+    render(issue_time, duration) returns the query for a sub window, execute(query) returns
+    (query_result, column_headers). Consecutive uncached segments are sent as one query,
+    rows are merged back ordered by time_bucket_column.
+    """
+    cache = cache or ResultCache()
+    end = datetime.strptime(issue_time, ISSUE_TIME_FORMAT)
+    start = end - timedelta(hours=duration)
+    segments = split_window(start, end, granularity, datetime.now())
+
+    cached = cache.get_buckets(digest, [bucket_start for _, _, bucket_start in segments if bucket_start is not None])
+    column_headers = cache.get_headers(digest) if cached else None
+
+    runs, run = [], []
+    for segment in segments:
+        if segment[2] is not None and segment[2] in cached:
+            if run:
+                runs.append(run)
+            run = []
+        else:
+            run.append(segment)
+    if run:
+        runs.append(run)
+
+    rows = [row for rows in cached.values() for row in rows]
+    fresh_buckets = {}
+
+    for run in runs:
+        run_start, run_end = run[0][0], run[-1][1]
+        # every segment but the last one is half open
+        if run[-1] is not segments[-1]:
+            run_end -= timedelta(microseconds=1)
+        query = render(run_end.strftime(ISSUE_TIME_FORMAT_US), (run_end - run_start).total_seconds() / 3600)
+
+        query_result, column_headers = execute(query)
+        if query_result is None or query_result == -1:
+            return query_result, column_headers
+
+        index = column_headers.index(time_bucket_column) if query_result else None
+        to_cache = {bucket_start: [] for _, _, bucket_start in run if bucket_start is not None}
+        for row in query_result:
+            bucket_start = get_bucket_start(row[index], granularity)
+            if bucket_start in to_cache:
+                to_cache[bucket_start].append(row)
+            rows.append(row)
+        fresh_buckets.update(to_cache)
+
+    if fresh_buckets and column_headers is not None:
+        cache.put_buckets(digest, fresh_buckets, column_headers)
+
+    if rows and column_headers is not None:
+        index = column_headers.index(time_bucket_column)
+        rows.sort(key=lambda row: get_bucket_start(row[index], granularity), reverse=time_bucket_order == "desc")
+
+    return rows, column_headers
@@ -0,0 +1,48 @@
+import json
+
+# orjson when installed, imported by the first value encoded or decoded (see get_orjson)
+orjson = None
+
+
+def get_orjson():
+    """orjson, or None when it is not installed."""
+    global orjson
+    if orjson is None:
+        try:
+            import orjson as orjson_module
+            orjson = orjson_module
+        except ImportError:
+            orjson = False
+    return orjson or None
+
+
+def default(value):
+    """Values json can not encode: insights (helpers.Insight) as their dict, anything else as str."""
+    if hasattr(value, "to_dict"):
+        return value.to_dict()
+    return str(value)
+
+
+def dumps_bytes(value):
+    """value as utf-8 json, with orjson when installed; datetimes and decimals are encoded with str()
+    either way, so both encoders give the same values."""
+    fast = get_orjson()
+    if fast is not None:
+        try:
+            return fast.dumps(value, default=default, option=fast.OPT_PASSTHROUGH_DATETIME | fast.OPT_NON_STR_KEYS)
+        except fast.JSONEncodeError:
+            # e.g. integers wider than 64 bits
+            pass
+    return json.dumps(value, default=default).encode()
+
+
+def dumps(value):
+    return dumps_bytes(value).decode()
+
+
+def loads(value):
+    """Raises json.JSONDecodeError (orjson's error is a subclass of it) on invalid json."""
+    fast = get_orjson()
+    if fast is not None:
+        return fast.loads(value)
+    return json.loads(value)
@@ -0,0 +1,169 @@
+import json
+import os
+from datetime import date, datetime, time, timedelta
+from decimal import Decimal
+
+SNAPSHOT_MANIFEST = "manifest.json"
+SNAPSHOT_VERSION = 1
+# job keys kept in the manifest, enough to report the result again
+SNAPSHOT_JOB_KEYS = ("qid", "query_name", "query_description", "final_query", "show_limit", "display_query")
+# field metadata of a column Arrow has no type for, kept as tagged json strings (see encode_value)
+JSON_COLUMN_METADATA = {b"encoding": b"json"}
+RELATIVEDELTA_FIELDS = ("years", "months", "days", "hours", "minutes", "seconds", "microseconds")
+
+# pyarrow when installed, imported by the first snapshot written or read (see get_pyarrow)
+pa = None
+
+
+def get_pyarrow():
+    """pyarrow (with pyarrow.feather), or None when it is not installed."""
+    global pa
+    if pa is None:
+        try:
+            import pyarrow
+            import pyarrow.feather
+            pa = pyarrow
+        except ImportError:
+            pa = False
+    return pa or None
+
+
+def require_pyarrow():
+    pyarrow = get_pyarrow()
+    if pyarrow is None:
+        raise ValueError("snapshots are Arrow (feather) files, pyarrow is required (pip install pyarrow).")
+    return pyarrow
+
+
+def encode_value(value):
+    """A value of a column Arrow cannot hold as json, the types Vertica returns tagged so they read back as they were."""
+    if value is None or isinstance(value, (str, int, float, bool)):
+        return value
+    if isinstance(value, datetime):
+        return {"datetime": value.isoformat()}
+    if isinstance(value, date):
+        return {"date": value.isoformat()}
+    if isinstance(value, time):
+        return {"time": value.isoformat()}
+    if isinstance(value, timedelta):
+        return {"timedelta": [value.days, value.seconds, value.microseconds]}
+    if isinstance(value, Decimal):
+        return {"decimal": str(value)}
+    if type(value).__name__ == "relativedelta":
+        # the INTERVAL columns, e.g. the running_time of long_running_queries_raw
+        return {"relativedelta": {field: getattr(value, field) for field in RELATIVEDELTA_FIELDS}}
+    return {"str": str(value)}
+
+
+def decode_value(value):
+    if not isinstance(value, dict):
+        return value
+    (tag, encoded), = value.items()
+    if tag == "datetime":
+        return datetime.fromisoformat(encoded)
+    if tag == "date":
+        return date.fromisoformat(encoded)
+    if tag == "time":
+        return time.fromisoformat(encoded)
+    if tag == "timedelta":
+        return timedelta(*encoded)
+    if tag == "decimal":
+        return Decimal(encoded)
+    if tag == "relativedelta":
+        from dateutil.relativedelta import relativedelta
+        return relativedelta(**encoded)
+    return encoded
+
+
+def to_arrow_column(pyarrow, name, column):
+    try:
+        array = pyarrow.array(column)
+        # relativedelta converts to an interval, which reads back as a MonthDayNano
+        if not pyarrow.types.is_interval(array.type):
+            return array, pyarrow.field(name, array.type)
+    except (pyarrow.ArrowInvalid, pyarrow.ArrowTypeError, pyarrow.ArrowNotImplementedError):
+        pass
+    encoded = [json.dumps(encode_value(value)) for value in column]
+    return pyarrow.array(encoded, pyarrow.string()), pyarrow.field(name, pyarrow.string(), metadata=JSON_COLUMN_METADATA)
+
+
+def write_columns(path, column_headers, rows):
+    """Writes rows column by column as an Arrow (feather) file, the columns Arrow has no type
+    for as json strings. Returns (file name, format)."""
+    pyarrow = require_pyarrow()
+    columns = [list(column) for column in zip(*rows)] if rows else [[] for _ in column_headers]
+
+    arrays, fields = zip(*(to_arrow_column(pyarrow, name, column) for name, column in zip(column_headers, columns))) if columns else ((), ())
+    pyarrow.feather.write_feather(pyarrow.Table.from_arrays(list(arrays), schema=pyarrow.schema(list(fields))), path + ".arrow")
+    return os.path.basename(path) + ".arrow", "arrow"
+
+
+def read_columns(path, columns_format):
+    # only Arrow files are read, a snapshot is shared between people and loading it must not run code
+    if columns_format != "arrow":
+        raise ValueError(f"{path}: unsupported snapshot file format {columns_format}.")
+    pyarrow = require_pyarrow()
+    table = pyarrow.feather.read_table(path, memory_map=True)
+    columns = []
+    for field, column in zip(table.schema, table.columns):
+        values = column.to_pylist()
+        if field.metadata == JSON_COLUMN_METADATA:
+            values = [decode_value(json.loads(value)) for value in values]
+        columns.append(values)
+    return [list(row) for row in zip(*columns)]
+
+
+class SnapshotWriter:
+    """A directory holding the raw result, column headers and rendered sql of every query of
+    a report (manifest.json plus one columnar file per query), reported again by
+    --from-snapshot without a connection."""
+    def __init__(self, path, filters, is_now, nodes):
+        require_pyarrow()
+        os.makedirs(path, exist_ok=True)
+        self.path = path
+        self.manifest = {
+            "version": SNAPSHOT_VERSION,
+            "created_at": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+            "is_now": is_now,
+            "filters": filters,
+            "nodes": [list(node) for node in nodes or []],
+            "queries": [],
+        }
+
+    def add(self, job, query_result, column_headers):
+        entry = {key: job[key] for key in SNAPSHOT_JOB_KEYS if key in job}
+        entry["column_headers"] = column_headers
+        if isinstance(query_result, list) and column_headers is not None:
+            entry["file"], entry["format"] = write_columns(os.path.join(self.path, f"{job['qid']}_{job['query_name']}"), column_headers, query_result)
+            entry["row_count"] = len(query_result)
+            if job.get("display_result") is not None:
+                # the rows of the original query of the insight query (display_query)
+                entry["display_file"], _ = write_columns(os.path.join(self.path, f"{job['qid']}_{job['query_name']}_display"), column_headers, job["display_result"])
+        else:
+            # None (failed), -1 (column not found) or vertica.TIMED_OUT
+            entry["result"] = query_result
+        self.manifest["queries"].append(entry)
+
+    def close(self):
+        with open(os.path.join(self.path, SNAPSHOT_MANIFEST), "w") as manifest_file:
+            json.dump(self.manifest, manifest_file, indent=4, default=str)
+
+
+def load_snapshot(path):
+    """The manifest of a snapshot and its queries as (job, query_result, column_headers), in report order."""
+    with open(os.path.join(path, SNAPSHOT_MANIFEST)) as manifest_file:
+        manifest = json.load(manifest_file)
+    if manifest.get("version") != SNAPSHOT_VERSION:
+        raise ValueError(f"{path}: unsupported snapshot version {manifest.get('version')}.")
+
+    def entries():
+        for entry in manifest["queries"]:
+            job = {key: entry[key] for key in SNAPSHOT_JOB_KEYS if key in entry}
+            if "display_file" in entry:
+                job["display_result"] = read_columns(os.path.join(path, entry["display_file"]), entry["format"])
+            if "file" in entry:
+                yield job, read_columns(os.path.join(path, entry["file"]), entry["format"]), entry["column_headers"]
+            else:
+                yield job, entry["result"], entry["column_headers"]
+
+    return manifest, entries()
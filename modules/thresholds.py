@@ -0,0 +1,225 @@
+from itertools import compress
+
+# numpy when installed, imported by the first classified batch (see get_numpy)
+np = None
+
+OK, WARN, FATAL = 0, 1, 2
+LEVELS = ("ok", "warn", "fatal")
+LEVEL_COLOURS = ("\033[92m", "\033[93m", "\033[91m")
+RESET_COLOUR = "\033[0m"
+
+# columns whose thresholds are a percentage of another column of the same row
+DEFAULT_COMPARE_COLUMNS = {"deleted_row_cnt": "total_row_cnt"}
+# threshold columns the plain report leaves uncoloured, only the insights reports colour them
+# (deleted_row_cnt, relative to total_row_cnt)
+DISPLAY_SKIPPED_COLUMNS = ("deleted_row_cnt",)
+
+
+def get_numpy():
+    """numpy, or None when it is not installed. It is the slowest import of the report,
+    the commands that classify nothing (--help, --list) never load it."""
+    global np
+    if np is None:
+        try:
+            import numpy
+            np = numpy
+        except ImportError:
+            np = False
+    return np or None
+
+
+def get_thresholds(thresholds):
+    ok_threshold, warn_threshold, fatal_threshold = None, None, None
+
+    for key, val in thresholds.items():
+        if 'warn' in key:
+            warn_threshold = val
+        elif 'fatal' in key:
+            fatal_threshold = val
+        else:
+            ok_threshold = val
+
+    return ok_threshold, warn_threshold, fatal_threshold
+
+
+class ThresholdColumn:
+    """One column of a thresholds.json entry, resolved against the headers of a result.
+
+    Rows are classified a batch at a time on the transposed batch (one list per
+    column), with numpy when it is installed.
+    """
+    __slots__ = ("item", "index", "compare_index", "unique_index", "warn_threshold", "fatal_threshold")
+
+    def __init__(self, item, column_headers):
+        self.item = item
+        self.index = column_headers.index(item['columns_name'])
+        self.compare_index, self.unique_index = None, None
+
+        if item['unique_column'] != "":
+            self.unique_index = column_headers.index(item['unique_column'])
+        else:
+            compare_column = item.get('compare_column', DEFAULT_COMPARE_COLUMNS.get(item['columns_name']))
+            if compare_column:
+                self.compare_index = column_headers.index(compare_column)
+
+        _, self.warn_threshold, self.fatal_threshold = get_thresholds(item['threshold'])
+
+    def classify(self, columns):
+        """Level (OK, WARN, FATAL) of every row of a transposed batch."""
+        values = columns[self.index]
+        compare_values = columns[self.compare_index] if self.compare_index is not None else None
+
+        if get_numpy() is not None:
+            try:
+                return self._classify_array(values, compare_values)
+            except (TypeError, ValueError):
+                pass
+
+        warn_threshold, fatal_threshold = self.warn_threshold, self.fatal_threshold
+        if compare_values is None:
+            return [FATAL if value >= fatal_threshold else WARN if value >= warn_threshold else OK for value in values]
+
+        return [
+            FATAL if value >= int(compare_value)*(fatal_threshold/100) else WARN if value >= int(compare_value)*(warn_threshold/100) else OK
+            for value, compare_value in zip(values, compare_values)
+        ]
+
+    def _classify_array(self, values, compare_values):
+        values = np.asarray(values, dtype=float)
+        if compare_values is None:
+            fatal_values, warn_values = self.fatal_threshold, self.warn_threshold
+        else:
+            compare_values = np.asarray([int(compare_value) for compare_value in compare_values], dtype=float)
+            fatal_values, warn_values = compare_values*(self.fatal_threshold/100), compare_values*(self.warn_threshold/100)
+
+        return np.where(values >= fatal_values, FATAL, np.where(values >= warn_values, WARN, OK)).tolist()
+
+
+class ThresholdCounts:
+    """Rows per level of one threshold column, the distinct unique_column values per
+    level and the sum of the ok values, accumulated batch by batch."""
+    __slots__ = ("counts", "values", "total")
+
+    def __init__(self):
+        self.counts = [0, 0, 0]
+        self.values = [set(), set(), set()]
+        self.total = 0
+
+    def add(self, column, columns, levels):
+        for level in (OK, WARN, FATAL):
+            self.counts[level] += levels.count(level)
+
+        if column.unique_index is not None:
+            for unique_value, level in zip(columns[column.unique_index], levels):
+                self.values[level].add(unique_value)
+
+        self.total += sum(compress(columns[column.index], [level == OK for level in levels]))
+
+    def as_dict(self):
+        count = {"total": self.total}
+        for level, name in enumerate(LEVELS):
+            count[f"{name}_count"] = self.counts[level]
+            count[f"{name}_values"] = self.values[level]
+        return count
+
+
+class ThresholdEvaluator:
+    """Classifies the rows of a result against every column of a thresholds.json entry in one pass."""
+    def __init__(self, items, column_headers):
+        self.columns = [ThresholdColumn(item, column_headers) for item in items]
+        self.counts = [ThresholdCounts() for _ in self.columns]
+        self.row_count = 0
+
+    def add_batch(self, rows):
+        """Accumulates a batch of rows, returns the levels of every threshold column of it."""
+        if not rows:
+            return [[] for _ in self.columns]
+
+        self.row_count += len(rows)
+        columns = list(zip(*rows))
+        levels = []
+        for column, count in zip(self.columns, self.counts):
+            column_levels = column.classify(columns)
+            count.add(column, columns, column_levels)
+            levels.append(column_levels)
+        return levels
+
+    def get_counts(self):
+        return [count.as_dict() for count in self.counts]
+
+
+def colour_rows(rows, columns, levels):
+    """Colours the threshold columns of rows in place, levels as returned by ThresholdEvaluator.add_batch."""
+    for column, column_levels in zip(columns, levels):
+        index = column.index
+        for row, level in zip(rows, column_levels):
+            row[index] = LEVEL_COLOURS[level] + str(row[index]) + RESET_COLOUR
+    return rows
+
+
+def colour_threshold_columns(rows, items, column_headers):
+    """Colours every threshold column of rows by its level, rows are left as is when a column is missing."""
+    try:
+        evaluator = ThresholdEvaluator(items, column_headers)
+    except ValueError as e:
+        print(f'Error in func:colour_threshold_columns while getting threshold information.', e)
+        return rows
+    return colour_rows(rows, evaluator.columns, evaluator.add_batch(rows))
+
+
+SUMMARY_VALUES_SEPARATOR = "\x1f"
+
+
+def get_level_sql(column_name, compare_column, warn_threshold, fatal_threshold):
+    if compare_column:
+        fatal_value = f"({compare_column})::int * {fatal_threshold/100}"
+        warn_value = f"({compare_column})::int * {warn_threshold/100}"
+    else:
+        fatal_value, warn_value = fatal_threshold, warn_threshold
+    return f"case when {column_name} >= {fatal_value} then {FATAL} when {column_name} >= {warn_value} then {WARN} else {OK} end"
+
+
+def get_summary_query(query, items):
+    """Wraps an insight query so Vertica classifies its rows and returns one summary row:
+    the row count and, per threshold column, the rows and distinct unique_column values
+    per level and the sum of the ok values.
+    """
+    levels, aggregates = [], ["count(1) as row_cnt"]
+
+    for i, item in enumerate(items):
+        _, warn_threshold, fatal_threshold = get_thresholds(item['threshold'])
+        compare_column = None if item['unique_column'] != "" else item.get('compare_column', DEFAULT_COMPARE_COLUMNS.get(item['columns_name']))
+        levels.append(f"{get_level_sql(item['columns_name'], compare_column, warn_threshold, fatal_threshold)} as lvl_{i}")
+
+        for level, name in enumerate(LEVELS):
+            aggregates.append(f"sum(case when lvl_{i} = {level} then 1 else 0 end) as {name}_cnt_{i}")
+            if item['unique_column'] != "":
+                aggregates.append(
+                    f"listagg(distinct case when lvl_{i} = {level} then ({item['unique_column']})::varchar end "
+                    f"using parameters separator='{SUMMARY_VALUES_SEPARATOR}', max_length=65000) as {name}_values_{i}")
+        aggregates.append(f"sum(case when lvl_{i} = {OK} then {item['columns_name']} else 0 end) as ok_total_{i}")
+
+    query = query.strip().rstrip(";")
+    return (f"select {', '.join(aggregates)} "
+            f"from (select q.*, {', '.join(levels)} from ({query}) q) t;")
+
+
+def get_summary_counts(summary_rows, items, column_headers):
+    """Counts of every threshold column from the row returned by a get_summary_query query,
+    in the shape of ThresholdEvaluator.get_counts, along with the number of classified rows."""
+    row = next(iter(summary_rows or []), None)
+    if row is None:
+        return [ThresholdCounts().as_dict() for _ in items], 0
+
+    summary = dict(zip(column_headers, row))
+    counts = []
+    for i, item in enumerate(items):
+        count = ThresholdCounts()
+        for level, name in enumerate(LEVELS):
+            count.counts[level] = int(summary[f"{name}_cnt_{i}"] or 0)
+            values = summary.get(f"{name}_values_{i}")
+            count.values[level] = set(values.split(SUMMARY_VALUES_SEPARATOR)) if values else set()
+        count.total = summary[f"ok_total_{i}"] or 0
+        counts.append(count.as_dict())
+
+    return counts, int(summary["row_cnt"] or 0)
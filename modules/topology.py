@@ -0,0 +1,101 @@
+import json
+import os
+import threading
+import time
+
+NODES_QUERY = "select node_name, node_address, subcluster_name from nodes;"
+TOPOLOGY_REDIS_KEY = "topology:nodes"
+DEFAULT_TOPOLOGY_TTL_SECS = 300
+
+
+class NodesNotFound(ValueError):
+    """No node of a subcluster was found: it does not exist or Vertica could not be reached."""
+
+
+class TopologyCache:
+    """Rows of the nodes table (node_name, node_address, subcluster_name), queried once per ttl.
+
+    The rows live in process and, when a redis client is set, in redis too so the
+    CLI runs of the refresh worker and the dashboard share one lookup.
+    """
+    def __init__(self, fetch, ttl_secs=None, redis_client=None):
+        self._fetch = fetch
+        self.ttl_secs = ttl_secs
+        self.redis_client = redis_client
+        self._nodes = None
+        self._expires_at = 0
+        self._lock = threading.Lock()
+
+    def get_ttl_secs(self):
+        # TOPOLOGY_TTL_SECS is read once needed, .env is only loaded by the first connection
+        if self.ttl_secs is None:
+            return int(os.getenv("TOPOLOGY_TTL_SECS", DEFAULT_TOPOLOGY_TTL_SECS))
+        return self.ttl_secs
+
+    def _get_from_redis(self):
+        if self.redis_client is None:
+            return None
+        try:
+            value = self.redis_client.get(TOPOLOGY_REDIS_KEY)
+            return [tuple(row) for row in json.loads(value)] if value else None
+        except Exception as e:
+            print(f"Error while reading topology from redis: {e}")
+            return None
+
+    def _put_to_redis(self, nodes):
+        if self.redis_client is None:
+            return
+        try:
+            self.redis_client.set(TOPOLOGY_REDIS_KEY, json.dumps(nodes), ex=int(self.get_ttl_secs()))
+        except Exception as e:
+            print(f"Error while writing topology to redis: {e}")
+
+    def get_nodes(self):
+        """All nodes, None when they could not be queried (nothing is cached then)."""
+        with self._lock:
+            if self._nodes is not None and time.monotonic() < self._expires_at:
+                return self._nodes
+
+            nodes = self._get_from_redis()
+            if nodes is None:
+                query_result = self._fetch(NODES_QUERY)
+                if query_result is None or query_result == -1:
+                    return None
+                nodes = [tuple(row) for row in query_result]
+                self._put_to_redis(nodes)
+
+            self._nodes, self._expires_at = nodes, time.monotonic() + self.get_ttl_secs()
+            return nodes
+
+    def get_subcluster_nodes(self, subcluster_name):
+        """(node_address, node_name) of the nodes of a subcluster.
+
+        An unknown subcluster drops the cache once, it may have been added since the last lookup.
+        """
+        for attempt in range(2):
+            nodes = self.get_nodes()
+            if nodes is None:
+                return None
+            rows = [(node_address, node_name) for node_name, node_address, node_subcluster_name in nodes if node_subcluster_name == subcluster_name]
+            if rows or attempt:
+                return rows
+            self.invalidate()
+        return rows
+
+    def pin(self, nodes):
+        """Serves nodes from now on, without Vertica or redis (reports replayed from a snapshot)."""
+        nodes = [tuple(row) for row in nodes]
+        with self._lock:
+            self._fetch = lambda query: nodes
+            self.redis_client = None
+            self._nodes, self._expires_at = nodes, float("inf")
+
+    def invalidate(self, everywhere=True):
+        """Drops the cached nodes, from redis too unless everywhere is False."""
+        with self._lock:
+            self._nodes, self._expires_at = None, 0
+        if everywhere and self.redis_client is not None:
+            try:
+                self.redis_client.delete(TOPOLOGY_REDIS_KEY)
+            except Exception as e:
+                print(f"Error while invalidating topology in redis: {e}")
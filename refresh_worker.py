@@ -0,0 +1,127 @@
+#!/usr/bin/env python3
+"""Keeps the dashboard insights in redis fresh, so /globalrefresh only reads the cache.
+
+Every insight query of the catalog is re-executed on its own interval
+(`refresh_interval_secs` in queries.json) for each subcluster and stored in the
+field <query_name> of the redis hash insights:<subcluster_name>. A refresh whose
+insights changed is also published on the channel updates:insights:<subcluster_name>,
+the dashboards push it to the browsers (/events).
+
+    python refresh_worker.py --subcluster-name=secondary_subcluster_1,secondary_subcluster_2
+"""
+import argparse
+import time
+from datetime import datetime
+from modules.args_parser import pargse_args
+from modules.catalog import get_refresh_intervals, DEFAULT_REFRESH_INTERVAL_SECS
+from modules.redis import connect_to_redis, get_field, put_field, publish_update, get_insights_key, get_lock_key, acquire_lock, release_lock
+from vertica_debug_report import execute_queries_from_json, topology_cache
+
+TIMESTAMP_FORMAT = "%Y-%m-%d %H:%M:%S.%f"
+# a recompute that takes longer than this is considered dead and its lock is dropped
+LOCK_TTL_SECS = 300
+# insights not refreshed for this many intervals expire instead of being served forever
+INSIGHTS_TTL_INTERVALS = 10
+
+
+def is_stale(value, interval_secs):
+    if not value or 'last_updated' not in value:
+        return True
+    last_updated = datetime.strptime(value['last_updated'], TIMESTAMP_FORMAT)
+    return (datetime.now() - last_updated).total_seconds() > interval_secs
+
+
+def get_insights_content(value):
+    """The insights of a cached value without their timestamps, equal when nothing changed."""
+    if not value:
+        return None
+    return [{key: val for key, val in dict(item).items() if key != 'last_updated'} for item in value.get('insights', [])]
+
+
+def refresh_query(redis_client, json_file_path, subcluster_name, query_name):
+    argv = ["--subcluster-name", subcluster_name, "--inputfilepath", json_file_path, "--queries-to-execute", query_name, "--insights-only", "--pushdown-thresholds"]
+    filters, is_now, insights_only, with_insights, json_file_path, queries_to_execute = pargse_args(False, argv=argv)
+
+    insights_json = {}
+    execute_queries_from_json(insights_json, json_file_path, filters, filters['verbose'], is_now, insights_only, with_insights, queries_to_execute)
+
+    if query_name not in insights_json:
+        # keep serving the previous value when the query could not be executed
+        print(f"No insights for {query_name} on {subcluster_name}, keeping the cached value.")
+        return
+
+    last_updated = datetime.now().strftime(TIMESTAMP_FORMAT)
+    value = insights_json[query_name]
+    value['last_updated'] = last_updated
+    # plain dicts from here on (helpers.Insight only lives in the report), any json encoder takes them
+    value['insights'] = [dict(item, last_updated=last_updated) for item in value['insights']]
+
+    ttl_secs = get_refresh_intervals(json_file_path).get(query_name, DEFAULT_REFRESH_INTERVAL_SECS) * INSIGHTS_TTL_INTERVALS
+    previous = get_field(redis_client, get_insights_key(subcluster_name), query_name)
+    put_field(redis_client, get_insights_key(subcluster_name), query_name, value, ttl_secs)
+    if get_insights_content(value) != get_insights_content(previous):
+        publish_update(redis_client, subcluster_name, query_name, value)
+
+
+def wait_for_refresh(redis_client, subcluster_name, query_name, wait_secs):
+    """Waits up to wait_secs for the recompute of the query running elsewhere to finish."""
+    lock_key = get_lock_key(subcluster_name, query_name)
+    deadline = time.monotonic() + wait_secs
+    while time.monotonic() < deadline and redis_client.exists(lock_key):
+        time.sleep(0.2)
+
+
+def refresh_query_single_flight(redis_client, json_file_path, subcluster_name, query_name, wait_secs=0):
+    """Recomputes the insights unless another process already does, in which case
+    it waits up to wait_secs for that recompute to finish.
+
+    Returns True if this call did the recompute. Either way the cached value is
+    the freshest available afterwards.
+    """
+    lock_key = get_lock_key(subcluster_name, query_name)
+    token = acquire_lock(redis_client, lock_key, LOCK_TTL_SECS)
+
+    if token is None:
+        wait_for_refresh(redis_client, subcluster_name, query_name, wait_secs)
+        return False
+
+    try:
+        refresh_query(redis_client, json_file_path, subcluster_name, query_name)
+    finally:
+        release_lock(redis_client, lock_key, token)
+    return True
+
+
+def run(subcluster_names, json_file_path):
+    redis_client = connect_to_redis()
+    # the nodes lookup of the report header is shared with other processes through redis
+    topology_cache.redis_client = redis_client
+    next_run = {}
+
+    while True:
+        # re-read every round so interval changes in queries.json are picked up
+        intervals = get_refresh_intervals(json_file_path)
+
+        for subcluster_name in subcluster_names:
+            for query_name in intervals:
+                if time.monotonic() < next_run.get((subcluster_name, query_name), 0):
+                    continue
+                try:
+                    refresh_query_single_flight(redis_client, json_file_path, subcluster_name, query_name)
+                except Exception as e:
+                    print(f"Error while refreshing {query_name} on {subcluster_name}: {e}")
+                next_run[(subcluster_name, query_name)] = time.monotonic() + intervals[query_name]
+
+        due = [next_run[(subcluster_name, query_name)] for subcluster_name in subcluster_names for query_name in intervals]
+        time.sleep(max(0, min(due) - time.monotonic()) if due else 1)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Refreshes the dashboard insights into redis in the background.")
+    parser.add_argument("--subcluster-name", required=True,
+        help="Comma-separated list of subclusters to refresh.")
+    parser.add_argument("--inputfilepath", required=False, default="queries.json",
+        help="Path of input json file.")
+    args = parser.parse_args()
+
+    run([name.strip() for name in args.subcluster_name.split(",") if name.strip()], args.inputfilepath)
@@ -0,0 +1,23 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+@pytest.fixture
+def standin(tmp_path, monkeypatch):
+    """A seeded Vertica stand-in (benchmarks/standin.py) behind the shared connection, returns its database path."""
+    pytest.importorskip("dotenv")
+    pytest.importorskip("tabulate")
+    from benchmarks.standin import seed_database, use_standin
+    from vertica import vertica
+
+    # use_standin replaces the connection factory, it is put back after the test
+    monkeypatch.setattr(vertica, "get_vertica_connection", vertica.get_vertica_connection)
+    monkeypatch.chdir(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    path = seed_database(str(tmp_path / "standin.sqlite"))
+    use_standin(path)
+    yield path
+    vertica.close_shared_connections()
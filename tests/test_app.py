@@ -0,0 +1,83 @@
+import threading
+import time
+
+import pytest
+
+pytest.importorskip("flask")
+pytest.importorskip("flask_cors")
+pytest.importorskip("redis")
+
+import app as dashboard
+
+CACHED = {"insights": [{"status": "ok", "message": "m", "last_updated": "2025-01-10 10:00:00.000000"}], "last_updated": "2025-01-10 10:00:00.000000"}
+
+
+@pytest.fixture
+def client(monkeypatch):
+    # a stale query_count and nothing else cached
+    monkeypatch.setattr(dashboard, "get_fields", lambda redis_client, key, fields: {"query_count": dict(CACHED), "sessions": None})
+    monkeypatch.setattr(dashboard, "get_refresh_intervals", lambda path: {"query_count": 15, "sessions": 15})
+    monkeypatch.setattr(dashboard, "refresh_errors", {})
+    return dashboard.app.test_client()
+
+
+def get_query_count(client):
+    return client.get("/globalrefresh?subcluster_name=sc&query_name=query_count")
+
+
+def test_refresh_runs_outside_the_request_thread(client, monkeypatch):
+    threads = []
+    done = threading.Event()
+
+    def refresh(*args, **kwargs):
+        threads.append(threading.current_thread().name)
+        done.set()
+        return True
+    monkeypatch.setattr(dashboard, "refresh_query_single_flight", refresh)
+
+    response = get_query_count(client)
+    assert response.status_code == 200
+    assert done.wait(1)
+    assert len(threads) == 1 and threads[0].startswith("refresh")
+
+
+def test_stale_value_is_served_without_waiting(client, monkeypatch):
+    release = threading.Event()
+    monkeypatch.setattr(dashboard, "refresh_query_single_flight", lambda *args, **kwargs: release.wait(1))
+
+    start = time.monotonic()
+    response = get_query_count(client)
+    assert time.monotonic() - start < 0.5
+    assert response.status_code == 200
+    data = response.get_json()
+    assert data["query_count"]["stale"] is True
+    assert data["query_count"]["insights"] == CACHED["insights"]
+    assert data["last_updated"] == CACHED["last_updated"]
+    # the queued recompute is shared by the requests that come meanwhile
+    assert dashboard.start_refresh("sc", "query_count") is dashboard.start_refresh("sc", "query_count")
+    release.set()
+
+
+def test_failed_refresh_is_reported_with_the_cached_value(client, monkeypatch):
+    def refresh(*args, **kwargs):
+        raise SystemExit("no nodes")
+    monkeypatch.setattr(dashboard, "refresh_query_single_flight", refresh)
+
+    get_query_count(client)
+    deadline = time.monotonic() + 1
+    while ("sc", "query_count") not in dashboard.refresh_errors and time.monotonic() < deadline:
+        time.sleep(0.01)
+
+    response = get_query_count(client)
+    assert response.status_code == 200
+    assert response.get_json()["query_count"]["refresh_error"] == "no nodes"
+
+
+def test_refresh_that_cannot_start_is_an_error_response(client, monkeypatch):
+    def start_refresh(subcluster_name, query_name):
+        raise RuntimeError("cannot schedule new futures after shutdown")
+    monkeypatch.setattr(dashboard, "start_refresh", start_refresh)
+
+    response = get_query_count(client)
+    assert response.status_code == 503
+    assert "query_count" in response.get_json()["error"]
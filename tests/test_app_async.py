@@ -0,0 +1,85 @@
+import asyncio
+import time
+
+import pytest
+
+pytest.importorskip("quart")
+pytest.importorskip("quart_cors")
+pytest.importorskip("redis")
+
+import app_async
+
+CACHED = {"insights": [{"status": "ok", "message": "m", "last_updated": "2025-01-10 10:00:00.000000"}], "last_updated": "2025-01-10 10:00:00.000000"}
+
+
+class FailingPubSub:
+    """A subscription whose connection drops at once, as while redis flaps."""
+    def __init__(self, pubsubs):
+        self.closed = False
+        pubsubs.append(self)
+
+    async def psubscribe(self, pattern):
+        raise ConnectionError("redis is down")
+
+    async def aclose(self):
+        self.closed = True
+
+
+class FlappingRedis:
+    def __init__(self):
+        self.pubsubs = []
+
+    def pubsub(self):
+        return FailingPubSub(self.pubsubs)
+
+
+def fast_sleep(sleep):
+    async def wrapper(secs):
+        await sleep(min(secs, 0.01))
+    return wrapper
+
+
+def test_listener_closes_the_pubsub_of_every_retry(monkeypatch):
+    redis_client = FlappingRedis()
+    monkeypatch.setattr(app_async, "async_redis_client", redis_client)
+
+    async def listen():
+        task = asyncio.create_task(app_async.listen_for_updates())
+        while len(redis_client.pubsubs) < 3:
+            await asyncio.sleep(0.01)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+
+    monkeypatch.setattr(app_async.asyncio, "sleep", fast_sleep(asyncio.sleep))
+    asyncio.run(listen())
+    assert all(pubsub.closed for pubsub in redis_client.pubsubs)
+
+
+def test_stale_value_is_served_without_waiting(monkeypatch):
+    started = []
+
+    async def get_fields_async(redis_client, key, fields):
+        return {"query_count": dict(CACHED), "sessions": None}
+
+    async def refresh_insights(subcluster_name, query_name, wait_secs=0):
+        started.append(query_name)
+        await asyncio.sleep(5)
+
+    monkeypatch.setattr(app_async, "get_fields_async", get_fields_async)
+    monkeypatch.setattr(app_async, "get_refresh_intervals", lambda path: {"query_count": 15, "sessions": 15})
+    monkeypatch.setattr(app_async, "refresh_insights", refresh_insights)
+
+    async def request():
+        start = time.monotonic()
+        response = await app_async.app.test_client().get("/globalrefresh?subcluster_name=sc&query_name=query_count")
+        elapsed = time.monotonic() - start
+        await asyncio.sleep(0)
+        for task in list(app_async.refresh_tasks.values()):
+            task.cancel()
+        return response.status_code, await response.get_json(), elapsed
+
+    status_code, data, elapsed = asyncio.run(request())
+    assert status_code == 200 and elapsed < 1
+    assert data["query_count"]["stale"] is True
+    assert started == ["query_count"]
@@ -0,0 +1,63 @@
+import threading
+
+import pytest
+
+pytest.importorskip("dotenv")
+
+from vertica import vertica
+
+
+class FakeConnection:
+    def __init__(self):
+        self.is_closed = False
+
+    def closed(self):
+        return self.is_closed
+
+    def close(self):
+        self.is_closed = True
+
+
+@pytest.fixture
+def manager(monkeypatch):
+    monkeypatch.setattr(vertica, "get_vertica_connection", FakeConnection)
+    manager = vertica.VerticaConnectionManager()
+    yield manager
+    manager.close()
+
+
+def get_in_thread(manager):
+    connections = []
+    thread = threading.Thread(target=lambda: connections.append(manager.get_connection()))
+    thread.start()
+    thread.join()
+    return connections[0]
+
+
+def test_connection_per_thread(manager):
+    connection = manager.get_connection()
+    assert manager.get_connection() is connection
+
+    other = get_in_thread(manager)
+    assert other is not connection
+    # the connection of the exited thread is closed by the next lookup, not the live one
+    assert manager.get_connection() is connection
+    assert other.is_closed and not connection.is_closed
+
+
+def test_dead_connection_is_replaced(manager):
+    connection = manager.get_connection()
+    connection.close()
+    assert manager.get_connection() is not connection
+
+
+def test_pool_per_size(manager):
+    pool = manager.get_pool(2)
+    with pool.connection() as connection:
+        # asking for another size does not close the pool in use
+        assert manager.get_pool(3) is not pool
+        assert not connection.is_closed
+    assert manager.get_pool(2) is pool
+
+    manager.close()
+    assert connection.is_closed
@@ -0,0 +1,78 @@
+import re
+from datetime import datetime, timedelta
+
+ANSI = re.compile(r"\x1b\[[0-9;]*m")
+RANKED_QUERY = "select * from ( select rs.user_name, rs.cnt from ranked rs where rs.row_num <= 5 order by rs.cnt desc ) as x order by cnt desc limit 10;"
+
+
+def test_trailing_limit_is_the_show_limit():
+    import vertica_debug_report
+
+    insight_query, show_limit = vertica_debug_report.get_insight_query("select user_name, cnt from sessions order by cnt desc limit 10;")
+    assert "limit" not in insight_query.lower()
+    assert show_limit == 10
+
+
+def test_widened_row_num_has_no_show_limit():
+    import vertica_debug_report
+
+    insight_query, show_limit = vertica_debug_report.get_insight_query(RANKED_QUERY)
+    assert "rs.row_num <= 1000" in insight_query
+    assert show_limit is None
+
+
+def test_inner_limit_has_no_show_limit():
+    import vertica_debug_report
+
+    _, show_limit = vertica_debug_report.get_insight_query("select * from (( select a from t order by a limit 5 ) union ( select a from u order by a limit 5 )) as x order by a limit 3;")
+    assert show_limit is None
+
+
+def test_original_query_is_kept_for_display():
+    import vertica_debug_report
+
+    final_query, show_limit, display_query = vertica_debug_report.render_catalog_query(RANKED_QUERY, {"subcluster_name": "default"}, insight=True)
+    assert display_query == RANKED_QUERY
+    assert final_query != RANKED_QUERY and show_limit is None
+
+    _, _, display_query = vertica_debug_report.render_catalog_query("select a from t order by a limit 10;", {"subcluster_name": "default"}, insight=True)
+    assert display_query is None
+
+
+def test_query_past_displays_the_rows_of_the_original_query(standin, monkeypatch, capsys):
+    import vertica_debug_report
+    from benchmarks.standin import SUBCLUSTER_NAME
+    from modules.args_parser import pargse_args
+    from modules.catalog import get_queries_catalog
+    from modules.helpers import process_query_result_and_highlight_text
+    from vertica import vertica
+
+    issue_time = (datetime.now() - timedelta(minutes=30)).strftime("%Y-%m-%d %H:%M:%S")
+    argv = ["--subcluster-name", SUBCLUSTER_NAME, "--issue-time", issue_time, "--queries-to-execute", "sessions"]
+    filters, is_now, _, _, json_file_path, queries_to_execute = pargse_args(False, argv=argv)
+    catalog = get_queries_catalog(json_file_path).entries()
+    insight_job, = vertica_debug_report.prepare_catalog_queries(catalog, filters, is_now, queries_to_execute, True)
+    plain_job, = vertica_debug_report.prepare_catalog_queries(catalog, filters, is_now, queries_to_execute, False)
+    assert insight_job["display_query"] == plain_job["final_query"]
+
+    connection = vertica.get_shared_vertica_connection()
+    rows, column_headers = vertica_debug_report.execute_catalog_query(connection, plain_job["final_query"])
+    expected = [[ANSI.sub("", str(value)) for value in row] for row in process_query_result_and_highlight_text([list(row) for row in rows], column_headers)]
+    insight_rows = vertica.execute_vertica_query(connection, insight_job["final_query"])
+    assert expected and len(insight_rows) > len(expected)
+
+    displayed = []
+    count_threshold_columns = vertica_debug_report.count_threshold_columns
+
+    def spy(*args):
+        counts, query_result_show, row_count = count_threshold_columns(*args)
+        displayed.extend([ANSI.sub("", str(value)) for value in row] for row in query_result_show)
+        return counts, query_result_show, row_count
+
+    monkeypatch.setattr(vertica_debug_report, "count_threshold_columns", spy)
+    monkeypatch.setattr(vertica_debug_report, "is_header_printed", True)
+    filters, is_now, insights_only, with_insights, json_file_path, queries_to_execute = pargse_args(False, argv=[*argv, "--with-insights"])
+    vertica_debug_report.execute_queries_from_json({}, json_file_path, filters, False, is_now, insights_only, with_insights, queries_to_execute)
+
+    assert "Error while processing" not in capsys.readouterr().out
+    assert displayed == expected
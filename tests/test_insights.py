@@ -0,0 +1,55 @@
+import json
+
+import pytest
+
+from modules import serializer
+from modules.helpers import Insight, push_to_insights_json
+
+
+def get_insights_json():
+    insights_json = {}
+    push_to_insights_json(1, insights_json, "[\033[93mWARN\033[0m] 3 sessions by ['user_1']", "WARN", "sessions")
+    push_to_insights_json(2, insights_json, "[\033[92mOK\033[0m] No errors.", "OK", "error_messages")
+    return insights_json
+
+
+def test_insight_reads_like_a_dict():
+    insight = get_insights_json()["sessions"]["insights"][0]
+    assert dict(insight) == {"message": "3 sessions by ['user_1']", "status": "WARN", "order": 1, "colour": "yellow", "display": True}
+    assert insight == Insight.from_message(1, "[\033[93mWARN\033[0m] 3 sessions by ['user_1']", "WARN")
+    with pytest.raises(TypeError):
+        hash(insight)
+
+
+@pytest.mark.parametrize("use_orjson", [True, False])
+def test_serializer_encodes_insights_as_dicts(monkeypatch, use_orjson):
+    if use_orjson:
+        pytest.importorskip("orjson")
+        monkeypatch.setattr(serializer, "orjson", None)
+    else:
+        monkeypatch.setattr(serializer, "orjson", False)
+    insights_json = get_insights_json()
+    expected = {query_name: {"insights": [item.to_dict() for item in value["insights"]]} for query_name, value in insights_json.items()}
+    # redis.put_field and publish_update, /globalrefresh and /events all encode with the serializer
+    assert json.loads(serializer.dumps(insights_json)) == expected
+    assert json.loads(serializer.dumps_bytes(insights_json)) == expected
+
+
+def test_refresh_worker_stores_plain_dicts(standin, monkeypatch):
+    pytest.importorskip("redis")
+    import refresh_worker
+    import vertica_debug_report
+    from benchmarks.standin import SUBCLUSTER_NAME
+
+    monkeypatch.setattr(vertica_debug_report, "is_header_printed", False)
+    stored = {}
+    monkeypatch.setattr(refresh_worker, "get_field", lambda redis_client, key, field: None)
+    monkeypatch.setattr(refresh_worker, "put_field", lambda redis_client, key, field, value, ttl_secs: stored.update({field: value}))
+    monkeypatch.setattr(refresh_worker, "publish_update", lambda redis_client, subcluster_name, query_name, value: None)
+    refresh_worker.refresh_query(None, "queries.json", SUBCLUSTER_NAME, "sessions")
+
+    value = stored["sessions"]
+    assert value["insights"] and all(type(item) is dict for item in value["insights"])
+    assert all(item["last_updated"] == value["last_updated"] for item in value["insights"])
+    # without serializer.default
+    json.dumps(value)
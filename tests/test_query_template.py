@@ -0,0 +1,33 @@
+from modules.query_template import compile_template, render_template
+
+QUERY = "SELECT * FROM sessions WHERE 1=1 {user_name = 'user_name'} {duration_secs >= 'duration'} LIMIT {limit}"
+
+
+def test_predicates_and_values():
+    rendered = render_template(QUERY, {"user_name": "Bob", "duration": 5, "limit": 10})
+    # the template is lowercased, the values are inserted as they are
+    assert rendered == "select * from sessions where 1=1 AND user_name = 'Bob' AND duration_secs >= 5 limit 10"
+
+
+def test_unset_placeholders_are_dropped():
+    assert render_template(QUERY, {}) == "select * from sessions where 1=1   limit"
+
+
+def test_like_flags():
+    assert render_template("where 1=1 {node_name like '%name%'}", {"%name%": "v1"}) == "where 1=1 AND node_name like '%v1%'"
+    assert render_template("where 1=1 {node_name like 'name%'}", {"name%": "v1"}) == "where 1=1 AND node_name like 'v1%'"
+    assert render_template("where 1=1 {node_name like '%name'}", {"%name": "v1"}) == "where 1=1 AND node_name like '%v1'"
+
+
+def test_session_type_2_is_an_or():
+    assert render_template("where a {session_type = 'session_type_2'}", {"session_type_2": "x"}) == "where a OR session_type = x"
+
+
+def test_quoted_and_unquoted_values():
+    conditions = {"subcluster_name": "sc", "order_by": "a desc,", "err_type": "'ERROR'"}
+    assert render_template("select {'subcluster_name'} order by {order_by} x {err_type}", conditions) == "select 'sc' order by a desc, x 'ERROR'"
+
+
+def test_templates_are_compiled_once():
+    assert compile_template(QUERY) is compile_template(QUERY)
+    assert render_template(QUERY, {"limit": 1}) == render_template(QUERY, {"limit": 1})
@@ -0,0 +1,75 @@
+import threading
+import time
+
+import pytest
+
+pytest.importorskip("dotenv")
+pytest.importorskip("vertica_python")
+
+from vertica import vertica
+
+
+class SlowConnection:
+    """Its statements run until they are cancelled, or for run_secs."""
+    def __init__(self, run_secs=5):
+        self.run_secs = run_secs
+        self.cancels = 0
+        self._cancelled = threading.Event()
+
+    def cancel(self):
+        self.cancels += 1
+        self._cancelled.set()
+
+    def cursor(self):
+        return SlowCursor(self)
+
+
+class SlowCursor:
+    description = [("n",)]
+
+    def __init__(self, connection):
+        self.connection = connection
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+    def execute(self, query):
+        if self.connection._cancelled.wait(self.connection.run_secs):
+            raise Exception("Execution canceled by operator")
+
+    def fetchall(self):
+        return [[1]]
+
+
+def test_cancelled_query_times_out_quietly(capsys):
+    connection = SlowConnection()
+    with vertica.QueryTimer(connection, 0.05) as timer:
+        assert vertica.execute_vertica_query(connection, "select 1") is None
+    assert timer.expired and connection.cancels == 1
+    # only the TIMEOUT of the report is printed, not the error of the cancelled statement
+    assert "Error executing query" not in capsys.readouterr().out
+    assert not vertica.is_being_cancelled(connection)
+
+
+def test_timer_cancels_nothing_once_exited():
+    connection = SlowConnection(run_secs=0)
+    with vertica.QueryTimer(connection, 0.05) as timer:
+        vertica.execute_vertica_query(connection, "select 1")
+    # the timer firing right after the block, e.g. while the next job runs, is a no-op
+    timer._cancel()
+    time.sleep(0.1)
+    assert not timer.expired and connection.cancels == 0
+
+
+def test_other_errors_are_printed(capsys):
+    class FailingCursor(SlowCursor):
+        def execute(self, query):
+            raise Exception("boom")
+
+    connection = SlowConnection()
+    connection.cursor = lambda: FailingCursor(connection)
+    assert vertica.execute_vertica_query(connection, "select 1") is None
+    assert "Error executing query: boom" in capsys.readouterr().out
@@ -0,0 +1,53 @@
+import pytest
+
+pytest.importorskip("redis")
+
+
+def test_unknown_subcluster_raises(standin):
+    import vertica_debug_report
+    from modules.topology import NodesNotFound
+
+    with pytest.raises(NodesNotFound):
+        vertica_debug_report.get_ips_and_nodes("no_such_subcluster")
+
+
+def test_report_of_unknown_subcluster_raises(standin, monkeypatch):
+    # not swallowed by the except Exception of the report, main prints it and exits
+    import vertica_debug_report
+    from modules.args_parser import pargse_args
+    from modules.topology import NodesNotFound
+
+    monkeypatch.setattr(vertica_debug_report, "is_header_printed", False)
+    filters, is_now, insights_only, with_insights, json_file_path, queries_to_execute = pargse_args(False, argv=["--subcluster-name", "no_such_subcluster", "--queries-to-execute", "sessions", "--insights-only"])
+    with pytest.raises(NodesNotFound):
+        vertica_debug_report.execute_queries_from_json({}, json_file_path, filters, filters['verbose'], is_now, insights_only, with_insights, queries_to_execute)
+    # the header is printed by the next report that finds the nodes
+    assert vertica_debug_report.is_header_printed is False
+
+
+def test_refresh_of_unknown_subcluster_does_not_exit(standin, monkeypatch, capsys):
+    # a SystemExit would get past the except Exception of refresh_worker.run and stop the worker
+    import refresh_worker
+    import vertica_debug_report
+
+    monkeypatch.setattr(vertica_debug_report, "is_header_printed", False)
+
+    refreshed = []
+
+    def refresh_query_single_flight(redis_client, json_file_path, subcluster_name, query_name):
+        refreshed.append((subcluster_name, query_name))
+        if len(refreshed) > 1:
+            raise KeyboardInterrupt()
+        refresh_worker.refresh_query(None, json_file_path, subcluster_name, query_name)
+
+    monkeypatch.setattr(refresh_worker, "connect_to_redis", lambda: None)
+    monkeypatch.setattr(refresh_worker.topology_cache, "redis_client", refresh_worker.topology_cache.redis_client)
+    monkeypatch.setattr(refresh_worker, "get_refresh_intervals", lambda path: {"sessions": 0})
+    monkeypatch.setattr(refresh_worker, "refresh_query_single_flight", refresh_query_single_flight)
+    monkeypatch.setattr(refresh_worker.time, "sleep", lambda secs: None)
+    with pytest.raises(KeyboardInterrupt):
+        refresh_worker.run(["no_such_subcluster"], "queries.json")
+
+    # logged, and tried again on the next round
+    assert "Error while refreshing sessions on no_such_subcluster: Error getting nodes and ips for subcluster no_such_subcluster" in capsys.readouterr().out
+    assert refreshed == [("no_such_subcluster", "sessions")] * 2
@@ -0,0 +1,49 @@
+import io
+
+import pytest
+
+from modules.renderer import StreamingTable
+from modules.thresholds import LEVEL_COLOURS, RESET_COLOUR
+
+tabulate = pytest.importorskip("tabulate").tabulate
+
+HEADERS = ["user_name", "cnt", "ratio", "note"]
+ROWS = [
+    ["user_1", 12, 0.5, "short"],
+    ["u2", 3, 12.125, "two\nlines"],
+    ["user_three", 100, None, None],
+]
+
+
+def render(batches, **kwargs):
+    output = io.StringIO()
+    table = StreamingTable(HEADERS, file=output, **kwargs)
+    for batch in batches:
+        table.write_batch(batch)
+    return output.getvalue(), table
+
+
+def test_matches_tabulate_grid():
+    output, table = render([ROWS])
+    assert output == tabulate(ROWS, headers=HEADERS, tablefmt="grid", floatfmt=".2f") + "\n"
+    assert table.row_count == 3
+
+
+def test_batches_use_the_widths_of_the_first_one():
+    output, table = render([ROWS[:2], [["user_number_three", 100, None, None]]])
+    lines = output.splitlines()
+    assert lines[:len(lines) - 2] == tabulate(ROWS[:2], headers=HEADERS, tablefmt="grid", floatfmt=".2f").splitlines()
+    # wider than the first batch, the value overflows its cell
+    assert "| user_number_three |" in lines[-2]
+    assert table.row_count == 3
+
+
+def test_levels_colour_cells_without_changing_the_layout():
+    output = io.StringIO()
+    StreamingTable(HEADERS, file=output).write_batch(ROWS, levels={1: [2, 0, 1]})
+    coloured = output.getvalue()
+    assert LEVEL_COLOURS[2] + "12" + RESET_COLOUR in coloured
+    for colour in LEVEL_COLOURS:
+        coloured = coloured.replace(colour, "")
+    assert coloured.replace(RESET_COLOUR, "") == tabulate(ROWS, headers=HEADERS, tablefmt="grid", floatfmt=".2f") + "\n"
+
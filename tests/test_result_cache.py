@@ -0,0 +1,65 @@
+from datetime import datetime, timedelta
+
+from modules.result_cache import ISSUE_TIME_FORMAT_US, ResultCache, execute_bucketed_query, get_digest, split_window
+
+HEADERS = ["time_bucket", "cnt"]
+START = datetime(2025, 1, 10, 0, 0)
+# one row every 15 minutes for a day
+ROWS = [[START + timedelta(minutes=15 * i), i] for i in range(96)]
+
+
+def test_split_window():
+    start, end = datetime(2025, 1, 10, 10, 30), datetime(2025, 1, 10, 13, 30)
+    assert split_window(start, end, "hour", datetime(2025, 1, 11)) == [
+        (start, datetime(2025, 1, 10, 11), None),
+        (datetime(2025, 1, 10, 11), datetime(2025, 1, 10, 12), datetime(2025, 1, 10, 11)),
+        (datetime(2025, 1, 10, 12), datetime(2025, 1, 10, 13), datetime(2025, 1, 10, 12)),
+        (datetime(2025, 1, 10, 13), end, None),
+    ]
+
+
+def test_open_buckets_are_not_cached():
+    start, end = datetime(2025, 1, 10, 10), datetime(2025, 1, 10, 13)
+    # 12:00-13:00 closes less than SETTLE_SECS before now
+    segments = split_window(start, end, "hour", datetime(2025, 1, 10, 13, 10))
+    assert [bucket_start for _, _, bucket_start in segments] == [datetime(2025, 1, 10, 10), datetime(2025, 1, 10, 11), None, None]
+
+
+def test_digest_ignores_the_time_window():
+    conditions = {"subcluster_name": "sc", "issue_time": "2025-01-10 10:00:00", "duration": 3}
+    digest = get_digest("query_count", "select 1", conditions)
+    assert digest == get_digest("query_count", "select 1", {**conditions, "issue_time": "2025-01-11 10:00:00", "duration": 5})
+    assert digest != get_digest("query_count", "select 1", {**conditions, "subcluster_name": "other"})
+
+
+def run(cache, windows, issue_time, duration):
+    def render(end, hours):
+        windows.append((end, hours))
+        return end, hours
+
+    def execute(query):
+        end = datetime.strptime(query[0], ISSUE_TIME_FORMAT_US)
+        start = end - timedelta(hours=query[1])
+        return [list(row) for row in ROWS if start <= row[0] <= end], HEADERS
+
+    return execute_bucketed_query(execute, render, "time_bucket", "desc", "hour", issue_time, duration, "digest", cache)
+
+
+def test_closed_buckets_are_read_from_the_cache(tmp_path):
+    cache = ResultCache(str(tmp_path / "cache.sqlite"))
+    issue_time = "2025-01-10 12:30:00"
+
+    first_windows, second_windows = [], []
+    first = run(cache, first_windows, issue_time, 3)
+    second = run(cache, second_windows, issue_time, 3)
+
+    expected = [row for row in ROWS if datetime(2025, 1, 10, 9, 30) <= row[0] <= datetime(2025, 1, 10, 12, 30)]
+    assert first == second
+    assert sorted(first[0]) == sorted(expected)
+    # ordered by time bucket, desc
+    buckets = [row[0].replace(minute=0) for row in first[0]]
+    assert buckets == sorted(buckets, reverse=True)
+    # the second run only queries the partial edges, 9:30-10:00 and 12:00-12:30
+    assert len(first_windows) == 1 and len(second_windows) == 2
+    assert [hours for _, hours in second_windows] == [0.5 - 1e-6 / 3600, 0.5]
+    assert cache.get_headers("digest") == HEADERS
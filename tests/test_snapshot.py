@@ -0,0 +1,97 @@
+import json
+from datetime import datetime
+from decimal import Decimal
+
+import pytest
+
+from modules import snapshot
+from modules.snapshot import SnapshotWriter, load_snapshot
+
+HEADERS = ["user_name", "cnt", "ratio"]
+ROWS = [["a", 1, 0.5], ["b", None, 1.25]]
+
+
+def write(path):
+    writer = SnapshotWriter(str(path), {"subcluster_name": "sc"}, True, [("v_node0001", "10.0.0.1", "sc")])
+    writer.add({"qid": 1, "query_name": "sessions", "query_description": "d", "final_query": "select 1", "show_limit": 5}, ROWS, HEADERS)
+    writer.add({"qid": 2, "query_name": "empty", "query_description": "d", "final_query": "select 2", "show_limit": None}, [], HEADERS)
+    writer.add({"qid": 3, "query_name": "failed", "query_description": "d", "final_query": "select 3", "show_limit": None}, None, None)
+    writer.add({"qid": 4, "query_name": "missing", "query_description": "d", "final_query": "select 4", "show_limit": None}, -1, None)
+    writer.close()
+
+
+def check_round_trip(path):
+    manifest, entries = load_snapshot(str(path))
+    assert manifest["filters"] == {"subcluster_name": "sc"} and manifest["is_now"] is True
+    assert manifest["nodes"] == [["v_node0001", "10.0.0.1", "sc"]]
+
+    entries = list(entries)
+    assert [job["query_name"] for job, _, _ in entries] == ["sessions", "empty", "failed", "missing"]
+    assert entries[0] == ({"qid": 1, "query_name": "sessions", "query_description": "d", "final_query": "select 1", "show_limit": 5}, ROWS, HEADERS)
+    assert entries[1][1:] == ([], HEADERS)
+    assert entries[2][1:] == (None, None)
+    assert entries[3][1:] == (-1, None)
+    return manifest
+
+
+def test_round_trip_arrow(tmp_path, monkeypatch):
+    pytest.importorskip("pyarrow")
+    monkeypatch.setattr(snapshot, "pa", None)
+    write(tmp_path)
+    manifest = check_round_trip(tmp_path)
+    assert manifest["queries"][0]["format"] == "arrow"
+
+
+def test_columns_without_arrow_type_round_trip(tmp_path, monkeypatch):
+    pytest.importorskip("pyarrow")
+    relativedelta = pytest.importorskip("dateutil.relativedelta").relativedelta
+    monkeypatch.setattr(snapshot, "pa", None)
+    rows = [
+        [relativedelta(minutes=3, seconds=2, microseconds=5), datetime(2025, 1, 10, 10, 0), Decimal("1.50"), "a"],
+        [None, None, None, 1],
+    ]
+    headers = ["running_time", "start_timestamp", "ratio", "mixed"]
+    writer = SnapshotWriter(str(tmp_path), {}, True, [])
+    writer.add({"qid": 1, "query_name": "long_running_queries_raw", "query_description": "d", "final_query": "select 1", "show_limit": None}, rows, headers)
+    writer.close()
+
+    _, entries = load_snapshot(str(tmp_path))
+    assert list(entries)[0][1:] == (rows, headers)
+
+
+def test_display_rows_round_trip(tmp_path, monkeypatch):
+    pytest.importorskip("pyarrow")
+    monkeypatch.setattr(snapshot, "pa", None)
+    job = {"qid": 1, "query_name": "sessions", "query_description": "d", "final_query": "select 1", "show_limit": None,
+           "display_query": "select 1 limit 1", "display_result": ROWS[:1]}
+    writer = SnapshotWriter(str(tmp_path), {}, False, [])
+    writer.add(job, ROWS, HEADERS)
+    writer.close()
+
+    _, entries = load_snapshot(str(tmp_path))
+    assert list(entries) == [(job, ROWS, HEADERS)]
+
+
+def test_pyarrow_is_required(tmp_path, monkeypatch):
+    monkeypatch.setattr(snapshot, "pa", False)
+    with pytest.raises(ValueError, match="pyarrow"):
+        SnapshotWriter(str(tmp_path), {}, True, [])
+
+
+def test_pickled_columns_are_not_loaded(tmp_path):
+    with open(tmp_path / snapshot.SNAPSHOT_MANIFEST, "w") as manifest_file:
+        json.dump({"version": snapshot.SNAPSHOT_VERSION, "filters": {}, "nodes": [], "queries": [
+            {"qid": 1, "query_name": "sessions", "query_description": "d", "final_query": "select 1", "show_limit": None,
+             "column_headers": HEADERS, "file": "1_sessions.pickle.gz", "format": "pickle"},
+        ]}, manifest_file)
+    _, entries = load_snapshot(str(tmp_path))
+    with pytest.raises(ValueError, match="unsupported snapshot file format"):
+        list(entries)
+
+
+def test_unsupported_version(tmp_path, monkeypatch):
+    monkeypatch.setattr(snapshot, "SNAPSHOT_VERSION", 1)
+    write(tmp_path)
+    monkeypatch.setattr(snapshot, "SNAPSHOT_VERSION", 2)
+    with pytest.raises(ValueError):
+        load_snapshot(str(tmp_path))
@@ -0,0 +1,54 @@
+from datetime import datetime, timedelta
+
+
+def run_report(monkeypatch, capsys, *argv):
+    import vertica_debug_report
+    from benchmarks.standin import SUBCLUSTER_NAME
+    from modules.args_parser import pargse_args
+
+    monkeypatch.setattr(vertica_debug_report, "is_header_printed", True)
+    filters, is_now, insights_only, with_insights, json_file_path, queries_to_execute = pargse_args(False, argv=["--subcluster-name", SUBCLUSTER_NAME, *argv])
+    insights_json = {}
+    vertica_debug_report.execute_queries_from_json(insights_json, json_file_path, filters, filters['verbose'], is_now, insights_only, with_insights, queries_to_execute)
+    return insights_json, capsys.readouterr().out
+
+
+def test_timestamps_are_datetimes(standin):
+    from vertica import vertica
+
+    connection = vertica.get_shared_vertica_connection()
+    with connection.cursor() as cursor:
+        cursor.execute("select date_trunc('hour', event_timestamp) as event_timestamp_trunc, count(1) from error_messages where message ilike '%1000 sessions%'")
+        rows = cursor.fetchall()
+    assert rows and all(isinstance(row[1], datetime) for row in rows)
+
+
+def test_trailing_limit_is_applied(standin):
+    from vertica import vertica
+
+    connection = vertica.get_shared_vertica_connection()
+    with connection.cursor() as cursor:
+        cursor.execute("select node_name, schema_name, projection_name from storage_containers limit 3;")
+        assert len(cursor.fetchall()) == 3
+
+
+def test_issue_time_report_through_the_result_cache(standin, tmp_path, monkeypatch, capsys):
+    from modules import result_cache
+
+    monkeypatch.setattr(result_cache, "RESULT_CACHE_PATH", str(tmp_path / "result_cache.sqlite"))
+    issue_time = (datetime.now() - timedelta(hours=1)).strftime("%Y-%m-%d %H:%M:%S")
+
+    for _ in range(2):
+        _, output = run_report(monkeypatch, capsys, "--issue-time", issue_time, "--queries-to-execute", "error_messages,query_count")
+        assert "Error while processing" not in output
+    assert (tmp_path / "result_cache.sqlite").exists()
+
+
+def test_pushdown_summaries_match_the_evaluator(standin, monkeypatch, capsys):
+    def messages(insights_json):
+        return {query_name: [dict(item)["message"] for item in value["insights"]] for query_name, value in insights_json.items()}
+
+    evaluated, _ = run_report(monkeypatch, capsys, "--insights-only")
+    summarised, output = run_report(monkeypatch, capsys, "--insights-only", "--pushdown-thresholds")
+    assert "Error while processing" not in output
+    assert messages(summarised) == messages(evaluated)
@@ -0,0 +1,23 @@
+import os
+import subprocess
+import sys
+
+import pytest
+
+REPO_PATH = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def get_imported_modules(*args):
+    process = subprocess.run([sys.executable, "-X", "importtime", os.path.join(REPO_PATH, "vertica_debug_report.py"), *args],
+        cwd=REPO_PATH, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True)
+    return {line.split("|")[-1].strip() for line in process.stderr.splitlines() if line.startswith("import time:")}
+
+
+@pytest.mark.parametrize("args", [["--help"], ["--list", "examples"]])
+def test_commands_without_vertica_do_not_load_it(args):
+    pytest.importorskip("tabulate")
+    modules = get_imported_modules(*args)
+    # the command ran, up to the report modules
+    assert "modules.catalog" in modules
+    assert "dotenv" not in modules
+    assert "vertica_python" not in modules
@@ -0,0 +1,77 @@
+import pytest
+
+from modules import thresholds
+from modules.thresholds import FATAL, OK, WARN, ThresholdEvaluator
+
+ITEMS = [
+    {"columns_name": "cnt", "unique_column": "user_name", "threshold": {"ok": -1, "warn": 10, "fatal": 20}},
+    {"columns_name": "deleted_row_cnt", "unique_column": "", "threshold": {"ok": -1, "warn_percent": 10, "fatal_percent": 50}},
+]
+HEADERS = ["user_name", "cnt", "deleted_row_cnt", "total_row_cnt"]
+ROWS = [
+    ["a", 5, 0, 100],
+    ["b", 10, 10, 100],
+    ["c", 25, 60, 100],
+    ["c", 20, 9, 100],
+]
+
+
+def evaluate(batches):
+    evaluator = ThresholdEvaluator(ITEMS, HEADERS)
+    levels = [evaluator.add_batch(rows) for rows in batches]
+    return levels, evaluator.get_counts(), evaluator.row_count
+
+
+@pytest.fixture
+def pure_python(monkeypatch):
+    monkeypatch.setattr(thresholds, "np", False)
+
+
+def test_levels_and_counts(pure_python):
+    levels, counts, row_count = evaluate([ROWS])
+    assert levels == [[[OK, WARN, FATAL, FATAL], [OK, WARN, FATAL, OK]]]
+    assert row_count == 4
+    assert counts[0]["ok_count"] == 1 and counts[0]["warn_count"] == 1 and counts[0]["fatal_count"] == 2
+    assert counts[0]["fatal_values"] == {"c"} and counts[0]["ok_values"] == {"a"}
+    # total sums the ok values
+    assert counts[0]["total"] == 5
+    assert counts[1]["total"] == 9
+
+
+def test_batches_accumulate(pure_python):
+    assert evaluate([ROWS[:2], ROWS[2:]])[1:] == evaluate([ROWS])[1:]
+
+
+def test_empty_batch(pure_python):
+    assert evaluate([[]])[0] == [[[], []]]
+
+
+def test_numpy_matches_pure_python(monkeypatch):
+    pytest.importorskip("numpy")
+    monkeypatch.setattr(thresholds, "np", False)
+    expected = evaluate([ROWS])
+    monkeypatch.setattr(thresholds, "np", None)
+    assert thresholds.get_numpy() is not None
+    assert evaluate([ROWS]) == expected
+
+
+def test_missing_column():
+    with pytest.raises(ValueError):
+        ThresholdEvaluator(ITEMS, ["user_name", "cnt"])
+
+
+def test_plain_report_does_not_colour_deleted_row_cnt(standin, capsys):
+    import vertica_debug_report
+    from benchmarks.standin import SUBCLUSTER_NAME
+    from modules.args_parser import pargse_args
+
+    filters, is_now, insights_only, with_insights, json_file_path, queries_to_execute = pargse_args(False, argv=["--subcluster-name", SUBCLUSTER_NAME, "--queries-to-execute", "delete_vectors"])
+    vertica_debug_report.execute_queries_from_json({}, json_file_path, filters, filters['verbose'], is_now, insights_only, with_insights, queries_to_execute)
+    lines = capsys.readouterr().out.splitlines()
+
+    headers = [cell.strip() for cell in next(line for line in lines if "deleted_row_cnt" in line).split("|")]
+    rows = [line.split("|") for line in lines if line.startswith("|") and "deleted_row_cnt" not in line]
+    assert rows
+    # like colour_values did, only delete_vector_cnt is coloured
+    assert not any("\033[" in row[headers.index("deleted_row_cnt")] for row in rows)
+    assert all("\033[" in row[headers.index("delete_vector_cnt")] for row in rows)
@@ -0,0 +1,48 @@
+import sqlite3
+
+import pytest
+
+
+def run_watch(path, queries_to_execute, iterations, between_runs=None, monkeypatch=None):
+    import vertica_debug_report
+    from benchmarks.standin import SUBCLUSTER_NAME
+    from modules.args_parser import pargse_args
+
+    filters, is_now, insights_only, with_insights, json_file_path, queries = pargse_args(False, argv=["--subcluster-name", SUBCLUSTER_NAME, "--queries-to-execute", queries_to_execute])
+    if between_runs is not None:
+        monkeypatch.setattr(vertica_debug_report.time, "sleep", lambda secs: between_runs(path))
+    vertica_debug_report.watch_queries_from_json(json_file_path, filters, False, is_now, insights_only, with_insights, queries, 0, iterations=iterations)
+
+
+def delete_sessions(path):
+    with sqlite3.connect(path) as connection:
+        connection.execute("delete from sessions")
+
+
+def test_get_row_changes_keeps_duplicates_and_order():
+    pytest.importorskip("dotenv")
+    pytest.importorskip("tabulate")
+    from vertica_debug_report import get_row_changes
+
+    added, removed = get_row_changes([(1,), (2,), (2,), (3,)], [(2,), (3,), (4,), (4,)])
+    assert added == [(4,), (4,)]
+    assert removed == [(1,), (2,)]
+
+
+def test_watch_empty_result(standin, capsys):
+    delete_sessions(standin)
+    run_watch(standin, "long_running_queries_raw", 1)
+    assert "No records found" in capsys.readouterr().out
+
+
+def test_watch_prints_rows_gone(standin, capsys, monkeypatch):
+    # the second run is empty, its rows are printed with the column headers of the first one
+    run_watch(standin, "sessions", 2, between_runs=delete_sessions, monkeypatch=monkeypatch)
+    output = capsys.readouterr().out
+    assert "rows gone)" in output
+    assert "No changes" not in output
+
+
+def test_watch_no_changes(standin, capsys):
+    run_watch(standin, "sessions", 2)
+    assert capsys.readouterr().out.rstrip().endswith("No changes")
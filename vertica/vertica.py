@@ -1,23 +1,53 @@
-import vertica_python
-from vertica_python import errors
+import atexit
 import os
-from dotenv import load_dotenv
+import queue
+import threading
+import time
+from contextlib import contextmanager
+from functools import lru_cache
+from modules.profiler import profiler
+
+DEFAULT_BATCH_SIZE = 1000
+# query_result of a query cancelled because it ran out of time, next to -1 (column not found)
+TIMED_OUT = -2
+# a shared connection idle for longer than this is pinged before it is handed out again
+HEALTH_CHECK_IDLE_SECS = 30
+
+
+def get_driver():
+    """vertica_python, imported by the first connection or query error so the commands
+    that never reach Vertica (--help, --list examples) do not pay for loading it."""
+    import vertica_python
+    return vertica_python
+
+
+@lru_cache(maxsize=None)
+def load_env():
+    """Loads .env into the environment once, by the first connection, for the same reason as get_driver."""
+    from dotenv import load_dotenv
+    load_dotenv()
+
+
+@lru_cache(maxsize=None)
+def parse_connection_string(vertica_connection_string):
+    conn_info = {}
+    for part in vertica_connection_string.split(";"):
+        key, value = part.split("=")
+        conn_info[key.strip()] = value.strip()
+
+    conn_info.setdefault("tlsmode", "disable")
+    return conn_info
 
-load_dotenv()
 
 def get_vertica_connection():
     try:
+        load_env()
         vertica_connection_string = os.getenv("VERTICA_CONNECTION_STRING")
         if not vertica_connection_string:
             raise ValueError("VERTICA_CONNECTION_STRING is not set in the .env file.")
-        
-        conn_info = {}
-        for part in vertica_connection_string.split(";"):
-            key, value = part.split("=")
-            conn_info[key.strip()] = value.strip()
-
-        conn_info.setdefault("tlsmode", "disable")
-        connection = vertica_python.connect(**conn_info)
+
+        with profiler.stage("connect"):
+            connection = get_driver().connect(**parse_connection_string(vertica_connection_string))
         return connection
 
     except Exception as e:
@@ -25,19 +55,331 @@ def get_vertica_connection():
         return None
 
 
+class VerticaConnectionPool:
+    """Bounded pool of Vertica connections, opened lazily up to `size`.
+
+    vertica-python only supports one cursor per connection, so a connection
+    is handed to exactly one thread at a time.
+    """
+    def __init__(self, size):
+        self.size = max(1, int(size))
+        self._idle = queue.LifoQueue()
+        self._opened = 0
+        self._all = []
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        while True:
+            try:
+                connection = self._idle.get_nowait()
+            except queue.Empty:
+                break
+            if is_connection_open(connection):
+                return connection
+            self._discard(connection)
+
+        with self._lock:
+            can_open = self._opened < self.size
+            if can_open:
+                self._opened += 1
+
+        if can_open:
+            connection = get_vertica_connection()
+            if connection is None:
+                with self._lock:
+                    self._opened -= 1
+                return None
+            with self._lock:
+                self._all.append(connection)
+            return connection
+
+        connection = self._idle.get()
+        if is_connection_open(connection):
+            return connection
+        self._discard(connection)
+        return self.acquire()
+
+    def _discard(self, connection):
+        with self._lock:
+            if connection in self._all:
+                self._all.remove(connection)
+                self._opened -= 1
+        close_connection(connection)
+
+    def release(self, connection):
+        if connection is not None:
+            self._idle.put(connection)
+
+    @contextmanager
+    def connection(self):
+        connection = self.acquire()
+        try:
+            yield connection
+        finally:
+            self.release(connection)
+
+    def close(self):
+        with self._lock:
+            connections, self._all = self._all, []
+            self._opened = 0
+        while not self._idle.empty():
+            self._idle.get_nowait()
+        for connection in connections:
+            close_connection(connection)
+
+
+def is_connection_open(connection):
+    try:
+        return not connection.closed()
+    except Exception:
+        return False
+
+
+def close_connection(connection):
+    try:
+        connection.close()
+    except Exception as e:
+        print(f"Error while closing Vertica connection: {e}")
+
+
+class VerticaConnectionManager:
+    """Connections shared by every entry point of the process (CLI, topology lookups,
+    query breakdown, refresh worker), so a run pays the connection handshake once.
+
+    vertica-python connections have a single cursor, so every thread gets its own shared
+    connection; the one of a thread that has exited is closed by the next lookup. They
+    are opened lazily, checked before reuse (reconnecting when the session died) and
+    closed when the process exits, along with the pools.
+    """
+    def __init__(self, health_check_idle_secs=HEALTH_CHECK_IDLE_SECS):
+        self.health_check_idle_secs = health_check_idle_secs
+        # thread -> [connection, last used]
+        self._connections = {}
+        # size -> pool, a pool is never closed while the process may still use it
+        self._pools = {}
+        self._lock = threading.RLock()
+        atexit.register(self.close)
+
+    def _is_healthy(self, connection, last_used):
+        if not is_connection_open(connection):
+            return False
+        if time.monotonic() - last_used < self.health_check_idle_secs:
+            return True
+        try:
+            with connection.cursor() as cursor:
+                cursor.execute("SELECT 1")
+                cursor.fetchall()
+            return True
+        except Exception:
+            return False
+
+    def _close_orphans(self):
+        for thread in [thread for thread in self._connections if not thread.is_alive()]:
+            close_connection(self._connections.pop(thread)[0])
+
+    def get_connection(self):
+        """The shared connection of the calling thread, or None when Vertica can not be reached.
+
+        It has a single cursor: a QueryStream opened on it has to be consumed or
+        closed before anything else runs on the shared connection.
+        """
+        thread = threading.current_thread()
+        with self._lock:
+            self._close_orphans()
+            connection, last_used = self._connections.pop(thread, (None, 0))
+
+        # only this thread uses the connection, it is checked outside the lock
+        if connection is not None and not self._is_healthy(connection, last_used):
+            close_connection(connection)
+            connection = None
+        if connection is None:
+            connection = get_vertica_connection()
+
+        if connection is not None:
+            with self._lock:
+                self._connections[thread] = [connection, time.monotonic()]
+        return connection
+
+    def get_pool(self, size):
+        size = max(1, int(size))
+        with self._lock:
+            if size not in self._pools:
+                self._pools[size] = VerticaConnectionPool(size)
+            return self._pools[size]
+
+    def close(self):
+        with self._lock:
+            connections, self._connections = self._connections, {}
+            pools, self._pools = self._pools, {}
+        for connection, _ in connections.values():
+            close_connection(connection)
+        for pool in pools.values():
+            pool.close()
+
+
+connection_manager = VerticaConnectionManager()
+
+
+def get_shared_vertica_connection():
+    return connection_manager.get_connection()
+
+
+def get_vertica_connection_pool(size):
+    """The shared pool of that size of the process, kept open across runs."""
+    return connection_manager.get_pool(size)
+
+
+def close_shared_connections():
+    connection_manager.close()
+
+
+def handle_query_error(e, vertica_connection=None):
+    """-1 when the query refers to a column or table that does not exist, None otherwise.
+
+    The error of a statement cancelled by a QueryTimer is not printed, the timeout is reported instead.
+    """
+    from vertica_python import errors
+    if isinstance(e, errors.MissingColumn):
+        return -1
+    if isinstance(e, errors.QueryError) and "does not exist" in str(e):
+        return -1
+    if not is_being_cancelled(vertica_connection):
+        print(f"Error executing query: {e}")
+    return None
+
+
 def execute_vertica_query(vertica_connection, query):
     try:
         with vertica_connection.cursor() as cursor:
-            cursor.execute(query)
-            result = cursor.fetchall()
+            with profiler.stage("execute"):
+                cursor.execute(query)
+            with profiler.stage("fetch"):
+                result = cursor.fetchall()
+            profiler.add_rows("fetch", result)
             return result
-    except errors.MissingColumn as e:
-        return -1
-    except errors.QueryError as e:
-        if "does not exist" in str(e):
-            return -1
-        else:
-            print(f"Error executing query: {e}")
     except Exception as e:
-        print(f"Error executing query: {e}")
-        return None
\ No newline at end of file
+        return handle_query_error(e, vertica_connection)
+
+
+def execute_vertica_batch(vertica_connection, queries):
+    """Executes several queries as one multi-statement request, a single round trip.
+
+    Returns [(rows, column_headers)] in the order of queries, or None when any of
+    them fails, the caller then runs them one by one to report the failing one.
+    """
+    try:
+        with vertica_connection.cursor() as cursor:
+            with profiler.stage("execute"):
+                cursor.execute("\n".join(query.strip().rstrip(";") + ";" for query in queries))
+            results = []
+            while True:
+                column_headers = [desc[0] for desc in cursor.description] if cursor.description else None
+                with profiler.stage("fetch"):
+                    rows = cursor.fetchall()
+                profiler.add_rows("fetch", rows)
+                results.append((rows, column_headers))
+                if not cursor.nextset():
+                    break
+    except Exception:
+        return None
+
+    return results if len(results) == len(queries) else None
+
+
+# ids of the connections whose statement a QueryTimer cancelled, until the timed block exits
+cancelled_connections = set()
+
+
+def is_being_cancelled(vertica_connection):
+    return vertica_connection is not None and id(vertica_connection) in cancelled_connections
+
+
+class QueryTimer:
+    """Cancels the statement running on the connection (server side) when the block
+    takes longer than timeout_secs, expired tells whether it did.
+
+    Once the block has exited the timer cancels nothing, so a late timer never reaches the
+    statement of the next job on the connection.
+    """
+    def __init__(self, vertica_connection, timeout_secs):
+        self.expired = False
+        self._done = False
+        self._lock = threading.Lock()
+        self._connection = vertica_connection
+        self._timer = threading.Timer(timeout_secs, self._cancel)
+        self._timer.daemon = True
+
+    def _cancel(self):
+        with self._lock:
+            if self._done:
+                return
+            self.expired = True
+            cancelled_connections.add(id(self._connection))
+            try:
+                self._connection.cancel()
+            except Exception as e:
+                print(f"Error while cancelling Vertica query: {e}")
+
+    def __enter__(self):
+        self._timer.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        # waits for a cancel in progress, the connection is only reused once it is through
+        with self._lock:
+            self._done = True
+            self._timer.cancel()
+            cancelled_connections.discard(id(self._connection))
+        return False
+
+
+class QueryStream:
+    """Rows of an executed query, fetched from the server `batch_size` rows at a time.
+
+    The cursor stays open until the rows are consumed or close() is called, so
+    the connection must not run another query before that.
+    """
+    def __init__(self, cursor, batch_size=DEFAULT_BATCH_SIZE):
+        self.cursor = cursor
+        self.batch_size = max(1, int(batch_size))
+        self.column_headers = [desc[0] for desc in cursor.description] if cursor.description else None
+        self.row_count = 0
+
+    def batches(self):
+        try:
+            while True:
+                with profiler.stage("fetch"):
+                    rows = self.cursor.fetchmany(self.batch_size)
+                if not rows:
+                    break
+                profiler.add_rows("fetch", rows)
+                self.row_count += len(rows)
+                yield rows
+        except Exception as e:
+            print(f"Error fetching query result: {e}")
+        finally:
+            self.close()
+
+    def __iter__(self):
+        for rows in self.batches():
+            yield from rows
+
+    def fetchall(self):
+        return list(self)
+
+    def close(self):
+        try:
+            self.cursor.close()
+        except Exception:
+            pass
+
+
+def stream_vertica_query(vertica_connection, query, batch_size=DEFAULT_BATCH_SIZE):
+    """Like execute_vertica_query, but returns a QueryStream instead of fetching every row."""
+    try:
+        cursor = vertica_connection.cursor()
+        with profiler.stage("execute"):
+            cursor.execute(query)
+        return QueryStream(cursor, batch_size)
+    except Exception as e:
+        return handle_query_error(e, vertica_connection)
@@ -2,32 +2,38 @@
 
 import json
 import sys
-from dotenv import load_dotenv
-from tabulate import tabulate
 from datetime import datetime, timedelta
 import re
+import time
+import contextlib
+import io
+from collections import Counter
+from itertools import chain
 from vertica import vertica
-from modules.helpers import replace_conditions, push_to_insights_json, replace_tables_in_query, process_query_result_and_highlight_text
-from modules.helpers import get_past_datetime
-from query_breakdown import query_breakdown
-from modules.args_parser import get_args, pargse_args
+from modules.helpers import replace_conditions, push_to_insights_json, replace_tables_in_query, process_query_result_and_highlight_text, highlight_severity
+from modules.helpers import get_past_datetime, tabulate
+from modules.catalog import get_queries_catalog, get_thresholds_catalog, THRESHOLDS_FILE_PATH
+from modules.result_cache import execute_bucketed_query, get_digest, GRANULARITIES
+from modules.topology import TopologyCache, NodesNotFound
+from modules.profiler import profiler
+from modules.renderer import StreamingTable
+from modules.thresholds import ThresholdEvaluator, ThresholdCounts, colour_rows, get_thresholds, get_summary_query, get_summary_counts, DISPLAY_SKIPPED_COLUMNS
 
-THRESHOLD_FILE_PATH="thresholds.json"
+THRESHOLD_FILE_PATH=THRESHOLDS_FILE_PATH
+# insight queries analysed by their own branch of analyse, their rows can not be summarised by the generic threshold query
+CUSTOM_ANALYSIS_QUERIES = ("resource_pool_status", "long_running_queries", "long_running_queries_raw")
+
+topology_cache = TopologyCache(lambda query: vertica.execute_vertica_query(vertica.get_shared_vertica_connection(), query))
 
 def get_nodes():
-    connection = vertica.get_vertica_connection()
-    query = "select node_name, node_address, subcluster_name from nodes;"
-    return vertica.execute_vertica_query(connection, query)
+    return topology_cache.get_nodes()
 
 
 def get_ips_and_nodes(subcluster_name):
-    query = f"select node_address, node_name from nodes where subcluster_name='{subcluster_name}';"
-    connection = vertica.get_vertica_connection()
-    query_result = vertica.execute_vertica_query(connection, query)
+    query_result = topology_cache.get_subcluster_nodes(subcluster_name)
 
     if query_result is None or len(query_result) == 0:
-        print(f"Error getting nodes and ips for subcluster {subcluster_name}")
-        exit()
+        raise NodesNotFound(f"Error getting nodes and ips for subcluster {subcluster_name}")
     
     ips, nodes = [], []
     for row in query_result:
@@ -54,109 +60,113 @@ def print_header(args):
     print(tabulate(table_data, tablefmt="grid"))
 
 
+def get_report_header_args(filters, is_now):
+    return {
+        "subcluster_name": filters["subcluster_name"],
+        "user_name": filters["user_name"],
+        "pool_name": filters["pool_name"],
+        "is_now": is_now,
+        "issue_time": filters["issue_time"],
+        "duration": filters["duration"],
+    }
+
+
+def print_report_header(filters, is_now):
+    global is_header_printed
+    if is_header_printed:
+        return
+    print_header(get_report_header_args(filters, is_now))
+    # a lookup that failed is tried again by the next report of the process
+    is_header_printed = True
+
+
 def replace_row_num_limit(query, new_limit):
     pattern = r"rs\.row_num\s*<=\s*\d+\s"
     replacement = f"rs.row_num <= {new_limit} "
     return re.sub(pattern, replacement, query)
 
 
-def colour_values(query_result, columns, headers):
-    for column in columns:
-        if column['columns_name'] == 'deleted_row_cnt':
-            continue
-        try:
-            column_name = column['columns_name']
-            index = headers.index(column_name)
-            if index == -1:
-                print(f'column {column_name} not found')
-                return
+def get_insight_query(query):
+    """Returns the query used for insights (LIMIT removed, rs.row_num widened to 1000)
+    along with the LIMIT of the original query, which is used to pick the rows to display.
 
-            _, warn_threshold, fatal_threshold = get_thresholds(column['threshold'])
+    show_limit is only set when the original query is the insight query plus a trailing LIMIT,
+    with an inner LIMIT or a widened rs.row_num the first rows of the insight query are not the
+    rows of the original query, which then has to be executed for display (see render_catalog_query).
+    """
+    limits = re.findall(r"LIMIT\s+(\d+)", query, flags=re.IGNORECASE)
+    trailing_limit = re.search(r"LIMIT\s+(\d+)\s*;?\s*$", query, flags=re.IGNORECASE)
 
-        except Exception as e:
-            print(f'Error in func:colour_values while getting threshold information.', e)
-            return
+    replaced_query = re.sub(r"LIMIT\s+\d+", "", query, flags=re.IGNORECASE)
+    widened_query = replace_row_num_limit(replaced_query, 1000)
 
-        try:
-            for row in query_result:
-                if row[index] >= fatal_threshold:
-                    row[index] = str('\033[91m') + str(row[index]) + str('\033[0m')
-                elif row[index] >= int(warn_threshold):
-                    row[index] = str('\033[93m') + str(row[index]) + str('\033[0m')
-                else:
-                    row[index] = str('\033[92m') + str(row[index]) + str('\033[0m')
-        except Exception as e:
-            print(f'Error in func:colour_values while coloring the values', e)
-            return
+    show_limit = None
+    if len(limits) == 1 and trailing_limit and widened_query == replaced_query:
+        show_limit = int(trailing_limit.group(1))
 
-    return query_result
+    return widened_query, show_limit
 
-def colour_values_deleted_row_count(query_result, item, with_insights, threshold, column_headers):    
-    try:
-        column_to_colour = "deleted_row_cnt"
-        column_to_compare = "total_row_cnt"
 
-        column_to_colour_index = column_headers.index(column_to_colour)
-        column_to_compare_index = column_headers.index(column_to_compare)
-    except Exception as e:
-        print(f'Error in func:colour_values_deleted_row_count while getting column indices.', e)
-        exit()
-    
-    for row in query_result:
-        try:
-            ansi_escape = re.compile(r'\x1b\[[0-9;]*m')
-            row[column_to_colour_index] = int(ansi_escape.sub('', str(row[column_to_colour_index])))
+def iter_query_batches(query_result, batch_size=vertica.DEFAULT_BATCH_SIZE):
+    if query_result is None or query_result == -1:
+        return
+    if isinstance(query_result, vertica.QueryStream):
+        yield from query_result.batches()
+        return
+    for start in range(0, len(query_result), batch_size):
+        yield query_result[start:start + batch_size]
 
-            _, warn_threshold, fatal_threshold = get_thresholds(item['threshold'])
 
-            if int(row[column_to_colour_index]) >= int(row[column_to_compare_index])*(fatal_threshold/100):
-                row[column_to_colour_index] = str('\033[91m') + str(row[column_to_colour_index]) + str('\033[0m')
-            elif int(row[column_to_colour_index]) >= row[column_to_compare_index]*(warn_threshold/100):
-                row[column_to_colour_index] = str('\033[93m') + str(row[column_to_colour_index]) + str('\033[0m')
-            else:
-                row[column_to_colour_index] = str('\033[92m') + str(row[column_to_colour_index]) + str('\033[0m')
-        except Exception as e:
-            print(f'Error in func:colour_values_deleted_row_count while coloring the values', e)
-            exit()
-    
-    return query_result
+def handle_query_result_when_insights(query_result, show_limit, column_headers, display_result=None):
+    if isinstance(query_result, vertica.QueryStream):
+        query_result = query_result.fetchall()
+    if query_result is None:
+        return query_result, None
 
+    if display_result is not None:
+        rows = display_result
+    else:
+        rows = query_result if show_limit is None else query_result[:show_limit]
+    query_result_show = [list(row) for row in rows]
+    if column_headers is not None:
+        query_result_show = process_query_result_and_highlight_text(query_result_show, column_headers)
 
-def handle_deleted_row_count(query_result, query_result_show, item, with_insights, threshold, column_headers):
-    if with_insights:
-        if query_result_show:
-            # query_result_show = colour_values(query_result_show, threshold['columns'], column_headers)
-            return colour_values_deleted_row_count(query_result_show, item, with_insights, threshold, column_headers)
-        else:
-            # query_result = colour_values(query_result, threshold['columns'], column_headers)
-            return colour_values_deleted_row_count(query_result, item, with_insights, threshold, column_headers)
+    return query_result, query_result_show
 
 
-def get_thresholds(thresholds):
-    ok_threshold, warn_threshold, fatal_threshold = None, None, None
+def count_threshold_columns(query_result, columns, column_headers, show_limit, display_result=None):
+    """Classifies rows against the thresholds of every column in a single pass over the result.
 
-    for key, val in thresholds.items():
-        if 'warn' in key:
-            warn_threshold = val
-        elif 'fatal' in key:
-            fatal_threshold = val
-        else:
-            ok_threshold = val
-    
-    return ok_threshold, warn_threshold, fatal_threshold
+    query_result can be a list or a vertica.QueryStream, only the first show_limit rows
+    (every row when show_limit is None) are kept for display, with their threshold
+    columns coloured by level. display_result, the rows of the original query of the
+    insight query (see get_display_result), is displayed instead when it is given.
+    """
+    evaluator = None
+    query_result_show = []
+    if display_result is not None:
+        show_limit = 0
 
+    for rows in iter_query_batches(query_result):
+        if evaluator is None:
+            evaluator = ThresholdEvaluator(columns, column_headers)
 
-def handle_query_result_when_insights(vertica_connection, query, column_headers):
-    query_result_show = vertica.execute_vertica_query(vertica_connection, query)
-    if column_headers is not None:
-        query_result_show = process_query_result_and_highlight_text(query_result_show, column_headers)
+        levels = evaluator.add_batch(rows)
+        keep = len(rows) if show_limit is None else min(len(rows), show_limit - len(query_result_show))
+        if keep > 0:
+            show_rows = colour_rows([list(row) for row in rows[:keep]], evaluator.columns, [column_levels[:keep] for column_levels in levels])
+            query_result_show.extend(show_rows)
 
-    replaced_query = re.sub(r"LIMIT\s+\d+", "", query, flags=re.IGNORECASE)
-    replaced_query = replace_row_num_limit(replaced_query, 1000)
+    if display_result:
+        display_evaluator = ThresholdEvaluator(columns, column_headers)
+        query_result_show = colour_rows([list(row) for row in display_result], display_evaluator.columns, display_evaluator.add_batch(display_result))
 
-    query_result = vertica.execute_vertica_query(vertica_connection, replaced_query)
+    if column_headers is not None:
+        query_result_show = process_query_result_and_highlight_text(query_result_show, column_headers)
 
-    return query_result, query_result_show
+    if evaluator is None:
+        return [ThresholdCounts().as_dict() for _ in columns], query_result_show, 0
+    return evaluator.get_counts(), query_result_show, evaluator.row_count
 
 
 def handle_resource_pool_status_analysis(qid, pool_name, verbose, query, query_result, issue_level, query_name, query_result_show, column_headers):
@@ -201,325 +211,249 @@ def handle_resource_pool_status_analysis(qid, pool_name, verbose, query, query_r
                 print()    
 
 
-def analyse(qid, insights_json, query, verbose, query_name, query_result, query_description, column_headers, insights_only, with_insights, duration, pool_name, issue_level, is_now, user_name, subcluster_name, issue_time, vertica_connection, filters):
-    threshold_json_file_path = THRESHOLD_FILE_PATH
-    json_data = None
-    with open(threshold_json_file_path) as json_file:
-        json_data = json_file.read()
-        thresholds = json.loads(json_data)
-    
-    if thresholds is None:
-        print(f"Error reading {threshold_json_file_path}")
-        exit()
+def analyse(qid, insights_json, query, verbose, query_name, query_result, query_description, column_headers, insights_only, with_insights, duration, pool_name, issue_level, is_now, user_name, subcluster_name, issue_time, vertica_connection, filters, show_limit=None, summary=False, display_result=None):
+    threshold = get_thresholds_catalog(THRESHOLD_FILE_PATH).get(query_name)
+    if threshold is None:
+        return
+
     query_result_show = None
 
     # if_printref = 0
 
-    for threshold in thresholds:
-        if threshold['query_name'] == query_name:
-            if with_insights or insights_only:    
-                query_result, query_result_show = handle_query_result_when_insights(vertica_connection, query, column_headers)
-                if query_result == -1:
-                    print(query_name, ": column not found\n")
-                    return
-            
-            if threshold['query_name'] == query_name:
-                args = {
-                    "subcluster_name": subcluster_name,
-                    "user_name": user_name,
-                    "pool_name": pool_name,
-                    "is_now": is_now,
-                    "issue_time": issue_time,
-                    "duration": duration,
-                }
-                global is_header_printed
-                if not is_header_printed:
-                    is_header_printed = True
-                    print_header(args)
-                    
-                if query_name == "long_running_queries_raw":
-                    return
-                if query_name == "resource_pool_status":
-                    handle_resource_pool_status_analysis(qid, pool_name, verbose, query, query_result, issue_level, query_name, query_result_show, column_headers)
-                    return
-                elif query_name == "long_running_queries":
-                    if (query_result is None or len(query_result) == 0) and (issue_level == 'ok' or issue_level is None):
-                        msg = "[\033[92mOK\033[0m] No long running queries."
-                        push_to_insights_json(qid, insights_json, msg, 'OK', query_name)
-                        print(msg)
-                    elif len(query_result) == 1:
-                        status_counts = {}
-                        for _, status, cnt in query_result:
-                            status_counts[status] = status_counts.get(status, 0) + cnt
-                        ansi_escape = re.compile(r'\x1b\[[0-9;]*m')
-                        status_counts= {ansi_escape.sub('', key): value for key, value in status_counts.items()}
-                        
-                        # print(f"\n\nQuery Name: {query_name}")
-                        # print("-" * len(f"Query Name: {query_name}"))
-                        # print(f"Query Description: {query_description}")
-                        # print("-" * len(f"Query Description: {query_description}"))
-                        if verbose:
-                            print('QUERY: ', f"{query}")
-                            print("-" * 15)
-
-                        if with_insights:
-                            print(f"\n\nQuery Name: {query_name}")
-                            print("-" * len(f"Query Name: {query_name}"))
-                            if query_result_show is not None:
-                                print(tabulate(query_result_show, headers=column_headers, tablefmt='grid', floatfmt=".2f"))
-                            else:
-                                print(tabulate(query_result, headers=column_headers, tablefmt='grid', floatfmt=".2f"))
-                        
-                        if "warn" not in status_counts and "fatal" not in status_counts and (issue_level is 'ok' or issue_level is None):
-                            msg = "[\033[92mOK\033[0m] No long running queries."
-                            push_to_insights_json(qid, insights_json, msg, 'OK', query_name)
-                            print(msg)
-
-                        for key, val in status_counts.items():
-                            _, warn_threshold, fatal_threshold = get_thresholds(threshold['columns'][0]['threshold'])
-                            if key == "warn":
-                                r = (str('\033[93m') + str(val) + str('\033[0m'))
-                                t = (str('\033[93m') + str(warn_threshold) + " mins" + str('\033[0m'))
-                                msg = f"[\033[93mWARN\033[0m] {r} queries are running for more than {t} by {list(set([row[column_headers.index('user_name')] for row in query_result]))}"
-                                push_to_insights_json(qid, insights_json, msg, 'WARN', query_name)
-                                print(msg)
-                            elif key == "fatal":
-                                r = (str('\033[91m') + str(val) + str('\033[0m'))
-                                t = (str('\033[91m') + str(fatal_threshold) + " mins" + str('\033[0m'))
-                                msg = f"[\033[91mFATAL\033[0m] {r} queries are running for more than {t} by {list(set([row[column_headers.index('user_name')] for row in query_result]))}"
-                                push_to_insights_json(qid, insights_json, msg, 'FATAL', query_name)
-                                print(msg)
-                        if with_insights:
-                            print()
-                    else:
-                        status_counts = {}
-                        for q_res in query_result:
-                            if len(q_res) == 3:
-                                _, status, cnt =  q_res
-                            else:
-                                _, _, status, cnt = q_res
-                            status_counts[status] = status_counts.get(status, 0) + cnt
-                        ansi_escape = re.compile(r'\x1b\[[0-9;]*m')
-                        status_counts= {ansi_escape.sub('', key): value for key, value in status_counts.items()}
-                        
-                        # print(f"\n\nQuery Name: {query_name}")
-                        # print("-" * len(f"Query Name: {query_name}"))
-                        # print(f"Query Description: {query_description}")
-                        # print("-" * len(f"Query Description: {query_description}"))
-                        if verbose:
-                            print('QUERY: ', f"{query}")
-                            print("-" * 15)
-
-                        if with_insights:
-                            print(f"\n\nQuery Name: {query_name}")
-                            print("-" * len(f"Query Name: {query_name}"))
-                            if query_result_show is not None:
-                                print(tabulate(query_result_show, headers=column_headers, tablefmt='grid', floatfmt=".2f"))
-                            else:
-                                print(tabulate(query_result, headers=column_headers, tablefmt='grid', floatfmt=".2f"))
-                        
-                        if "warn" not in status_counts and "fatal" not in status_counts and (issue_level is 'ok' or issue_level is None):
-                            msg = "[\033[92mOK\033[0m] No long running queries."
-                            push_to_insights_json(qid, insights_json, msg, 'OK', query_name)
-                            print(msg)
-
-                        for key, val in status_counts.items():
-                            _, warn_threshold, fatal_threshold = get_thresholds(threshold['columns'][0]['threshold'])
-                            if key == "warn":
-                                r = (str('\033[93m') + str(val) + str('\033[0m'))
-                                t = (str('\033[93m') + str(warn_threshold) + " mins" + str('\033[0m'))
-                                msg = f"[\033[93mWARN\033[0m] {r} queries are running for more than {t} by {list(set([row[column_headers.index('user_name')] for row in query_result]))}"
-                                push_to_insights_json(qid, insights_json, msg, 'WARN', query_name)
-                                print(msg)
-                            elif key == "fatal":
-                                r = (str('\033[91m') + str(val) + str('\033[0m'))
-                                t = (str('\033[91m') + str(fatal_threshold) + " mins" + str('\033[0m'))
-                                msg = f"[\033[91mFATAL\033[0m] {r} queries are running for more than {t} by {list(set([row[column_headers.index('user_name')] for row in query_result]))}"
-                                push_to_insights_json(qid, insights_json, msg, 'FATAL', query_name)
-                                print(msg)
-                        if with_insights:
-                            print()
-                    return
-                
-                is_result_printed = False
-                for item in threshold['columns']:
-                    if item['columns_name'] == "deleted_row_cnt":
-                        if query_result_show is not None:
-                            query_result_show = handle_deleted_row_count(query_result, query_result_show, item, with_insights, threshold, column_headers)
-                        else:
-                            query_result = handle_deleted_row_count(query_result, query_result_show, item, with_insights, threshold, column_headers)
-                    
-                    if query_result == None or len(query_result) == 0:
-                        if item['default_message'] is not "":
-                            msg = item['default_message'].replace('OK', '\033[92mOK\033[0m')
-                            push_to_insights_json(qid, insights_json, msg, 'OK', query_name)
-                            print(msg)
-                            return
-                        else:
-                            return
-                    
-                    index = column_headers.index(item['columns_name'])
-                    if index == -1:
-                        print(f"Error: Column '{item['columns_name']}' not found in the query result.")
-                        exit()
-                    
-                    ok_count, warn_count, fatal_count = 0, 0, 0
-                    ok_values, warn_values, fatal_values = set(), set(), set()
-                    unique_values = {}
-                    total = 0
-
-                    _, warn_threshold, fatal_threshold = get_thresholds(item['threshold'])
-
-                    if item['unique_column'] == "":
-                        if item['columns_name'] == "deleted_row_cnt":
-                            column_to_compare_index = column_headers.index("total_row_cnt")
-                            if item['unique_column'] == "":
-                                for row in query_result:
-                                    if row[index] >= int(row[column_to_compare_index])*(fatal_threshold/100):
-                                        fatal_count+=1
-                                    elif row[index] >= int(row[column_to_compare_index])*(warn_threshold/100):
-                                        warn_count+=1
-                                    else:
-                                        total += row[index]
-                                        ok_count+=1
-                        else:
-                            for row in query_result:
-                                if row[index] >= fatal_threshold:
-                                    fatal_count+=1
-                                elif row[index] >= warn_threshold:
-                                    warn_count+=1
-                                else:
-                                    total += row[index]
-                                    ok_count+=1
-                    else:
-                        unique_column = item['unique_column']
-                        unique_column_index = column_headers.index(unique_column)
-                        for row in query_result:
-                            key = row[unique_column_index]
-                            if key not in unique_values:
-                                unique_values[key] = 0  
-                            unique_values[key] += 1  
-
-                        for row in query_result:
-                            for unique_column_value, unique_column_cnt in unique_values.items():
-                                if row[unique_column_index] == unique_column_value:
-                                    if row[index] >= fatal_threshold:
-                                        fatal_count+=1
-                                        fatal_values.add(unique_column_value)
-                                    elif row[index] >= warn_threshold:
-                                        warn_count+=1
-                                        warn_values.add(unique_column_value)
-                                    else:
-                                        ok_count+=1
-                                        ok_values.add(unique_column_value)
-                                        total += row[index]   
-                    
-                    if ok_count>0 or warn_count>0 or fatal_count>0:
-                        if not is_result_printed:
-                            is_result_printed = True
-                        
-                            # print(f"\n\nQuery Name: {query_name}")
-                            # print("-" * len(f"Query Name: {query_name}"))
-                            # print(f"Query Description: {query_description}")
-                            # print("-" * len(f"Query Description: {query_description}"))
-                            if verbose:
-                                print('QUERY: ', f"{query}")
-                                print("-" * 15)
-
-                            if with_insights:
-                                print(f"\n\nQuery Name: {query_name}")
-                                print("-" * len(f"Query Name: {query_name}"))
-                                if query_result_show is not None:
-                                    query_result_show = colour_values(query_result_show, threshold['columns'], column_headers)
-                                    print(tabulate(query_result_show, headers=column_headers, tablefmt='grid', floatfmt=".2f"))
-                                else:
-                                    query_result = colour_values(query_result, threshold['columns'], column_headers)
-                                    print(tabulate(query_result, headers=column_headers, tablefmt='grid', floatfmt=".2f"))
-                    
-                    flag = True
-                    is_upper_level_statsus_printed = False
-
-                    ok_threshold, warn_threshold, fatal_threshold = get_thresholds(item['threshold'])
-
-                    if issue_level is None or issue_level == "ok" or issue_level == "warn" or issue_level == "fatal":
-                        if fatal_threshold != -1 and fatal_count > 0 and not is_upper_level_statsus_printed:
-                            flag = False
-                            is_upper_level_statsus_printed = True
-                            message = "[\033[91mFATAL\033[0m] "
-                            message += item['message_template']['fatal'].replace('{val_cnt}', str('\033[91m') + str(fatal_threshold ) + str('\033[0m')) # '\033[91m' + + '\033[0m'
-                            message = message.replace('{duration}', str(duration))
-                            if len(fatal_values) > 0:
-                                message = message.replace('{list}', str(fatal_values))
-                                message = message.replace('{cnt}', str(len(fatal_values)))
-                            else:
-                                message = message.replace('{cnt}', str(fatal_count))
-                            push_to_insights_json(qid, insights_json, message, 'FATAL', query_name)
-                            print(message)
-
-                    if issue_level is None or issue_level == "ok" or issue_level == "warn":
-                        if warn_threshold != -1 and warn_count > 0 and not is_upper_level_statsus_printed:
-                            flag = False
-                            is_upper_level_statsus_printed = False
-
-                            message = "[\033[93mWARN\033[0m] "
-                            message += item['message_template']['warn'].replace('{val_cnt}', str('\033[93m') + str( warn_threshold ) + str('\033[0m')) #  + +  
-                            message = message.replace('{duration}', str(duration))
-                            if len(warn_values) > 0:
-                                message = message.replace('{list}', str(warn_values))
-                                message = message.replace('{cnt}', str(len(warn_values.union(fatal_values))))
-                            else:
-                                message = message.replace('{cnt}', str(warn_count))
-                            push_to_insights_json(qid, insights_json, message, 'WARN', query_name)
-                            print(message)
-
-                    if issue_level is None or issue_level == "ok":
-                        if (ok_threshold != -1 and ok_count > 0) and not is_upper_level_statsus_printed:
-                            flag = False
-                            is_upper_level_statsus_printed = True
-                            # ok_count += warn_count + fatal_count
-                            message = "[\033[92mOK\033[0m] "
-                            
-                            message += item['message_template']['ok'].replace('{val_cnt}', str(ok_threshold))
-                            
-                            message = message.replace('{duration}', str(duration))
-
-                            message = message.replace('{total}', str(total))
-                            if len(ok_values) > 0:
-                                message = message.replace('{list}', str(ok_values))
-                                message = message.replace('{cnt}', str(len(ok_values)))
-                            else:
-                                message = message.replace('{cnt}', str(ok_count))
-                            push_to_insights_json(qid, insights_json, message, 'OK', query_name)
-                            print(message)
-                    
-                    if flag:
-                        if item['default_message'] is not "":
-                            msg = item['default_message'].replace('OK', '\033[92mOK\033[0m')
-                            push_to_insights_json(qid, insights_json, msg, 'OK', query_name)
-                            print(msg)
+    args = {
+        "subcluster_name": subcluster_name,
+        "user_name": user_name,
+        "pool_name": pool_name,
+        "is_now": is_now,
+        "issue_time": issue_time,
+        "duration": duration,
+    }
+    global is_header_printed
+    if not is_header_printed:
+        print_header(args)
+        is_header_printed = True
+
+    if query_name == "long_running_queries_raw":
+        return
+    if query_name in ("resource_pool_status", "long_running_queries"):
+        query_result, query_result_show = handle_query_result_when_insights(query_result, show_limit, column_headers, display_result)
+
+    if query_name == "resource_pool_status":
+        handle_resource_pool_status_analysis(qid, pool_name, verbose, query, query_result, issue_level, query_name, query_result_show, column_headers)
+        return
+    elif query_name == "long_running_queries":
+        if (query_result is None or len(query_result) == 0) and (issue_level == 'ok' or issue_level is None):
+            msg = "[\033[92mOK\033[0m] No long running queries."
+            push_to_insights_json(qid, insights_json, msg, 'OK', query_name)
+            print(msg)
+        elif len(query_result) == 1:
+            status_counts = {}
+            for _, status, cnt in query_result:
+                status_counts[status] = status_counts.get(status, 0) + cnt
+            ansi_escape = re.compile(r'\x1b\[[0-9;]*m')
+            status_counts= {ansi_escape.sub('', key): value for key, value in status_counts.items()}
+
+            # print(f"\n\nQuery Name: {query_name}")
+            # print("-" * len(f"Query Name: {query_name}"))
+            # print(f"Query Description: {query_description}")
+            # print("-" * len(f"Query Description: {query_description}"))
+            if verbose:
+                print('QUERY: ', f"{query}")
+                print("-" * 15)
+
+            if with_insights:
+                print(f"\n\nQuery Name: {query_name}")
+                print("-" * len(f"Query Name: {query_name}"))
+                if query_result_show is not None:
+                    print(tabulate(query_result_show, headers=column_headers, tablefmt='grid', floatfmt=".2f"))
+                else:
+                    print(tabulate(query_result, headers=column_headers, tablefmt='grid', floatfmt=".2f"))
+
+            if "warn" not in status_counts and "fatal" not in status_counts and (issue_level is 'ok' or issue_level is None):
+                msg = "[\033[92mOK\033[0m] No long running queries."
+                push_to_insights_json(qid, insights_json, msg, 'OK', query_name)
+                print(msg)
+
+            for key, val in status_counts.items():
+                _, warn_threshold, fatal_threshold = get_thresholds(threshold['columns'][0]['threshold'])
+                if key == "warn":
+                    r = (str('\033[93m') + str(val) + str('\033[0m'))
+                    t = (str('\033[93m') + str(warn_threshold) + " mins" + str('\033[0m'))
+                    msg = f"[\033[93mWARN\033[0m] {r} queries are running for more than {t} by {list(set([row[column_headers.index('user_name')] for row in query_result]))}"
+                    push_to_insights_json(qid, insights_json, msg, 'WARN', query_name)
+                    print(msg)
+                elif key == "fatal":
+                    r = (str('\033[91m') + str(val) + str('\033[0m'))
+                    t = (str('\033[91m') + str(fatal_threshold) + " mins" + str('\033[0m'))
+                    msg = f"[\033[91mFATAL\033[0m] {r} queries are running for more than {t} by {list(set([row[column_headers.index('user_name')] for row in query_result]))}"
+                    push_to_insights_json(qid, insights_json, msg, 'FATAL', query_name)
+                    print(msg)
+            if with_insights:
+                print()
+        else:
+            status_counts = {}
+            for q_res in query_result:
+                if len(q_res) == 3:
+                    _, status, cnt =  q_res
+                else:
+                    _, _, status, cnt = q_res
+                status_counts[status] = status_counts.get(status, 0) + cnt
+            ansi_escape = re.compile(r'\x1b\[[0-9;]*m')
+            status_counts= {ansi_escape.sub('', key): value for key, value in status_counts.items()}
+
+            # print(f"\n\nQuery Name: {query_name}")
+            # print("-" * len(f"Query Name: {query_name}"))
+            # print(f"Query Description: {query_description}")
+            # print("-" * len(f"Query Description: {query_description}"))
+            if verbose:
+                print('QUERY: ', f"{query}")
+                print("-" * 15)
+
+            if with_insights:
+                print(f"\n\nQuery Name: {query_name}")
+                print("-" * len(f"Query Name: {query_name}"))
+                if query_result_show is not None:
+                    print(tabulate(query_result_show, headers=column_headers, tablefmt='grid', floatfmt=".2f"))
+                else:
+                    print(tabulate(query_result, headers=column_headers, tablefmt='grid', floatfmt=".2f"))
+
+            if "warn" not in status_counts and "fatal" not in status_counts and (issue_level is 'ok' or issue_level is None):
+                msg = "[\033[92mOK\033[0m] No long running queries."
+                push_to_insights_json(qid, insights_json, msg, 'OK', query_name)
+                print(msg)
+
+            for key, val in status_counts.items():
+                _, warn_threshold, fatal_threshold = get_thresholds(threshold['columns'][0]['threshold'])
+                if key == "warn":
+                    r = (str('\033[93m') + str(val) + str('\033[0m'))
+                    t = (str('\033[93m') + str(warn_threshold) + " mins" + str('\033[0m'))
+                    msg = f"[\033[93mWARN\033[0m] {r} queries are running for more than {t} by {list(set([row[column_headers.index('user_name')] for row in query_result]))}"
+                    push_to_insights_json(qid, insights_json, msg, 'WARN', query_name)
+                    print(msg)
+                elif key == "fatal":
+                    r = (str('\033[91m') + str(val) + str('\033[0m'))
+                    t = (str('\033[91m') + str(fatal_threshold) + " mins" + str('\033[0m'))
+                    msg = f"[\033[91mFATAL\033[0m] {r} queries are running for more than {t} by {list(set([row[column_headers.index('user_name')] for row in query_result]))}"
+                    push_to_insights_json(qid, insights_json, msg, 'FATAL', query_name)
+                    print(msg)
+            if with_insights:
+                print()
+        return
+
+    if summary:
+        # the rows were classified by Vertica, query_result is the single summary row
+        counts, row_count = get_summary_counts(query_result, threshold['columns'], column_headers)
+        query_result_show = []
+    else:
+        counts, query_result_show, row_count = count_threshold_columns(query_result, threshold['columns'], column_headers, show_limit, display_result)
+
+    is_result_printed = False
+    for item, count in zip(threshold['columns'], counts):
+        if row_count == 0:
+            if item['default_message'] is not "":
+                msg = item['default_message'].replace('OK', '\033[92mOK\033[0m')
+                push_to_insights_json(qid, insights_json, msg, 'OK', query_name)
+                print(msg)
+                return
+            else:
+                return
+
+        ok_count, warn_count, fatal_count = count["ok_count"], count["warn_count"], count["fatal_count"]
+        ok_values, warn_values, fatal_values = count["ok_values"], count["warn_values"], count["fatal_values"]
+        total = count["total"]
+
+        if ok_count>0 or warn_count>0 or fatal_count>0:
+            if not is_result_printed:
+                is_result_printed = True
+
+                # print(f"\n\nQuery Name: {query_name}")
+                # print("-" * len(f"Query Name: {query_name}"))
+                # print(f"Query Description: {query_description}")
+                # print("-" * len(f"Query Description: {query_description}"))
+                if verbose:
+                    print('QUERY: ', f"{query}")
+                    print("-" * 15)
 
                 if with_insights:
-                    print()
+                    print(f"\n\nQuery Name: {query_name}")
+                    print("-" * len(f"Query Name: {query_name}"))
+                    print(tabulate(query_result_show, headers=column_headers, tablefmt='grid', floatfmt=".2f"))
+
+        flag = True
+        is_upper_level_statsus_printed = False
+
+        ok_threshold, warn_threshold, fatal_threshold = get_thresholds(item['threshold'])
+
+        if issue_level is None or issue_level == "ok" or issue_level == "warn" or issue_level == "fatal":
+            if fatal_threshold != -1 and fatal_count > 0 and not is_upper_level_statsus_printed:
+                flag = False
+                is_upper_level_statsus_printed = True
+                message = "[\033[91mFATAL\033[0m] "
+                message += item['message_template']['fatal'].replace('{val_cnt}', str('\033[91m') + str(fatal_threshold ) + str('\033[0m')) # '\033[91m' + + '\033[0m'
+                message = message.replace('{duration}', str(duration))
+                if len(fatal_values) > 0:
+                    message = message.replace('{list}', str(fatal_values))
+                    message = message.replace('{cnt}', str(len(fatal_values)))
+                else:
+                    message = message.replace('{cnt}', str(fatal_count))
+                push_to_insights_json(qid, insights_json, message, 'FATAL', query_name)
+                print(message)
+
+        if issue_level is None or issue_level == "ok" or issue_level == "warn":
+            if warn_threshold != -1 and warn_count > 0 and not is_upper_level_statsus_printed:
+                flag = False
+                is_upper_level_statsus_printed = False
+
+                message = "[\033[93mWARN\033[0m] "
+                message += item['message_template']['warn'].replace('{val_cnt}', str('\033[93m') + str( warn_threshold ) + str('\033[0m')) #  + +  
+                message = message.replace('{duration}', str(duration))
+                if len(warn_values) > 0:
+                    message = message.replace('{list}', str(warn_values))
+                    message = message.replace('{cnt}', str(len(warn_values.union(fatal_values))))
+                else:
+                    message = message.replace('{cnt}', str(warn_count))
+                push_to_insights_json(qid, insights_json, message, 'WARN', query_name)
+                print(message)
+
+        if issue_level is None or issue_level == "ok":
+            if (ok_threshold != -1 and ok_count > 0) and not is_upper_level_statsus_printed:
+                flag = False
+                is_upper_level_statsus_printed = True
+                # ok_count += warn_count + fatal_count
+                message = "[\033[92mOK\033[0m] "
+
+                message += item['message_template']['ok'].replace('{val_cnt}', str(ok_threshold))
+
+                message = message.replace('{duration}', str(duration))
+
+                message = message.replace('{total}', str(total))
+                if len(ok_values) > 0:
+                    message = message.replace('{list}', str(ok_values))
+                    message = message.replace('{cnt}', str(len(ok_values)))
+                else:
+                    message = message.replace('{cnt}', str(ok_count))
+                push_to_insights_json(qid, insights_json, message, 'OK', query_name)
+                print(message)
+
+        if flag:
+            if item['default_message'] is not "":
+                msg = item['default_message'].replace('OK', '\033[92mOK\033[0m')
+                push_to_insights_json(qid, insights_json, msg, 'OK', query_name)
+                print(msg)
+
+    if with_insights:
+        print()
 
 
 def replace_thresholds(query, query_name):
-    threshold_json_file_path = THRESHOLD_FILE_PATH
-    json_data = None
-    with open(threshold_json_file_path) as json_file:
-        json_data = json_file.read()
-        thresholds = json.loads(json_data)
-    
-    if thresholds is None:
-        print(f"Error reading {threshold_json_file_path}")
-        exit()
-    
-    for threshold in thresholds:
-        if threshold['query_name'] == query_name:
-            ok_threshold, warn_threshold, fatal_threshold = get_thresholds(threshold['columns'][0]['threshold'])
+    threshold = get_thresholds_catalog(THRESHOLD_FILE_PATH).get(query_name)
+
+    if threshold is not None:
+        ok_threshold, warn_threshold, fatal_threshold = get_thresholds(threshold['columns'][0]['threshold'])
 
-            query = query.replace("{ok_threshold}", str(ok_threshold))
-            query = query.replace("{warn_threshold}", str(warn_threshold))
-            query = query.replace("{fatal_threshold}", str(fatal_threshold))
+        query = query.replace("{ok_threshold}", str(ok_threshold))
+        query = query.replace("{warn_threshold}", str(warn_threshold))
+        query = query.replace("{fatal_threshold}", str(fatal_threshold))
     
     return query
 
@@ -559,140 +493,697 @@ def format_relativedelta(query_result, column_headers, column_name="running_time
     return query_result
 
 
+def prepare_catalog_queries(json_data, filters, is_now, queries_to_execute, insights=False, summary=False):
+    thresholds = get_thresholds_catalog(THRESHOLD_FILE_PATH)
+
+    jobs = []
+    for row in json_data:
+        qid = row["qid"]
+        query_name = row["query_name"]
+        query = row["query"]
+        query_description = row["query_description"]
+        query_past = row.get("query_past", "")
+        
+        if queries_to_execute and query_name not in queries_to_execute:
+            continue
+
+        if (queries_to_execute is None or len(queries_to_execute) == 0) and query_name == 'get_query':
+            continue
+
+        if "get_query" in queries_to_execute and (filters['txn_id'] is None or filters['statement_id'] is None):
+            jobs.append({"qid": qid, "query_name": query_name, "notice": f"Please provide txn_id and statement_id."})
+            continue
+            
+        if (queries_to_execute is None or len(queries_to_execute) == 0) and "_raw" in query_name:
+            continue
+            
+        if is_now and "select null" not in query.lower():
+            final_query = query
+        elif not is_now and "select null" not in query_past.lower():
+            if query_past == "":
+                final_query = query
+            else:
+                final_query = query_past
+        else:
+            continue
+    
+        if query_name == "performance_buckets" and filters['user_name'] is None:
+            if "performance_buckets" in queries_to_execute:
+                jobs.append({"qid": qid, "query_name": query_name, "notice": 'Please provide a user name to use performance_buckets'})
+            continue
+
+        if not is_now and query_past == "":
+            final_query = replace_tables_in_query(final_query)
+
+        d = {}
+        for key, val in filters.items():
+            if val is not None:
+                d[key] = val
+        # if query_name == "error_messages_raw":
+        #     if filters["err_type"] is None:
+        #         final_query = get_error_messages_query(filters["err_type"])
+
+        if "end as status" in query.lower():
+            final_query = replace_thresholds(final_query, query_name)
+        
+        template = final_query
+        # one execution serves both the displayed rows and the analysed rows
+        insight = insights and query_name in thresholds
+        with profiler.stage("render_query", query_name):
+            final_query, show_limit, display_query = render_catalog_query(template, d, insight)
+
+        job = {
+            "qid": qid,
+            "query_name": query_name,
+            "query_description": query_description,
+            "final_query": final_query,
+            "show_limit": show_limit,
+        }
+        if display_query is not None:
+            job["display_query"] = display_query
+
+        if summary and insight and query_name not in CUSTOM_ANALYSIS_QUERIES:
+            job["final_query"] = get_summary_query(final_query, thresholds.get(query_name)['columns'])
+            job["summary"] = True
+        elif not is_now and row.get("time_bucket_column") and filters.get('result_cache') and filters['order_by'] is None and filters['granularity'] in GRANULARITIES:
+            job["time_bucket"] = {
+                "column": row["time_bucket_column"],
+                "order": row.get("time_bucket_order", "desc"),
+                "template": template,
+                "conditions": d,
+                "insight": insight,
+                "digest": get_digest(query_name, template, d),
+            }
+
+        timeout_secs = row.get("timeout_secs", filters.get('query_timeout_secs'))
+        if timeout_secs:
+            job["timeout_secs"] = timeout_secs
+
+        if row.get("subcluster_column"):
+            job["subcluster_column"] = row["subcluster_column"]
+
+        if row.get("batch_group") and "time_bucket" not in job:
+            job["batch_group"] = row["batch_group"]
+
+        jobs.append(job)
+
+    return jobs
+
+
+def render_catalog_query(template, conditions, insight=False):
+    """The rendered query (the insight query when insight is set), the LIMIT of its displayed rows
+    and the original query when the displayed rows cannot be taken from the insight query (see get_insight_query)."""
+    final_query = replace_conditions(template, conditions)
+    if conditions.get('subcluster_names'):
+        # one query for several subclusters, its rows are split by subcluster (and limited per subcluster) afterwards
+        subcluster_names = ", ".join(f"'{subcluster_name}'" for subcluster_name in conditions['subcluster_names'])
+        final_query = re.sub(r"=\s*'<subcluster_name>'", f"in ({subcluster_names})", final_query)
+    final_query = final_query.replace("<subcluster_name>", conditions['subcluster_name'])
+
+    show_limit = None
+    display_query = None
+    if insight or conditions.get('subcluster_names'):
+        insight_query, show_limit = get_insight_query(final_query)
+        # rows of a fan out query are limited per subcluster, from show_limit
+        if show_limit is None and insight_query != final_query and not conditions.get('subcluster_names'):
+            display_query = final_query
+        final_query = insight_query
+
+    return final_query, show_limit, display_query
+
+
+def execute_time_bucketed_query(vertica_connection, time_bucket):
+    """Executes a historical catalog query through the local result cache, only the
+    time buckets that are not cached yet are queried from Vertica."""
+    conditions = time_bucket["conditions"]
+
+    def render(issue_time, duration):
+        return render_catalog_query(time_bucket["template"], {**conditions, "issue_time": issue_time, "duration": duration}, time_bucket["insight"])[0]
+
+    def execute(query):
+        query_result = vertica.execute_vertica_query(vertica_connection, query)
+        if query_result is None or query_result == -1:
+            return query_result, None
+        description = vertica_connection.cursor().description
+        return query_result, [desc[0] for desc in description] if description else None
+
+    return execute_bucketed_query(execute, render, time_bucket["column"], time_bucket["order"], conditions["granularity"], conditions["issue_time"], conditions["duration"], time_bucket["digest"])
+
+
+def execute_job(vertica_connection, job, batch_size=None):
+    if "time_bucket" in job:
+        return execute_time_bucketed_query(vertica_connection, job["time_bucket"])
+    return execute_catalog_query(vertica_connection, job["final_query"], batch_size)
+
+
+def get_job_timeout(job, deadline=None):
+    """Seconds job may run, None when it is not limited, 0 or less once the report deadline is spent."""
+    timeout_secs = job.get("timeout_secs")
+    if deadline is None:
+        return timeout_secs
+    remaining = deadline - time.monotonic()
+    return remaining if timeout_secs is None else min(timeout_secs, remaining)
+
+
+def execute_job_with_timeout(vertica_connection, job, batch_size=None, deadline=None):
+    timeout_secs = get_job_timeout(job, deadline)
+    if timeout_secs is None:
+        return execute_job(vertica_connection, job, batch_size)
+    if timeout_secs <= 0:
+        return vertica.TIMED_OUT, None
+
+    # fetched whole, so the time budget covers the fetch too
+    with vertica.QueryTimer(vertica_connection, timeout_secs) as timer:
+        query_result, column_headers = execute_job(vertica_connection, job)
+    # a query that completed while the timer fired keeps its result
+    if timer.expired and query_result is None:
+        return vertica.TIMED_OUT, None
+    return query_result, column_headers
+
+
+def get_batch_groups(jobs):
+    """Jobs sharing a batch_group (queries.json), only groups of two or more jobs are worth a batch."""
+    groups = {}
+    for job in jobs:
+        if "final_query" in job and job.get("batch_group"):
+            groups.setdefault(job["batch_group"], []).append(job)
+    return {name: group for name, group in groups.items() if len(group) > 1}
+
+
+def execute_job_batch(vertica_connection, jobs, deadline=None):
+    """Executes the jobs of a batch_group in one round trip, one by one when the batch fails
+    or when the jobs have time budgets (a batch can only be cancelled as a whole)."""
+    if deadline is not None or any(job.get("timeout_secs") for job in jobs):
+        return [execute_job_with_timeout(vertica_connection, job, deadline=deadline) for job in jobs]
+
+    results = vertica.execute_vertica_batch(vertica_connection, [job["final_query"] for job in jobs])
+    if results is None:
+        return [execute_job(vertica_connection, job) for job in jobs]
+    return results
+
+
+def execute_catalog_query(vertica_connection, final_query, batch_size=None):
+    if batch_size:
+        query_result = vertica.stream_vertica_query(vertica_connection, final_query, batch_size)
+        if isinstance(query_result, vertica.QueryStream):
+            return query_result, query_result.column_headers
+        return query_result, None
+
+    query_result = vertica.execute_vertica_query(vertica_connection, final_query)
+
+    column_headers = None
+    if query_result and query_result != -1:
+        column_headers = [desc[0] for desc in vertica_connection.cursor().description]
+
+    return query_result, column_headers
+
+
+def run_catalog_queries(jobs, vertica_connection, parallel=1, batch_size=None, deadline=None):
+    """Yields (job, query_result, column_headers) in catalog order.
+
+    With parallel > 1 the queries are sent concurrently over a bounded connection
+    pool, results are still handed back in the order of jobs.
+    With batch_size set (serial runs only) query_result is a vertica.QueryStream which
+    has to be consumed before the next item is requested.
+    Jobs of the same batch_group are sent in one round trip and always fetched whole.
+    A job running past its timeout_secs or past deadline (time.monotonic()) is cancelled,
+    its query_result is vertica.TIMED_OUT.
+    """
+    groups = get_batch_groups(jobs)
+
+    if parallel <= 1:
+        batched = {}
+        for job in jobs:
+            if "final_query" not in job:
+                yield job, None, None
+                continue
+            if job["qid"] in batched:
+                query_result, column_headers = batched.pop(job["qid"])
+            elif job.get("batch_group") in groups:
+                group = groups.pop(job["batch_group"])
+                with profiler.stage("run_batch", job["batch_group"]):
+                    batched.update(zip([group_job["qid"] for group_job in group], execute_job_batch(vertica_connection, group, deadline)))
+                query_result, column_headers = batched.pop(job["qid"])
+            else:
+                with profiler.stage("run_query", job["query_name"]):
+                    query_result, column_headers = execute_job_with_timeout(vertica_connection, job, batch_size, deadline)
+            try:
+                yield job, query_result, column_headers
+            finally:
+                if isinstance(query_result, vertica.QueryStream):
+                    query_result.close()
+        return
+
+    # the pool is shared with later runs of the process and closed on exit
+    pool = vertica.get_vertica_connection_pool(parallel)
+
+    def run(job):
+        with pool.connection() as connection, profiler.stage("run_query", job["query_name"]):
+            if connection is None:
+                return None, None
+            return execute_job_with_timeout(connection, job, deadline=deadline)
+
+    def run_batch(group):
+        with pool.connection() as connection, profiler.stage("run_batch", group[0]["batch_group"]):
+            if connection is None:
+                return [(None, None)] * len(group)
+            return execute_job_batch(connection, group, deadline)
+
+    from concurrent.futures import ThreadPoolExecutor
+    with ThreadPoolExecutor(max_workers=parallel) as executor:
+        futures = {}
+        for job in jobs:
+            if "final_query" not in job or job["qid"] in futures:
+                continue
+            group = groups.get(job.get("batch_group"))
+            if group:
+                future = executor.submit(run_batch, group)
+                futures.update({group_job["qid"]: (future, position) for position, group_job in enumerate(group)})
+            else:
+                futures[job["qid"]] = (executor.submit(run, job), None)
+
+        for job in jobs:
+            if "final_query" not in job:
+                yield job, None, None
+                continue
+            future, position = futures[job["qid"]]
+            query_result, column_headers = future.result() if position is None else future.result()[position]
+            yield job, query_result, column_headers
+
+
+def get_display_table(query_name, column_headers):
+    """The renderer of a displayed result along with the threshold columns it is coloured by."""
+    decorators = {}
+    if "status" in column_headers:
+        decorators[column_headers.index("status")] = highlight_severity
+
+    threshold_columns = []
+    threshold = get_thresholds_catalog(THRESHOLD_FILE_PATH).get(query_name)
+    if threshold is not None and "_raw" not in query_name and "long_running" not in query_name:
+        try:
+            items = [item for item in threshold['columns'] if item['columns_name'] not in DISPLAY_SKIPPED_COLUMNS]
+            threshold_columns = ThresholdEvaluator(items, column_headers).columns
+        except ValueError as e:
+            print(f'Error in func:get_display_table while getting threshold information.', e)
+
+    return StreamingTable(column_headers, floatfmt=".2f", decorators=decorators), threshold_columns
+
+
+def get_display_levels(rows, threshold_columns):
+    if not threshold_columns:
+        return None
+    columns = list(zip(*rows))
+    return {column.index: column.classify(columns) for column in threshold_columns}
+
+
+def report_catalog_query(insights_json, job, query_result, column_headers, filters, verbose, is_now, insights_only, with_insights, vertica_connection):
+    qid = job["qid"]
+    query_name = job["query_name"]
+    query_description = job["query_description"]
+    final_query = job["final_query"]
+
+    if query_result == -1:
+        if verbose:
+            print('QUERY: ', f"{final_query}")
+            print("-" * 15)
+        print(query_name, ": column not found\n")
+        return
+
+    if query_result == vertica.TIMED_OUT:
+        msg = f"[\033[93mTIMEOUT\033[0m] {query_name} did not finish within its time budget and was cancelled."
+        push_to_insights_json(qid, insights_json, msg, 'TIMEOUT', query_name)
+        print(msg)
+        return
+    
+    if insights_only or with_insights:
+        display_result = None
+        if with_insights and "display_query" in job:
+            query_result, display_result = get_display_result(vertica_connection, job, query_result)
+        with profiler.stage("analyse"):
+            analyse(qid, insights_json, final_query, verbose, query_name, query_result, query_description, column_headers, insights_only, with_insights, filters["duration"], filters["pool_name"], filters["issue_level"], is_now, filters['user_name'],filters['subcluster_name'], filters['issue_time'], vertica_connection, filters, job["show_limit"], job.get("summary", False), display_result)
+        return
+
+    batches = iter_query_batches(query_result)
+    if query_name == "long_running_queries_raw":
+        batches = (format_relativedelta(rows, column_headers) for rows in batches)
+    print_query_table(job, batches, column_headers, verbose)
+
+
+def get_display_result(vertica_connection, job, query_result):
+    """The insight result along with the rows of the original query of a job (display_query), which
+    are kept in the job (and in a snapshot). A streamed insight result is fetched whole first, the
+    original query runs on the same connection."""
+    if "display_result" not in job and vertica_connection is not None:
+        if isinstance(query_result, vertica.QueryStream):
+            query_result = query_result.fetchall()
+        with profiler.stage("run_display_query", job["query_name"]):
+            display_result = vertica.execute_vertica_query(vertica_connection, job["display_query"])
+        # None (failed) or -1 (column not found), nothing is displayed
+        job["display_result"] = display_result if isinstance(display_result, list) else []
+    return query_result, job.get("display_result")
+
+
+def print_query_table(job, batches, column_headers, verbose, title=None):
+    """Prints a displayed result as its batches arrive, "No records found" when there are none."""
+    query_name = job["query_name"]
+    title = title or f"Query Name: {query_name}"
+    batches = iter(batches)
+    first_batch = next(batches, None)
+
+    print(f"\n\n{title}")
+    print("-" * len(title))
+    # print(f"Query Description: {query_description}")
+    # print("-" * len(f"Query Description: {query_description}"))
+    if verbose:
+        print('QUERY: ', f"{job['final_query']}")
+        print("-" * 15)
+
+    if not first_batch:
+        print("No records found")
+        return
+
+    table, threshold_columns = get_display_table(query_name, column_headers)
+    for rows in chain([first_batch], batches):
+        with profiler.stage("render"):
+            table.write_batch(rows, get_display_levels(rows, threshold_columns))
+
+
 def execute_queries_from_json(insights_json, json_file_path, filters, verbose, is_now, insights_only, with_insights, queries_to_execute=None):
     try:
-        vertica_connection = vertica.get_vertica_connection()
+        vertica_connection = vertica.get_shared_vertica_connection()
         if not vertica_connection:
             print("Failed to connect to the Vertica database. Exiting.")
             return
 
-        with open(json_file_path) as json_file:
-            json_data = json_file.read()
-            json_data = json.loads(json_data)
-
-            # insights_json = {}
-            for row in json_data:
-                qid = row["qid"]
-                query_name = row["query_name"]
-                query = row["query"]
-                query_description = row["query_description"]
-                query_past = row.get("query_past", "")
-                
-                if queries_to_execute and query_name not in queries_to_execute:
-                    continue
-
-                if (queries_to_execute is None or len(queries_to_execute) == 0) and query_name == 'get_query':
-                    continue
-
-                if "get_query" in queries_to_execute and (filters['txn_id'] is None or filters['statement_id'] is None):
-                    print(f"Please provide txn_id and statement_id.")
-                    continue
-                    
-                if (queries_to_execute is None or len(queries_to_execute) == 0) and "_raw" in query_name:
-                    continue
-                    
-                if is_now and "select null" not in query.lower():
-                    final_query = query
-                elif not is_now and "select null" not in query_past.lower():
-                    if query_past == "":
-                        final_query = query
-                    else:
-                        final_query = query_past
-                else:
-                    continue
-            
-                if query_name == "performance_buckets" and filters['user_name'] is None:
-                    if "performance_buckets" in queries_to_execute:
-                        print('Please provide a user name to use performance_buckets')
-                    continue
-
-                if not is_now and query_past == "":
-                    final_query = replace_tables_in_query(final_query)
-
-                d = {}
-                for key, val in filters.items():
-                    if val is not None:
-                        d[key] = val
-                # if query_name == "error_messages_raw":
-                #     if filters["err_type"] is None:
-                #         final_query = get_error_messages_query(filters["err_type"])
-
-                if "end as status" in query.lower():
-                    final_query = replace_thresholds(final_query, query_name)
-                
-                final_query = replace_conditions(final_query, d)
-                final_query = final_query.replace("<subcluster_name>", filters['subcluster_name'])
-
-                query_result = vertica.execute_vertica_query(vertica_connection, final_query)
-
-                if query_result == -1:
-                    if verbose:
-                        print('QUERY: ', f"{final_query}")
-                        print("-" * 15)
-                    print(query_name, ": column not found\n")
-                    continue
-                
-                column_headers = None
-                processed_query_result = None
+        json_data = get_queries_catalog(json_file_path).entries()
 
-                if query_result and query_result != -1:
-                    column_headers = [desc[0] for desc in vertica_connection.cursor().description]
+        # without displayed rows (--insights-only) only the per threshold counts are needed, Vertica can compute them
+        summary = insights_only and not with_insights and filters.get('pushdown_thresholds', False)
+        deadline = time.monotonic() + filters['deadline_secs'] if filters.get('deadline_secs') else None
 
-                if query_result and len(query_result) > 0 and (query_name == "long_running_queries_raw"):
-                    query_result = format_relativedelta(query_result, column_headers)
+        subcluster_names = get_subcluster_names(filters['subcluster_name'])
+        if subcluster_names is not None and filters.get('export_snapshot'):
+            print("--export-snapshot takes a single --subcluster-name.")
+            return
+        if subcluster_names is not None:
+            execute_subclusters_queries(insights_json, json_data, filters, verbose, is_now, insights_only, with_insights, queries_to_execute, subcluster_names, summary, vertica_connection, deadline)
+            return
 
-                if query_result and len(query_result) > 0:
-                    processed_query_result = process_query_result_and_highlight_text(query_result, column_headers)
-                
-                threshold_json_file_path = THRESHOLD_FILE_PATH
-                json_data = None
-                with open(threshold_json_file_path) as json_file:
-                    json_data = json_file.read()
-                    thresholds = json.loads(json_data)
-                
-                if thresholds is None:
-                    print(f"Error reading {threshold_json_file_path}")
-                    exit()
-
-                if processed_query_result:
-                    if insights_only or with_insights:
-                        analyse(qid, insights_json, final_query, verbose, query_name, processed_query_result, query_description, column_headers, insights_only, with_insights, filters["duration"], filters["pool_name"], filters["issue_level"], is_now, filters['user_name'],filters['subcluster_name'], filters['issue_time'], vertica_connection, filters) 
-                    else:
-                        for threshold in thresholds:
-                            if query_name == threshold['query_name'] and "_raw" not in query_name and "long_running" not in query_name:
-                                processed_query_result = colour_values(processed_query_result, threshold['columns'], column_headers)
-
-                        print(f"\n\nQuery Name: {query_name}")
-                        print("-" * len(f"Query Name: {query_name}"))
-                        # print(f"Query Description: {query_description}")
-                        # print("-" * len(f"Query Description: {query_description}"))
-                        if verbose:
-                            print('QUERY: ', f"{final_query}")
-                            print("-" * 15)
-                        print(tabulate(processed_query_result, headers=column_headers, tablefmt='grid', floatfmt=".2f"))
-                else:
-                    if not (insights_only or with_insights):
-                        print(f"\n\nQuery Name: {query_name}")
-                        print("-" * len(f"Query Name: {query_name}"))
-                        if verbose:
-                            print('QUERY: ', f"{final_query}")
-                            print("-" * 15)
-                        print("No records found")
-                    else:
-                        analyse(qid, insights_json, final_query, verbose, query_name, processed_query_result, query_description, column_headers, insights_only, with_insights, filters["duration"], filters["pool_name"], filters["issue_level"], is_now, filters['user_name'],filters['subcluster_name'], filters['issue_time'], vertica_connection, filters)
-        vertica_connection.close()
+        snapshot = None
+        if filters.get('export_snapshot'):
+            from modules.snapshot import SnapshotWriter
+            # every row of the insight queries (no LIMIT, no summary) is kept, the snapshot can then be reported in either mode
+            snapshot = SnapshotWriter(filters['export_snapshot'], filters, is_now, get_nodes())
+            summary = False
+
+        jobs = prepare_catalog_queries(json_data, filters, is_now, queries_to_execute, insights_only or with_insights or snapshot is not None, summary)
+
+        # insights_json = {}
+        # insight queries have their LIMIT removed, stream them so analyse only keeps the rows it displays,
+        # displayed results are printed batch by batch as they are fetched
+        batch_size = filters.get('batch_size') if snapshot is None else None
+
+        # the header looks the nodes up on the shared connection, which must happen before a result is streamed on it
+        thresholds = get_thresholds_catalog(THRESHOLD_FILE_PATH)
+        if (insights_only or with_insights) and any(job.get("query_name") in thresholds for job in jobs):
+            print_report_header(filters, is_now)
+
+        for job, query_result, column_headers in run_catalog_queries(jobs, vertica_connection, filters.get('parallel', 1), batch_size, deadline):
+            if "notice" in job:
+                print(job["notice"])
+                continue
+            if snapshot is not None:
+                if "display_query" in job and isinstance(query_result, list):
+                    get_display_result(vertica_connection, job, query_result)
+                with profiler.stage("snapshot", job["query_name"]):
+                    snapshot.add(job, query_result, column_headers)
+                query_result = limit_displayed_rows(job, query_result, insights_only or with_insights)
+            with profiler.stage("report", job["query_name"]):
+                report_catalog_query(insights_json, job, query_result, column_headers, filters, verbose, is_now, insights_only, with_insights, vertica_connection)
+
+        if snapshot is not None:
+            snapshot.close()
+            print(f"\nSnapshot written to {filters['export_snapshot']}")
+    except NodesNotFound:
+        # ends the command line report (main), the refresh worker logs it and tries again
+        raise
     except Exception as e:
         print(f"Error while processing the CSV file or executing queries: {e}")
     
+def limit_displayed_rows(job, query_result, insights):
+    """The rows a plain report displays of a query rendered without its LIMIT (show_limit),
+    or the rows of its original query (display_result)."""
+    if insights or not isinstance(query_result, list):
+        return query_result
+    if job.get("display_result") is not None:
+        return job["display_result"]
+    if job["show_limit"] is None:
+        return query_result
+    return query_result[:job["show_limit"]]
+
+
+def report_snapshot(insights_json, snapshot_path, verbose, insights_only, with_insights, issue_level=None):
+    """Reports a directory written by --export-snapshot with the filters it was taken with, no connection is opened."""
+    from modules.snapshot import load_snapshot
+    try:
+        manifest, entries = load_snapshot(snapshot_path)
+    except (OSError, ValueError) as e:
+        print(f"Error while reading the snapshot {snapshot_path}: {e}")
+        return
+
+    # the report header looks the nodes up, from the snapshot
+    topology_cache.pin(manifest["nodes"])
+    filters = {**manifest["filters"], "verbose": verbose}
+    if issue_level is not None:
+        filters["issue_level"] = issue_level
+    is_now = manifest["is_now"]
+    insights = insights_only or with_insights
+
+    print(f"Snapshot taken at {manifest['created_at']}")
+    thresholds = get_thresholds_catalog(THRESHOLD_FILE_PATH)
+    if insights and any(entry["query_name"] in thresholds for entry in manifest["queries"]):
+        print_report_header(filters, is_now)
+
+    for job, query_result, column_headers in entries:
+        with profiler.stage("report", job["query_name"]):
+            report_catalog_query(insights_json, job, limit_displayed_rows(job, query_result, insights), column_headers, filters, verbose, is_now, insights_only, with_insights, None)
+
+
+def get_subcluster_names(subcluster_name):
+    """The subclusters of a --subcluster-name list (a,b) or `all`, None for a single subcluster."""
+    if subcluster_name is None or (subcluster_name != "all" and "," not in subcluster_name):
+        return None
+    if subcluster_name == "all":
+        return sorted({node[2] for node in get_nodes() or []})
+    return [name.strip() for name in subcluster_name.split(",") if name.strip()]
+
+
+def get_subcluster_scope(row, is_now):
+    """How a catalog entry runs in a report of several subclusters:
+    "fan_out", once for all of them, its rows split by the subcluster_column of the entry;
+    "subcluster", once per subcluster (no subcluster_column, or a query_past ranking rows across subclusters);
+    "cluster", once, the query does not depend on the subcluster.
+    """
+    query = row["query"] if is_now or not row.get("query_past") else row["query_past"]
+    if "<subcluster_name>" not in query.lower():
+        return "cluster"
+    if row.get("subcluster_column") and (is_now or not row.get("query_past")):
+        return "fan_out"
+    return "subcluster"
+
+
+def split_by_subcluster(query_result, column_headers, subcluster_column):
+    """Rows of a fan out query per subcluster, in query order."""
+    partitions = {}
+    index = column_headers.index(subcluster_column)
+    for row in query_result:
+        partitions.setdefault(row[index], []).append(row)
+    return partitions
+
+
+def execute_subclusters_queries(insights_json, json_data, filters, verbose, is_now, insights_only, with_insights, queries_to_execute, subcluster_names, summary, vertica_connection, deadline=None):
+    """Report of several subclusters, insights_json is keyed by subcluster.
+
+    Queries that do not depend on the subcluster are reported once, before the subclusters. Entries
+    with a subcluster_column run once for every subcluster (subcluster_name in (...), no LIMIT) and
+    their rows are split per subcluster here; the others run once per subcluster.
+    """
+    # every subcluster gets its own header below, not the one analyse prints once per report
+    global is_header_printed
+    is_header_printed = True
+
+    insights = insights_only or with_insights
+    parallel = filters.get('parallel', 1)
+    scopes = {row["qid"]: get_subcluster_scope(row, is_now) for row in json_data}
+    order = [row["qid"] for row in json_data]
+
+    cluster_jobs = [job for job in prepare_catalog_queries(json_data, filters, is_now, queries_to_execute, insights, summary)
+                    if "notice" in job or scopes[job["qid"]] == "cluster"]
+    # a summary row would count the rows of every subcluster together
+    fan_out_jobs = [job for job in prepare_catalog_queries(json_data, {**filters, "subcluster_names": subcluster_names}, is_now, queries_to_execute, insights)
+                    if "notice" not in job and scopes[job["qid"]] == "fan_out"]
+
+    cluster_insights_json, fan_out_results = {}, {}
+    if any("notice" not in job for job in cluster_jobs):
+        print("\n\n===== Cluster =====")
+    for job, query_result, column_headers in run_catalog_queries(cluster_jobs + fan_out_jobs, vertica_connection, parallel, None, deadline):
+        if "notice" in job:
+            print(job["notice"])
+        elif scopes[job["qid"]] == "fan_out":
+            fan_out_results[job["qid"]] = (job, query_result, column_headers)
+        else:
+            with profiler.stage("report", job["query_name"]):
+                report_catalog_query(cluster_insights_json, job, query_result, column_headers, filters, verbose, is_now, insights_only, with_insights, vertica_connection)
+
+    with profiler.stage("split_by_subcluster"):
+        partitions = {
+            qid: split_by_subcluster(query_result, column_headers, job["subcluster_column"])
+            for qid, (job, query_result, column_headers) in fan_out_results.items()
+            if isinstance(query_result, list) and column_headers and job["subcluster_column"] in column_headers
+        }
+
+    for subcluster_name in subcluster_names:
+        subcluster_filters = {**filters, "subcluster_name": subcluster_name}
+        jobs = [job for job in prepare_catalog_queries(json_data, subcluster_filters, is_now, queries_to_execute, insights, summary)
+                if "notice" not in job and scopes[job["qid"]] == "subcluster"]
+
+        print(f"\n\n===== Subcluster: {subcluster_name} =====")
+        if insights:
+            print_header(get_report_header_args(subcluster_filters, is_now))
+
+        results = {job["qid"]: (job, query_result, column_headers) for job, query_result, column_headers in run_catalog_queries(jobs, vertica_connection, parallel, None, deadline)}
+        for qid, (job, query_result, column_headers) in fan_out_results.items():
+            if qid in partitions:
+                query_result = limit_displayed_rows(job, partitions[qid].get(subcluster_name, []), insights)
+            results[qid] = (job, query_result, column_headers)
+
+        insights_json[subcluster_name] = dict(cluster_insights_json)
+        for qid in order:
+            if qid in results:
+                job, query_result, column_headers = results[qid]
+                with profiler.stage("report", job["query_name"]):
+                    report_catalog_query(insights_json[subcluster_name], job, query_result, column_headers, subcluster_filters, verbose, is_now, insights_only, with_insights, vertica_connection)
+
+
+def get_row_changes(previous_rows, rows):
+    """Rows that appeared and rows that went away since previous_rows (tuples), in query order."""
+    def take(rows, counts):
+        taken = []
+        for row in rows:
+            if counts[row] > 0:
+                counts[row] -= 1
+                taken.append(row)
+        return taken
+
+    previous_counts, counts = Counter(previous_rows), Counter(rows)
+    return take(rows, counts - previous_counts), take(previous_rows, previous_counts - counts)
+
+
+def get_insight_statuses(insights_json):
+    return {query_name: [insight["status"] for insight in value.get("insights", [])] for query_name, value in insights_json.items()}
+
+
+def print_watch_changes(job, column_headers, previous_rows, rows, verbose):
+    added, removed = get_row_changes(previous_rows, rows)
+    if added:
+        print_query_table(job, [added], column_headers, verbose, title=f"Query Name: {job['query_name']} (+{len(added)} new rows)")
+    if removed:
+        print_query_table(job, [removed], column_headers, verbose, title=f"Query Name: {job['query_name']} (-{len(removed)} rows gone)")
+    return bool(added or removed)
+
+
+def print_status_transitions(previous_insights_json, insights_json):
+    previous_statuses, statuses = get_insight_statuses(previous_insights_json), get_insight_statuses(insights_json)
+    changed = False
+    for query_name, query_statuses in statuses.items():
+        previous_query_statuses = previous_statuses.get(query_name, [])
+        if query_statuses == previous_query_statuses:
+            continue
+        changed = True
+        print(f"\n{query_name}: {', '.join(previous_query_statuses) or '-'} -> {', '.join(query_statuses)}")
+        for insight in insights_json[query_name]["insights"]:
+            print(f"    [{highlight_severity(insight['status'].lower())}] {insight['message']}")
+    return changed
+
+
+def watch_queries_from_json(json_file_path, filters, verbose, is_now, insights_only, with_insights, queries_to_execute, watch_secs, iterations=None):
+    """Re-runs the selected catalog queries every watch_secs on the shared connection until
+    interrupted (or for iterations runs). The first run is reported in full, the later ones
+    only print the rows that appeared or went away and the insight status transitions."""
+    vertica_connection = vertica.get_shared_vertica_connection()
+    if not vertica_connection:
+        print("Failed to connect to the Vertica database. Exiting.")
+        return
+
+    if get_subcluster_names(filters['subcluster_name']) is not None:
+        print("--watch takes a single --subcluster-name.")
+        return
+
+    insights = insights_only or with_insights
+    previous_rows, previous_insights_json = None, None
+    # an empty result has no column headers, the rows that went away are printed with the last ones seen
+    known_headers = {}
+    iteration = 0
+
+    while iterations is None or iteration < iterations:
+        started_at = time.monotonic()
+        if is_now:
+            # the time windows of the queries move along with the watch
+            filters = {**filters, "issue_time": datetime.now().strftime("%Y-%m-%d %H:%M:%S")}
+        jobs = prepare_catalog_queries(get_queries_catalog(json_file_path).entries(), filters, is_now, queries_to_execute, insights)
+        is_first = previous_rows is None
+        if not is_first:
+            print(f"\n--- {datetime.now().strftime('%Y-%m-%d %H:%M:%S')} ---")
+
+        rows, insights_json, changed = {}, {}, False
+        for job, query_result, column_headers in run_catalog_queries(jobs, vertica_connection, filters.get('parallel', 1)):
+            if "notice" in job:
+                if is_first:
+                    print(job["notice"])
+                continue
+
+            if insights or query_result in (-1, vertica.TIMED_OUT) or query_result is None:
+                # later runs only print the status transitions, not the insights themselves
+                with contextlib.redirect_stdout(sys.stdout if is_first or not insights else io.StringIO()):
+                    report_catalog_query(insights_json, job, query_result, column_headers, filters, verbose, is_now, insights_only, with_insights, vertica_connection)
+                changed = changed or not insights
+                continue
+
+            if query_result and column_headers and job["query_name"] == "long_running_queries_raw":
+                query_result = format_relativedelta(query_result, column_headers)
+            if column_headers:
+                known_headers[job["qid"]] = column_headers
+            column_headers = known_headers.get(job["qid"], column_headers)
+            rows[job["qid"]] = [tuple(row) for row in query_result]
+
+            if is_first:
+                print_query_table(job, [query_result], column_headers, verbose)
+            else:
+                changed = print_watch_changes(job, column_headers, previous_rows.get(job["qid"], []), rows[job["qid"]], verbose) or changed
+
+        if insights and not is_first:
+            changed = print_status_transitions(previous_insights_json, insights_json) or changed
+        if not is_first and not changed:
+            print("No changes")
+
+        previous_rows, previous_insights_json = rows, insights_json
+        iteration += 1
+        if iterations is None or iteration < iterations:
+            time.sleep(max(0, watch_secs - (time.monotonic() - started_at)))
+
+
 def execute_query_breakdown(args, is_now, verbose):
+    from query_breakdown import query_breakdown
     query_breakdown_chars = int(args.query_breakdown_chars) if args.query_breakdown_chars is not None else args.query_breakdown_chars
-    q = query_breakdown(args.client_breakdown, args.granularity, args.query_pattern, query_breakdown_chars, args.case_sensitive, int(args.num_items), float(args.duration_hours), args.issue_time, args.order_by)
+    with profiler.stage("render_query", "query_breakdown"):
+        q = query_breakdown(args.client_breakdown, args.granularity, args.query_pattern, query_breakdown_chars, args.case_sensitive, int(args.num_items), float(args.duration_hours), args.issue_time, args.order_by)
     
     if not is_now:
         q = replace_tables_in_query(q, True)
 
-    vertica_connection = vertica.get_vertica_connection()
-    q_res = vertica.execute_vertica_query(vertica_connection, q)
+    vertica_connection = vertica.get_shared_vertica_connection()
+    with profiler.stage("run_query", "query_breakdown"):
+        q_res = vertica.execute_vertica_query(vertica_connection, q)
     
     query_name = 'query_breakdown'
 
@@ -711,7 +1202,19 @@ def execute_query_breakdown(args, is_now, verbose):
 
     print(f"\n\nQuery Name: {query_name}")
     print("-" * len(f"Query Name: {query_name}"))
-    print(tabulate(q_res, headers=column_headers, tablefmt='grid', floatfmt=".2f"))
+    with profiler.stage("tabulate", query_name):
+        print(tabulate(q_res, headers=column_headers, tablefmt='grid', floatfmt=".2f"))
+
+
+def report_profile(profile_output_path):
+    if profile_output_path is None:
+        return
+
+    profiler.dump(profile_output_path)
+    table_data = [[stage, stats["calls"], round(stats["wall_secs"], 3), round(stats["cpu_secs"], 3), stats["rows"], stats["bytes"]] for stage, stats in profiler.get_stage_totals().items()]
+    print(f"\n\nProfile (stages nest, a stage includes the ones run inside it)")
+    print(tabulate(table_data, headers=["stage", "calls", "wall secs", "cpu secs", "rows", "bytes"], tablefmt='grid', floatfmt=".3f"))
+    print(f"Per query timings written to {profile_output_path}")
 
 
 examples  = [
@@ -728,7 +1231,56 @@ examples  = [
     ['get_query', 'genie --subcluster-name="secondary_subcluster_1" --queries-to-execute=get_query --txn-id=117093590328410146 --statement-id=1']
 ]
 
-if __name__ == "__main__":
+def print_list(item):
+    """--list [nodes|subclusters|examples], returns the exit code. Only nodes and subclusters query Vertica."""
+    if item == "examples":
+        print(tabulate(examples, headers=['query_name', 'example'], tablefmt='grid', floatfmt=".2f"))
+        # print(examples)
+        return 0
+
+    nodes = get_nodes()
+    if nodes is None:
+        print("Failed to fetch the nodes from Vertica.")
+        return 1
+
+    if item is None or item == "nodes":
+        print(tabulate(nodes, headers=['node', 'ip', 'subcluster'], tablefmt='grid', floatfmt=".2f"))
+        return 0 if item else 1
+    if item == "subclusters":
+        subclusters = [node[2] for node in nodes]
+        print(tabulate([[item] for item in list(set(subclusters))], headers=['subcluster'], tablefmt='grid', floatfmt=".2f"))
+        return 0
+
+    print("Invalid argument. Use --list nodes or --list subclusters or --list")
+    return 0
+
+
+def run_report(args, filters, is_now, insights_only, with_insights, json_file_path, queries_to_execute):
+    """The report of the command line: from a snapshot, watched or run once."""
+    insights_json = {}
+
+    if args.from_snapshot is not None:
+        with profiler.stage("total"):
+            report_snapshot(insights_json, args.from_snapshot, filters['verbose'], insights_only, with_insights, filters['issue_level'])
+        report_profile(args.profile)
+        return
+
+    if filters.get('watch_secs'):
+        try:
+            watch_queries_from_json(json_file_path, filters, filters['verbose'], is_now, insights_only, with_insights, queries_to_execute, filters['watch_secs'])
+        except KeyboardInterrupt:
+            print("\nStopped watching.")
+        report_profile(args.profile)
+        return
+
+    with profiler.stage("total"):
+        execute_queries_from_json(insights_json, json_file_path, filters, filters['verbose'], is_now, insights_only, with_insights, queries_to_execute)
+    report_profile(args.profile)
+
+    # print(insights_json)
+
+
+def main():
     help_flag = False
     if len(sys.argv) == 2:
         if sys.argv[1] == "--help":
@@ -737,37 +1289,27 @@ if __name__ == "__main__":
         help_flag = True
     if len(sys.argv) >= 2:
         if sys.argv[1] == "--list":
-            nodes = get_nodes()
-
-            subclusters, ips, nodes_names = [], [], []
-            for node in nodes:
-                subclusters.append(node[2])
-                ips.append(node[1])
-                nodes_names.append(node[0])
-            try:
-                if sys.argv[2] == "nodes":
-                    print(tabulate(nodes, headers=['node', 'ip', 'subcluster'], tablefmt='grid', floatfmt=".2f"))   
-                elif sys.argv[2] == "subclusters":
-                    print(tabulate([[item] for item in list(set(subclusters))], headers=['subcluster'], tablefmt='grid', floatfmt=".2f"))   
-                elif sys.argv[2] == "examples":
-                    print(tabulate(examples, headers=['query_name', 'example'], tablefmt='grid', floatfmt=".2f"))   
-                    # print(examples)
-                else:
-                    print("Invalid argument. Use --list nodes or --list subclusters or --list")
-            except Exception as e:
-                print(tabulate(nodes, headers=['node', 'ip', 'subcluster'], tablefmt='grid', floatfmt=".2f"))   
-                sys.exit(1)
-            sys.exit(0)
+            sys.exit(print_list(sys.argv[2] if len(sys.argv) > 2 else None))
 
+    # the argument parser (and tabulate for --help) is only loaded past --list
+    from modules.args_parser import get_args, pargse_args
     args = get_args(help_flag)
     filters, is_now, insights_only, with_insights, json_file_path, queries_to_execute = pargse_args(help_flag)
 
+    if args.profile is not None:
+        profiler.enable()
+
     if len(queries_to_execute) != 0 and 'query_breakdown' in queries_to_execute:
         execute_query_breakdown(args, is_now, args.verbose)
+        report_profile(args.profile)
         exit()
 
-    insights_json = {}
+    try:
+        run_report(args, filters, is_now, insights_only, with_insights, json_file_path, queries_to_execute)
+    except NodesNotFound as e:
+        print(e)
+        exit()
 
-    execute_queries_from_json(insights_json, json_file_path, filters, filters['verbose'], is_now, insights_only, with_insights, queries_to_execute)
 
-    # print(insights_json)
\ No newline at end of file
+if __name__ == "__main__":
+    main()